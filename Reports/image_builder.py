@@ -3,6 +3,7 @@ import mplfinance as mpf
 import os
 import uuid
 from libs.file_checker import FileChecker
+from Trading.methodology.Indicators.indicators import sma, ema, rsi, macd
 import shutil
 
 source_directory = "/home/dp/PycharmProjects/Portfolio_management/Portfolio_management"
@@ -19,10 +20,17 @@ class CandlestickChartGenerator:
         self.created_files = []  # Lista per tenere traccia dei file creati
         self.check_file = FileChecker()  # Assicurati che FileChecker sia definito correttamente
 
+    def _datetime_indexed(self):
+        # I dati letti dal price store hanno già un DatetimeIndex: nessuna conversione né copia
+        if isinstance(self.df.index, pd.DatetimeIndex):
+            return self.df
+        if 'Date' in self.df.columns:
+            return self.df.set_index(pd.DatetimeIndex(pd.to_datetime(self.df['Date']), name='Date'))
+        return self.df.set_axis(pd.to_datetime(self.df.index), axis=0)
+
     def _plot_to_file(self, max_points=None, **kwargs):
-        if not isinstance(self.df.index, pd.DatetimeIndex):
-            self.df.index = pd.to_datetime(self.df.index)
-        df_to_plot = self.df if max_points is None else self.df[-max_points:]
+        df = self._datetime_indexed()
+        df_to_plot = df if max_points is None else df[-max_points:]
         temp_file_path = self._generate_temp_file_path()
         # Configura l'asse x per mostrare la data ogni 5 intervalli
         mpf.plot(df_to_plot, type='candlestick', style=self.mpf_style,
@@ -72,21 +80,16 @@ class CandlestickChartGenerator:
         return self._plot_to_file(max_points, addplot=add_plots)
 
     def create_chart_with_SMA(self, period=20, max_points=None):
-        sma = self.df['Close'].rolling(window=period).mean()
-        return self._plot_to_file(max_points, addplot=mpf.make_addplot(sma))
+        sma_values = sma(self.df['Close'], period)
+        sma_to_plot = sma_values if max_points is None else sma_values[-max_points:]
+        return self._plot_to_file(max_points, addplot=mpf.make_addplot(sma_to_plot))
 
     def create_chart_with_RSI(self, period=14, max_points=None, file_name='rsi_chart.png'):
         # Calcolo dell'RSI
-        delta = self.df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        rsi_values = rsi(self.df['Close'], period)
 
         # Troncare i dati per il numero massimo di punti se specificato
-        df_to_plot = self.df if max_points is None else self.df[-max_points:]
-        rsi_to_plot = rsi if max_points is None else rsi[-max_points:]
+        rsi_to_plot = rsi_values if max_points is None else rsi_values[-max_points:]
 
         # Preparazione dell'addplot per RSI
         apd = mpf.make_addplot(rsi_to_plot, type='line', secondary_y=True)
@@ -95,21 +98,16 @@ class CandlestickChartGenerator:
         return self._plot_to_file(max_points, addplot=apd)
 
     def create_chart_with_EMA(self, period=20, max_points=None):
-        ema = self.df['Close'].ewm(span=period, adjust=False).mean()
-        return self._plot_to_file(max_points, addplot=mpf.make_addplot(ema))
+        ema_values = ema(self.df['Close'], period)
+        ema_to_plot = ema_values if max_points is None else ema_values[-max_points:]
+        return self._plot_to_file(max_points, addplot=mpf.make_addplot(ema_to_plot))
 
     def create_chart_with_MACD(self, short_period=12, long_period=26, signal_period=9, max_points=None):
-        # Calcolo delle EMA a breve e lungo termine
-        ema_short = self.df['Close'].ewm(span=short_period, adjust=False).mean()
-        ema_long = self.df['Close'].ewm(span=long_period, adjust=False).mean()
-
         # Calcolo del MACD e del segnale MACD
-        macd = ema_short - ema_long
-        macd_signal = macd.ewm(span=signal_period, adjust=False).mean()
+        macd_line, macd_signal = macd(self.df['Close'], short_period, long_period, signal_period)
 
         # Troncare i dati per il numero massimo di punti se specificato
-        df_to_plot = self.df if max_points is None else self.df[-max_points:]
-        macd_to_plot = macd if max_points is None else macd[-max_points:]
+        macd_to_plot = macd_line if max_points is None else macd_line[-max_points:]
         macd_signal_to_plot = macd_signal if max_points is None else macd_signal[-max_points:]
 
         # Preparazione dell'addplot per MACD e il segnale MACD
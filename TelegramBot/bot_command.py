@@ -1,21 +1,25 @@
 import json
-import pandas as pd
+from functools import partial
 from Trading.methodology.download_data.download_data_yahoo import StockDataDownloader
 from Reports.report_builder import ReportGenerator
-from Reports.image_builder import CandlestickChartGenerator
-from Trading.methodology.blocked_stock.blocked_stock import TradingAnalyzer
-from Trading.methodology.lateral_movement.search_type_mov import TrendMovementAnalyzer
+from Trading.methodology.blocked_stock.blocked_stock import find_blocked_stocks
+from Trading.methodology.lateral_movement.search_type_mov import analyze_trend_and_laterality
+from Trading.methodology.scan_engine.scan_engine import run_scan, clear_scan_images
+from Trading.methodology.data_store.resample import build_resampled
+from Trading.methodology.stock_filter.screener import SCREENS_FILE, load_screens, run_saved_screen
+from Trading.methodology.patterns.pattern_scanner import PatternScanner
+from Trading.methodology.data_store.repository import get_repository
+from Trading.methodology.lateral_movement.trendlines import scan_panel_channels
 
 
 source_directory ="/home/dp/PycharmProjects/Portfolio_management/Portfolio_management"
+# Le scansioni del bot girano nel processo del bot: niente avvio di processi a ogni richiesta e la cache
+# del DataRepository condiviso resta valida tra un comando e l'altro
+BOT_SCAN_WORKERS = 1
+
 def download_data_weekly():
-    with open( f"{source_directory}/json_files/SP500-stock.json", 'r') as file:
-        tickers = json.load(file)
-    # Lista dei ticker
-    tickers_list = list(tickers.keys())
-    # Utilizzo della classe StockDataDownloader
-    downloader = StockDataDownloader(tickers_list, interval='1wk')
-    downloader.download_data()
+    # Le barre settimanali si ricavano dai dati giornalieri già scaricati, senza un secondo download
+    build_resampled(index="SP500", intervals=('1wk',))
 
 def download_data_daily():
     with open(f"{source_directory}/json_files/SP500-stock.json", 'r') as file:
@@ -27,9 +31,10 @@ def download_data_daily():
     # Utilizzo della classe StockDataDownloader
     downloader = StockDataDownloader(tickers_list)
     downloader.download_data()
+    build_resampled(index="SP500", intervals=('1wk', '1mo'))
     stop_downloading()
 
-def blocked_stock():
+def blocked_stock(max_workers=BOT_SCAN_WORKERS):
     report = ReportGenerator()
     report.add_title(title="Report blocked stock")
 
@@ -44,21 +49,16 @@ def blocked_stock():
         tickers = json.load(file)
         tickers_list = list(tickers.keys())
 
-    for item in tickers_list:
-        data = pd.read_csv(f"{source_directory}/Trading/Data/Daily/{item}_historical_data.csv", parse_dates=['Date'])
-        enhanced_strategy = TradingAnalyzer(data, max_price=50)
-        result, image = enhanced_strategy.check_price_range()
-        if result:
-            print(f'stock = {item} -- FOUND ')
-            report.add_content(f'stock = {item} ')
-            report.add_commented_image(df=data, comment=f'Description = {result["details"]}', image_path=image)
-        print(f"checked stock {item}")
+    results = find_blocked_stocks(tickers_list, index="SP500", max_price=50, max_workers=max_workers)
+    for item, result in results:
+        report.add_content(f'stock = {item} ')
+        report.add_commented_image(df=None, comment=f'Description = {result["details"]}', image_path=result['image'])
     file_report = report.save_report(filename="Report_blocked_stock")
-    enhanced_strategy.clear_img_temp_files()
+    clear_scan_images(results)
     return file_report
 
 
-def find_lateral_mov():
+def find_lateral_mov(max_workers=BOT_SCAN_WORKERS):
     report = ReportGenerator()
     report.add_title(title="Report lateral movement")
 
@@ -70,20 +70,60 @@ def find_lateral_mov():
         tickers = json.load(file)
         tickers_list = list(tickers.keys())
 
-    for item in tickers_list:
-        data = pd.read_csv(f"{source_directory}/Trading/Data/Daily/{item}_historical_data.csv")
-        if data["Close"].iloc[-1] < 50:
-            enhanced_strategy = TrendMovementAnalyzer(data)
-            image = CandlestickChartGenerator(data)
-            result = enhanced_strategy.evaluate_trend_and_laterality( lateral_check_method="ADX")
-            if result:
-                image = image.create_simple_chart(max_points=50)
-                print(f'stock = {item} -- FOUND ')
-                report.add_content(f'stock = {item} ')
-                report.add_commented_image(df=data, comment=f'Description', image_path=image)
-            print(f"checked stock {item}")
-        else:
-            print(f"stock {item} is over price")
+    results = run_scan(partial(analyze_trend_and_laterality, lateral_check_method="ADX"), tickers_list,
+                       index="SP500", columns=['Open', 'High', 'Low', 'Close'], max_workers=max_workers,
+                       where={'max_price': 50})
+    for item, result in results:
+        report.add_content(f'stock = {item} ')
+        report.add_commented_image(df=None, comment=f'Description', image_path=result['image'])
     file_report = report.save_report(filename="Report_lateral_movement")
-    enhanced_strategy.clear_img_temp_files()
-    return file_report
\ No newline at end of file
+    clear_scan_images(results)
+    return file_report
+
+
+def screen_names():
+    # Screen salvati in json_files/screens.json, mostrati come bottoni nel menu del bot
+    return list(load_screens(f"{source_directory}/{SCREENS_FILE}"))
+
+
+def saved_screen(name):
+    screen, result = run_saved_screen(name, path=f"{source_directory}/{SCREENS_FILE}")
+    report = ReportGenerator()
+    report.add_title(title=f"Report screen {name}")
+    report.add_content(f'{screen.description}')
+    report.add_content(f'Screen = {screen.expression} on {screen.index}: {len(result)} stocks')
+    for item, row in result.iterrows():
+        values = ', '.join(f'{label} = {value:.2f}' for label, value in row.items())
+        report.add_content(f'stock = {item} ({values})')
+    return report.save_report(filename=f"Report_screen_{name}")
+
+
+def find_chart_patterns(max_workers=BOT_SCAN_WORKERS):
+    report = ReportGenerator()
+    report.add_title(title="Report chart patterns")
+
+    # Solo i pattern completati dopo l'ultima scansione
+    new_patterns = PatternScanner(index="SP500").scan(max_workers=max_workers)
+    report.add_content(f'{len(new_patterns)} new patterns')
+    for _, row in new_patterns.iterrows():
+        points = ', '.join(f'{date} at {price:.2f}' for date, price in zip(row['Anchors'], row['Prices']))
+        report.add_content(f'stock = {row["Ticker"]} {row["Pattern"]} completed {row["Completed"]} ({points})')
+    return report.save_report(filename="Report_chart_patterns")
+
+
+def find_trend_channels(max_price=50):
+    report = ReportGenerator()
+    report.add_title(title="Report trend channels")
+
+    with open(f"{source_directory}/json_files/SP500-stock.json", 'r') as file:
+        tickers = json.load(file)
+        tickers_list = list(tickers.keys())
+
+    # Canali delle ultime 60 sedute di tutti i ticker insieme, sul panel dell'universo
+    channels = scan_panel_channels(get_repository().panel("SP500"), tickers_list, max_price=max_price)
+    report.add_content(f'{len(channels)} stocks in a channel')
+    for _, row in channels.iterrows():
+        report.add_content(f'stock = {row["Ticker"]} {row["Channel"]} channel (close = {row["Close"]:.2f}, '
+                           f'support = {row["Support"]:.2f}, resistance = {row["Resistance"]:.2f}, '
+                           f'slope = {row["Slope"]:.2%} per bar)')
+    return report.save_report(filename="Report_trend_channels")
@@ -43,10 +43,15 @@ class CommandBot:
             keyboard = [
                 [InlineKeyboardButton("find blocked stock", callback_data="action_findblockedstock"),
                  InlineKeyboardButton("find lateral move", callback_data="action_findlateralmov")],
-                [InlineKeyboardButton("method 3", callback_data="action_option_3"),
-                 InlineKeyboardButton("method 4", callback_data="action_option_4")],
+                [InlineKeyboardButton("saved screens", callback_data="menu_screens"),
+                 InlineKeyboardButton("chart patterns", callback_data="action_findpatterns")],
+                [InlineKeyboardButton("trend channels", callback_data="action_findchannels")],
                 [InlineKeyboardButton("Back to main menu", callback_data="menu_top")]
             ]
+        elif menu == 'screens':
+            # Un bottone per ogni screen salvato, senza codice nuovo per screen
+            keyboard = [[InlineKeyboardButton(name, callback_data=f"screen_{name}")] for name in screen_names()]
+            keyboard.append([InlineKeyboardButton("Back to stock menu", callback_data="menu_catchtrade")])
         elif menu == 'macrotool':
             keyboard = [
                 [InlineKeyboardButton("Update data", callback_data="action_updatemacrodata"),
@@ -83,6 +88,14 @@ class CommandBot:
         # Verifica se il callback è per eseguire un'azione
         elif data.startswith("action_"):
             self.perform_action(client,callback_query, data.split("_")[1])
+        elif data.startswith("screen_"):
+            name = data[len("screen_"):]
+            try:
+                file_report = saved_screen(name)
+                self.send_generated_pdf(client, callback_query.message.chat.id, file_report)
+                callback_query.message.reply_text("PDF generate and sent!")
+            except Exception as e:
+                callback_query.message.reply_text(f"Error screen {name}: {e}")
 
     def perform_action(self, client, callback_query, action):
         if action == "updatedaily":
@@ -105,6 +118,20 @@ class CommandBot:
                 callback_query.message.reply_text("PDF generate and sent!")
             except subprocess.CalledProcessError as e:
                 callback_query.message.reply_text(f"Error generate: {e}")
+        elif action == "findpatterns":
+            try:
+                file_report = find_chart_patterns()
+                self.send_generated_pdf(client, callback_query.message.chat.id, file_report)
+                callback_query.message.reply_text("PDF generate and sent!")
+            except Exception as e:
+                callback_query.message.reply_text(f"Error generate: {e}")
+        elif action == "findchannels":
+            try:
+                file_report = find_trend_channels()
+                self.send_generated_pdf(client, callback_query.message.chat.id, file_report)
+                callback_query.message.reply_text("PDF generate and sent!")
+            except Exception as e:
+                callback_query.message.reply_text(f"Error generate: {e}")
 
     def send_generated_pdf(self, client, chat_id, file_path):
         # Invia il PDF generato al client
@@ -1,6 +1,7 @@
 import pandas as pd
 import  json
 from Trading.methodology.Indicators.triple_sma import EnhancedMovingAverageCrossoverStrategy
+from Trading.methodology.data_store.price_store import PriceStore
 
 
 
@@ -78,8 +79,9 @@ def bt():
     tickers_list = list(tickers.keys())
     enhanced_strategy = EnhancedMovingAverageCrossoverStrategy(short_window=10, long_window=50, extra_window=30, stop_loss_percent=0.05, take_profit_percent=0.10, transaction_cost=0.01, slippage=0.005)
 
+    price_store = PriceStore(index="SP500", interval='1d')
     for item in tickers_list:
-        data = pd.read_csv(f"Trading/Data/Daily/{item}_historical_data.csv")
+        data = price_store.read(item)
         backtester = Backtester(enhanced_strategy, data)
         backtest_results = backtester.execute_backtest()
         performance_metrics = backtester.calculate_performance_metrics()
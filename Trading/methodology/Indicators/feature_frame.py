@@ -0,0 +1,77 @@
+import pandas as pd
+from Trading.methodology.Indicators import indicators
+
+
+class FeatureFrame:
+    """
+    Colonne derivate (medie mobili, RSI, MACD, bande, ADX) di un DataFrame OHLC, calcolate solo
+    alla prima richiesta e poi riusate. Il DataFrame di partenza non viene né copiato né modificato:
+    ogni indicatore è un ndarray allineato al suo indice.
+    # Esempio d'uso:
+    # features = FeatureFrame(df)
+    # features.sma(20)   # calcolata
+    # features.sma(20)   # dalla cache
+    """
+    def __init__(self, df):
+        """
+        :param df: DataFrame con colonne 'Open', 'High', 'Low', 'Close'.
+        """
+        self.df = df
+        self.index = df.index
+        self.computed = 0
+        self._cache = {}
+
+    def _get(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+            self.computed += 1
+        return self._cache[key]
+
+    def series(self, values):
+        """
+        :return: pd.Series con l'indice del DataFrame (senza copiare i valori).
+        """
+        return pd.Series(values, index=self.index, copy=False)
+
+    def column(self, name):
+        """
+        :return: Colonna del DataFrame come ndarray float64.
+        """
+        return self._get(('column', name), lambda: indicators.as_array(self.df[name]))
+
+    def sma(self, window):
+        return self._get(('sma', window), lambda: indicators.sma(self.column('Close'), window))
+
+    def rsi(self, window=14):
+        return self._get(('rsi', window), lambda: indicators.rsi(self.column('Close'), window))
+
+    def macd(self, span_short=12, span_long=26, span_signal=9):
+        """
+        :return: Tupla (linea MACD, linea di segnale).
+        """
+        return self._get(('macd', span_short, span_long, span_signal),
+                         lambda: indicators.macd(self.column('Close'), span_short, span_long, span_signal))
+
+    def bollinger_bands(self, window=20, num_std_dev=2):
+        """
+        :return: Tupla (media mobile, banda superiore, banda inferiore).
+        """
+        return self._get(('bollinger', window, num_std_dev),
+                         lambda: indicators.bollinger_bands(self.column('Close'), window, num_std_dev))
+
+    def adx(self, window=14, method='rolling'):
+        """
+        :return: Tupla (ADX, +DI, -DI).
+        """
+        return self._get(('adx', window, method),
+                         lambda: indicators.adx(self.column('High'), self.column('Low'), self.column('Close'),
+                                                window, method))
+
+    def pct_change(self):
+        return self._get(('pct_change',), lambda: indicators.pct_change(self.column('Close')))
+
+    def cumulative_change(self, window):
+        """
+        :return: Somma delle variazioni percentuali sugli ultimi window periodi.
+        """
+        return self._get(('cumulative_change', window), lambda: indicators.rolling_sum(self.pct_change(), window))
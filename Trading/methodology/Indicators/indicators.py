@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+
+
+def as_array(values):
+    """
+    Converte una serie, una colonna di DataFrame o un array in un ndarray float64.
+    Se i dati sono già float64 non viene fatta nessuna copia.
+    :param values: pd.Series, ndarray 1-D (una serie) o 2-D (un ticker per riga, date sulle colonne).
+    :return: ndarray float64 con il tempo sull'ultimo asse.
+    """
+    if hasattr(values, 'to_numpy'):
+        return values.to_numpy(dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _shift(values, periods=1):
+    shifted = np.full_like(values, np.nan)
+    shifted[..., periods:] = values[..., :-periods]
+    return shifted
+
+
+def _diff(values):
+    return values - _shift(values)
+
+
+def _by_columns(values, kernel):
+    # I kernel a finestra di pandas lavorano colonna per colonna: il tempo va sulle righe
+    if values.size == 0:
+        return np.full(values.shape, np.nan)
+    rows = values.reshape(-1, values.shape[-1])
+    result = kernel(pd.DataFrame(rows.T)).to_numpy(dtype=np.float64).T
+    return result.reshape(values.shape)
+
+
+def sma(values, window, min_periods=None):
+    """
+    Media mobile semplice, equivalente a Series.rolling(window, min_periods).mean().
+    :param values: Serie o array 1-D/2-D dei prezzi.
+    :param window: Numero di periodi della media.
+    :param min_periods: Minimo di valori validi nella finestra (default window).
+    :return: ndarray della stessa forma dell'input.
+    """
+    return _by_columns(as_array(values), lambda frame: frame.rolling(window, min_periods=min_periods).mean())
+
+
+def rolling_sum(values, window):
+    """
+    Somma mobile, equivalente a Series.rolling(window).sum().
+    :param values: Serie o array 1-D/2-D.
+    :param window: Numero di periodi.
+    :return: ndarray della stessa forma dell'input.
+    """
+    return _by_columns(as_array(values), lambda frame: frame.rolling(window).sum())
+
+
+def pct_change(values):
+    """
+    Variazione percentuale rispetto al periodo precedente, equivalente a Series.pct_change().
+    :return: ndarray della stessa forma dell'input, NaN sul primo periodo.
+    """
+    values = as_array(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return values / _shift(values) - 1
+
+
+def rolling_std(values, window, ddof=1):
+    """
+    Deviazione standard mobile, equivalente a Series.rolling(window).std().
+    :param values: Serie o array 1-D/2-D.
+    :param window: Numero di periodi.
+    :param ddof: Gradi di libertà sottratti al denominatore.
+    :return: ndarray della stessa forma dell'input.
+    """
+    return _by_columns(as_array(values), lambda frame: frame.rolling(window).std(ddof=ddof))
+
+
+def rolling_max(values, window):
+    """
+    Massimo mobile, equivalente a Series.rolling(window).max().
+    :return: ndarray della stessa forma dell'input.
+    """
+    return _by_columns(as_array(values), lambda frame: frame.rolling(window).max())
+
+
+def rolling_min(values, window):
+    """
+    Minimo mobile, equivalente a Series.rolling(window).min().
+    :return: ndarray della stessa forma dell'input.
+    """
+    return _by_columns(as_array(values), lambda frame: frame.rolling(window).min())
+
+
+def ema(values, span):
+    """
+    Media mobile esponenziale, equivalente a Series.ewm(span=span, adjust=False).mean():
+    i NaN iniziali restano NaN, quelli intermedi mantengono l'ultimo valore.
+    :param values: Serie o array 1-D/2-D.
+    :param span: Periodo della media (alpha = 2 / (span + 1)).
+    :return: ndarray della stessa forma dell'input.
+    """
+    return _by_columns(as_array(values), lambda frame: frame.ewm(span=span, adjust=False).mean())
+
+
+def rsi(close, window=14):
+    """
+    Relative Strength Index con medie mobili semplici di guadagni e perdite.
+    :param close: Serie o array dei prezzi di chiusura.
+    :param window: Numero di periodi.
+    :return: ndarray dei valori RSI (0-100).
+    """
+    delta = _diff(as_array(close))
+    with np.errstate(invalid='ignore'):
+        gain = sma(np.where(delta > 0, delta, 0.0), window)
+        loss = sma(np.where(delta < 0, -delta, 0.0), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def macd(close, span_short=12, span_long=26, span_signal=9):
+    """
+    Moving Average Convergence Divergence.
+    :param close: Serie o array dei prezzi di chiusura.
+    :param span_short: Periodo della EMA breve.
+    :param span_long: Periodo della EMA lunga.
+    :param span_signal: Periodo della EMA della linea di segnale.
+    :return: Tupla (linea MACD, linea di segnale).
+    """
+    close = as_array(close)
+    macd_line = ema(close, span_short) - ema(close, span_long)
+    return macd_line, ema(macd_line, span_signal)
+
+
+def true_range(high, low, close):
+    """
+    True range: massimo tra High - Low e le distanze di High e Low dalla chiusura precedente.
+    Sulla prima barra vale High - Low.
+    :return: ndarray della stessa forma dell'input.
+    """
+    high, low = as_array(high), as_array(low)
+    previous_close = _shift(as_array(close))
+    return np.fmax(np.fmax(np.abs(high - low), np.abs(high - previous_close)), np.abs(low - previous_close))
+
+
+def atr(high, low, close, window=14):
+    """
+    Average True Range come media mobile semplice del true range.
+    :param window: Numero di periodi.
+    :return: ndarray della stessa forma dell'input.
+    """
+    return sma(true_range(high, low, close), window)
+
+
+def bollinger_bands(close, window=20, num_std_dev=2):
+    """
+    Bande di Bollinger.
+    :param close: Serie o array dei prezzi di chiusura.
+    :param window: Numero di periodi della media e della deviazione standard.
+    :param num_std_dev: Numero di deviazioni standard delle bande.
+    :return: Tupla (media mobile, banda superiore, banda inferiore).
+    """
+    close = as_array(close)
+    middle = sma(close, window)
+    deviation = rolling_std(close, window) * num_std_dev
+    return middle, middle + deviation, middle - deviation
+
+
+def wilder_average(values, window):
+    """
+    Media di Wilder (RMA): la prima media è semplice sui primi window valori, poi
+    media esponenziale con alpha = 1 / window.
+    :param values: Serie o array 1-D/2-D.
+    :param window: Numero di periodi.
+    :return: ndarray della stessa forma dell'input.
+    """
+    values = as_array(values)
+    seed = sma(values, window)
+    rows, seed_rows = values.reshape(-1, values.shape[-1]), seed.reshape(-1, values.shape[-1])
+    seeded = np.full_like(rows, np.nan)
+    has_seed = ~np.isnan(seed_rows)
+    for row in np.flatnonzero(has_seed.any(axis=1)):
+        # Prima media completa di ogni ticker, che può entrare nell'universo in date diverse
+        first = int(np.argmax(has_seed[row]))
+        seeded[row, first] = seed_rows[row, first]
+        seeded[row, first + 1:] = rows[row, first + 1:]
+    return _by_columns(seeded, lambda frame: frame.ewm(alpha=1.0 / window, adjust=False).mean()).reshape(values.shape)
+
+
+def adx(high, low, close, window=14, method='rolling'):
+    """
+    Average Directional Index e indicatori direzionali.
+    method='rolling' riproduce il calcolo storico di TrendMovementAnalyzer: +DM e -DM dalle
+    differenze di High e Low (con il segno di Low.diff()), medie mobili semplici su window periodi.
+    method='wilder' è la versione classica: -DM dal calo dei minimi e medie di Wilder.
+    :param window: Numero di periodi.
+    :param method: 'rolling' o 'wilder'.
+    :return: Tupla (ADX in percentuale, +DI, -DI) con gli indicatori direzionali come rapporto rispetto al true range.
+    """
+    high, low = as_array(high), as_array(low)
+    up_move = _diff(high)
+    with np.errstate(invalid='ignore'):
+        if method == 'rolling':
+            low_diff = _diff(low)
+            plus_dm = np.where((up_move > low_diff) & (up_move > 0), up_move, 0.0)
+            # Come nel calcolo originale, -DM viene confrontato con +DM già filtrato
+            minus_dm = np.where((low_diff > plus_dm) & (low_diff > 0), -low_diff, 0.0)
+            average = sma
+        elif method == 'wilder':
+            down_move = -_diff(low)
+            plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+            minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+            average = wilder_average
+        else:
+            raise ValueError("Invalid ADX method. Choose 'rolling' or 'wilder'.")
+
+    average_range = average(true_range(high, low, close), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        plus_di = average(plus_dm, window) / average_range
+        minus_di = average(minus_dm, window) / average_range
+        dx = np.abs(plus_di - minus_di) / (plus_di + minus_di) * 100
+    return average(dx, window), plus_di, minus_di
@@ -0,0 +1,485 @@
+import os
+import json
+import math
+import threading
+from collections import deque
+import pandas as pd
+
+INDICATOR_STATE_DIR = "_indicators"
+# Ogni quanti aggiornamenti le somme mobili vengono ricalcolate dalla finestra per non accumulare errori
+RESYNC_EVERY = 1000
+
+NAN = float('nan')
+
+
+def _finite(value):
+    return value is not None and math.isfinite(value)
+
+
+class StreamingIndicator:
+    """
+    Indicatore incrementale: update() riceve un nuovo valore e restituisce l'indicatore aggiornato
+    in tempo costante. Lo stato è serializzabile in json con to_dict() / from_dict().
+    """
+    def to_dict(self):
+        state = {}
+        for name, value in self.__dict__.items():
+            if isinstance(value, StreamingIndicator):
+                state[name] = value.to_dict()
+            elif isinstance(value, deque):
+                state[name] = {'deque': list(value), 'maxlen': value.maxlen}
+            else:
+                state[name] = value
+        return {'type': type(self).__name__, 'state': state}
+
+    @staticmethod
+    def from_dict(data):
+        cls = STREAMING_TYPES[data['type']]
+        indicator = cls.__new__(cls)
+        for name, value in data['state'].items():
+            if isinstance(value, dict) and 'type' in value:
+                value = StreamingIndicator.from_dict(value)
+            elif isinstance(value, dict) and 'deque' in value:
+                value = deque(value['deque'], maxlen=value['maxlen'])
+            elif isinstance(value, list):
+                value = tuple(value)
+            setattr(indicator, name, value)
+        return indicator
+
+
+class RollingMean(StreamingIndicator):
+    """
+    Media mobile semplice su window valori (come Series.rolling(window).mean()).
+    """
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.count = 0
+        self.updates = 0
+        self.value = NAN
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            removed = self.values[0]
+            if _finite(removed):
+                self.total -= removed
+                self.count -= 1
+        self.values.append(x)
+        if _finite(x):
+            self.total += x
+            self.count += 1
+
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self.total = math.fsum(v for v in self.values if _finite(v))
+        self.value = self.total / self.count if self.count == self.window else NAN
+        return self.value
+
+
+class RollingSum(RollingMean):
+    """
+    Somma mobile su window valori (come Series.rolling(window).sum()).
+    """
+    def update(self, x):
+        super().update(x)
+        self.value = self.total if self.count == self.window else NAN
+        return self.value
+
+
+class RollingStd(StreamingIndicator):
+    """
+    Deviazione standard mobile tramite momenti (somma e somma dei quadrati) aggiornati a ogni valore.
+    I momenti sono calcolati rispetto a uno spostamento vicino ai valori della finestra, così la
+    differenza tra somma dei quadrati e quadrato della somma non perde precisione.
+    """
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque(maxlen=window)
+        self.shift = None
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.count = 0
+        self.updates = 0
+        self.value = NAN
+
+    def _resync(self):
+        finite = [v for v in self.values if _finite(v)]
+        self.shift = finite[-1] if finite else None
+        self.count = len(finite)
+        self.sum = math.fsum(v - self.shift for v in finite) if finite else 0.0
+        self.sum_squares = math.fsum((v - self.shift) ** 2 for v in finite) if finite else 0.0
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            removed = self.values[0]
+            if _finite(removed):
+                self.sum -= removed - self.shift
+                self.sum_squares -= (removed - self.shift) ** 2
+                self.count -= 1
+        self.values.append(x)
+        if _finite(x):
+            if self.shift is None:
+                self.shift = x
+            self.sum += x - self.shift
+            self.sum_squares += (x - self.shift) ** 2
+            self.count += 1
+
+        self.updates += 1
+        if self.updates % self.window == 0:
+            # Lo spostamento segue i prezzi: la finestra viene ricalcolata ogni window valori
+            self._resync()
+        if self.count != self.window or self.count <= self.ddof:
+            self.value = NAN
+        else:
+            variance = (self.sum_squares - self.sum * self.sum / self.count) / (self.count - self.ddof)
+            self.value = math.sqrt(max(variance, 0.0))
+        return self.value
+
+
+class EMA(StreamingIndicator):
+    """
+    Media mobile esponenziale (come Series.ewm(span=span, adjust=False).mean(), o alpha esplicito).
+    """
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.value = NAN
+
+    def update(self, x):
+        if _finite(x):
+            self.value = x if not _finite(self.value) else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class WilderAverage(StreamingIndicator):
+    """
+    Media di Wilder: media semplice dei primi window valori, poi EMA con alpha = 1 / window.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.seed = RollingMean(window)
+        self.value = NAN
+
+    def update(self, x):
+        if not _finite(self.value):
+            self.value = self.seed.update(x)
+        elif _finite(x):
+            self.value += (x - self.value) / self.window
+        return self.value
+
+
+def _average(method, window):
+    if method == 'rolling':
+        return RollingMean(window)
+    if method == 'wilder':
+        return WilderAverage(window)
+    raise ValueError("Invalid method. Choose 'rolling' or 'wilder'.")
+
+
+class RSI(StreamingIndicator):
+    """
+    RSI con medie mobili semplici di guadagni e perdite, come indicators.rsi.
+    """
+    def __init__(self, window=14):
+        self.gain = RollingMean(window)
+        self.loss = RollingMean(window)
+        self.previous_close = NAN
+        self.value = NAN
+
+    def update(self, close):
+        delta = close - self.previous_close if _finite(self.previous_close) else NAN
+        self.previous_close = close
+        gain = self.gain.update(delta if _finite(delta) and delta > 0 else 0.0)
+        loss = self.loss.update(-delta if _finite(delta) and delta < 0 else 0.0)
+        if not (_finite(gain) and _finite(loss)) or (gain == 0 and loss == 0):
+            self.value = NAN
+        else:
+            self.value = 100.0 if loss == 0 else 100 - (100 / (1 + gain / loss))
+        return self.value
+
+
+class MACD(StreamingIndicator):
+    """
+    MACD: differenza tra EMA breve e lunga e sua EMA come linea di segnale.
+    """
+    def __init__(self, span_short=12, span_long=26, span_signal=9):
+        self.short = EMA(span_short)
+        self.long = EMA(span_long)
+        self.signal = EMA(span_signal)
+        self.value = (NAN, NAN)
+
+    def update(self, close):
+        line = self.short.update(close) - self.long.update(close)
+        self.value = (line, self.signal.update(line))
+        return self.value
+
+
+class BollingerBands(StreamingIndicator):
+    """
+    Bande di Bollinger: (media mobile, banda superiore, banda inferiore).
+    """
+    def __init__(self, window=20, num_std_dev=2):
+        self.num_std_dev = num_std_dev
+        self.mean = RollingMean(window)
+        self.std = RollingStd(window)
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, close):
+        middle = self.mean.update(close)
+        deviation = self.std.update(close) * self.num_std_dev
+        self.value = (middle, middle + deviation, middle - deviation)
+        return self.value
+
+
+class TrueRange(StreamingIndicator):
+    def __init__(self):
+        self.previous_close = NAN
+
+    def update(self, high, low, close):
+        ranges = [abs(high - low)]
+        if _finite(self.previous_close):
+            ranges += [abs(high - self.previous_close), abs(low - self.previous_close)]
+        self.previous_close = close
+        return max(ranges)
+
+
+class ATR(StreamingIndicator):
+    """
+    Average True Range con media mobile semplice ('rolling', come indicators.atr) o di Wilder.
+    """
+    def __init__(self, window=14, method='wilder'):
+        self.true_range = TrueRange()
+        self.average = _average(method, window)
+        self.value = NAN
+
+    def update(self, high, low, close):
+        self.value = self.average.update(self.true_range.update(high, low, close))
+        return self.value
+
+
+class ADX(StreamingIndicator):
+    """
+    ADX e indicatori direzionali, con le stesse regole di indicators.adx per i due metodi.
+    Il valore è la tupla (ADX, +DI, -DI).
+    """
+    def __init__(self, window=14, method='wilder'):
+        self.method = method
+        self.true_range = TrueRange()
+        self.average_range = _average(method, window)
+        self.average_plus = _average(method, window)
+        self.average_minus = _average(method, window)
+        self.average_dx = _average(method, window)
+        self.previous_high = NAN
+        self.previous_low = NAN
+        self.value = (NAN, NAN, NAN)
+
+    def _directional_moves(self, high, low):
+        up_move = high - self.previous_high
+        if not _finite(up_move):
+            return 0.0, 0.0
+        if self.method == 'rolling':
+            low_diff = low - self.previous_low
+            plus_dm = up_move if up_move > low_diff and up_move > 0 else 0.0
+            return plus_dm, -low_diff if low_diff > plus_dm and low_diff > 0 else 0.0
+        down_move = self.previous_low - low
+        return (up_move if up_move > down_move and up_move > 0 else 0.0,
+                down_move if down_move > up_move and down_move > 0 else 0.0)
+
+    def update(self, high, low, close):
+        plus_dm, minus_dm = self._directional_moves(high, low)
+        self.previous_high, self.previous_low = high, low
+        average_range = self.average_range.update(self.true_range.update(high, low, close))
+        plus_average = self.average_plus.update(plus_dm)
+        minus_average = self.average_minus.update(minus_dm)
+        if _finite(average_range) and average_range != 0 and _finite(plus_average) and _finite(minus_average):
+            plus_di, minus_di = plus_average / average_range, minus_average / average_range
+        else:
+            plus_di = minus_di = NAN
+        denominator = plus_di + minus_di
+        dx = abs(plus_di - minus_di) / denominator * 100 if _finite(denominator) and denominator != 0 else NAN
+        self.value = (self.average_dx.update(dx), plus_di, minus_di)
+        return self.value
+
+
+STREAMING_TYPES = {cls.__name__: cls for cls in (RollingMean, RollingSum, RollingStd, EMA, WilderAverage, RSI, MACD,
+                                                 BollingerBands, TrueRange, ATR, ADX)}
+
+# Indicatori mantenuti per ogni ticker: nome -> (tipo, parametri)
+DEFAULT_INDICATORS = {
+    'SMA_20': ('RollingMean', {'window': 20}),
+    'SMA_50': ('RollingMean', {'window': 50}),
+    'SMA_200': ('RollingMean', {'window': 200}),
+    'EMA_20': ('EMA', {'span': 20}),
+    'RSI_14': ('RSI', {'window': 14}),
+    'MACD': ('MACD', {}),
+    'Bollinger_20': ('BollingerBands', {'window': 20, 'num_std_dev': 2}),
+    'ATR_14': ('ATR', {'window': 14, 'method': 'wilder'}),
+    'ADX_14': ('ADX', {'window': 14, 'method': 'wilder'}),
+}
+# Indicatori calcolati sui massimi e minimi oltre che sulla chiusura
+_OHLC_TYPES = (ATR, ADX)
+
+
+class TickerIndicators:
+    """
+    Stato incrementale degli indicatori di un ticker, avanzato una barra alla volta.
+    # Esempio d'uso:
+    # state = TickerIndicators()
+    # state.feed(df)                 # storico completo, una sola volta
+    # state.feed(new_rows)           # solo le nuove barre
+    # state.values()['RSI_14']
+    """
+    def __init__(self, spec=None):
+        """
+        :param spec: Dizionario {nome: (tipo, parametri)} degli indicatori (default DEFAULT_INDICATORS).
+        """
+        spec = DEFAULT_INDICATORS if spec is None else spec
+        self.indicators = {name: STREAMING_TYPES[kind](**params) for name, (kind, params) in spec.items()}
+        self.last_date = None
+
+    def update(self, date, high, low, close):
+        for indicator in self.indicators.values():
+            if isinstance(indicator, _OHLC_TYPES):
+                indicator.update(high, low, close)
+            else:
+                indicator.update(close)
+        self.last_date = pd.Timestamp(date).strftime('%Y-%m-%d')
+
+    def feed(self, df):
+        """
+        Avanza lo stato con le barre del DataFrame successive all'ultima data elaborata.
+        :param df: DataFrame con colonne 'High', 'Low', 'Close' e indice datetime.
+        :return: Numero di barre elaborate.
+        """
+        if self.last_date is not None:
+            df = df[df.index > pd.Timestamp(self.last_date)]
+        for date, high, low, close in zip(df.index, df['High'].tolist(), df['Low'].tolist(), df['Close'].tolist()):
+            self.update(date, high, low, close)
+        return len(df)
+
+    def values(self):
+        """
+        :return: Dizionario {nome: valore corrente} (tuple per MACD, bande e ADX).
+        """
+        return {name: indicator.value for name, indicator in self.indicators.items()}
+
+    def to_dict(self):
+        return {'last_date': self.last_date,
+                'indicators': {name: indicator.to_dict() for name, indicator in self.indicators.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls.__new__(cls)
+        state.last_date = data['last_date']
+        state.indicators = {name: StreamingIndicator.from_dict(indicator)
+                            for name, indicator in data['indicators'].items()}
+        return state
+
+
+class IndicatorStateStore:
+    """
+    Stato incrementale degli indicatori dei ticker di una partizione, salvato in un file per ticker
+    (_indicators/<ticker>.json) accanto ai dati dello snapshot: si leggono e si riscrivono solo i
+    ticker usati. Dopo un aggiornamento giornaliero ogni ticker viene avanzato solo con le barre
+    nuove; se lo stato non è allineato allo storico (primo utilizzo o nuovo snapshot) viene
+    ricostruito una volta dallo storico completo.
+    # Esempio d'uso:
+    # states = IndicatorStateStore(PriceStore(index="SP500"))
+    # states.values("AAPL")['SMA_50']
+    """
+    def __init__(self, store, spec=None):
+        """
+        :param store: PriceStore della partizione.
+        :param spec: Indicatori da mantenere (default DEFAULT_INDICATORS).
+        """
+        self.store = store
+        self.spec = spec
+        # Stati in memoria e cartella da cui sono stati letti
+        self._states = {}
+        self._dirty = set()
+        self._source = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """
+        Cartella degli stati nello snapshot corrente, risolta a ogni accesso come PriceStore.data_path.
+        """
+        return os.path.join(self.store.data_path, INDICATOR_STATE_DIR)
+
+    def _sync(self):
+        # Chiamato con il lock: dopo la pubblicazione di un nuovo snapshot gli stati in memoria non valgono più
+        path = self.path
+        if self._source != path:
+            self._states, self._dirty, self._source = {}, set(), path
+        return path
+
+    def get(self, ticker):
+        """
+        :return: TickerIndicators del ticker oppure None.
+        """
+        with self._lock:
+            path = self._sync()
+            if ticker in self._states:
+                return self._states[ticker]
+        try:
+            with open(os.path.join(path, f"{ticker}.json"), 'r') as file:
+                state = TickerIndicators.from_dict(json.load(file))
+        except FileNotFoundError:
+            state = None
+        with self._lock:
+            return self._states.setdefault(ticker, state)
+
+    def values(self, ticker):
+        state = self.get(ticker)
+        return state.values() if state is not None else None
+
+    def rebuild(self, ticker, df=None):
+        """
+        Ricostruisce lo stato di un ticker da tutto il suo storico.
+        :param df: Storico già in memoria, al posto della lettura dall'archivio.
+        :return: TickerIndicators.
+        """
+        state = TickerIndicators(self.spec)
+        if df is None and self.store.exists(ticker):
+            df = self.store.read(ticker, columns=['High', 'Low', 'Close'])
+        if df is not None:
+            state.feed(df)
+        with self._lock:
+            self._sync()
+            self._states[ticker] = state
+            self._dirty.add(ticker)
+        return state
+
+    def advance(self, ticker, new_rows, synced_at):
+        """
+        Avanza lo stato di un ticker con le barre appena aggiunte allo storico.
+        :param new_rows: DataFrame con le nuove barre.
+        :param synced_at: Ultima data dello storico prima dell'aggiunta (None se non c'era storico).
+        :return: TickerIndicators.
+        """
+        state = self.get(ticker)
+        if state is None or synced_at is None or state.last_date != pd.Timestamp(synced_at).strftime('%Y-%m-%d'):
+            return self.rebuild(ticker)
+        state.feed(new_rows)
+        with self._lock:
+            self._sync()
+            if self._states.get(ticker) is state:
+                self._dirty.add(ticker)
+        return state
+
+    def save(self):
+        """
+        Salva lo stato dei soli ticker ricostruiti o avanzati (scrittura atomica di ogni file).
+        """
+        with self._lock:
+            folder = self._sync()
+            data = {ticker: self._states[ticker].to_dict() for ticker in self._dirty}
+            self._dirty = set()
+        os.makedirs(folder, exist_ok=True)
+        for ticker, state in data.items():
+            path = os.path.join(folder, f"{ticker}.json")
+            with open(f"{path}.tmp", 'w') as file:
+                json.dump(state, file)
+            os.replace(f"{path}.tmp", path)
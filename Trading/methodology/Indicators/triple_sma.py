@@ -1,6 +1,8 @@
 import pandas as pd
 import json
 import numpy as np
+from Trading.methodology.data_store.price_store import PriceStore
+from Trading.methodology.Indicators.indicators import sma
 
 class EnhancedMovingAverageCrossoverStrategy:
     def __init__(self, params):
@@ -38,9 +40,9 @@ class EnhancedMovingAverageCrossoverStrategy:
         signals['signal'] = 0.0
 
         # Calculate moving averages
-        signals['short_mavg'] = data['Close'].rolling(window=self.short_window, min_periods=1).mean()
-        signals['long_mavg'] = data['Close'].rolling(window=self.long_window, min_periods=1).mean()
-        signals['extra_mavg'] = data['Close'].rolling(window=self.extra_window, min_periods=1).mean()
+        signals['short_mavg'] = sma(data['Close'], self.short_window, min_periods=1)
+        signals['long_mavg'] = sma(data['Close'], self.long_window, min_periods=1)
+        signals['extra_mavg'] = sma(data['Close'], self.extra_window, min_periods=1)
 
         # Create signals with an additional filter
         signals['signal'][self.short_window:] = np.where((signals['short_mavg'][self.short_window:] > signals['long_mavg'][self.short_window:]) & 
@@ -75,7 +77,8 @@ with open("json_files/SP500-stock.json", 'r') as file:
     
 enhanced_strategy = EnhancedMovingAverageCrossoverStrategy(parameters_dict)
 
+price_store = PriceStore(index="SP500", interval='1d')
 for item in tickers_list:
-    data = pd.read_csv(f"Trading/Data/Daily/{item}_historical_data.csv")
+    data = price_store.read(item)
     enhanced_signals = enhanced_strategy.apply_strategy(data)
     print(enhanced_signals.tail())  # Display the last few rows to see the signals and adjusted prices
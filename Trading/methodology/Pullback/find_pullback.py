@@ -1,4 +1,6 @@
 import pandas as pd
+import numpy as np
+from Trading.methodology.Indicators.indicators import sma
 
 class PullbackFinder:
     def __init__(self, df, short_window=50, long_window=200):
@@ -7,19 +9,19 @@ class PullbackFinder:
         self.long_window = long_window
 
     def calculate_moving_averages(self):
-        self.df['Short_MA'] = self.df['Close'].rolling(window=self.short_window).mean()
-        self.df['Long_MA'] = self.df['Close'].rolling(window=self.long_window).mean()
+        self.df['Short_MA'] = sma(self.df['Close'], self.short_window)
+        self.df['Long_MA'] = sma(self.df['Close'], self.long_window)
 
     def find_pullbacks(self):
         self.calculate_moving_averages()
 
         # Identifica i pullbacks
-        pullbacks = []
-        for i in range(1, len(self.df)):
-            if (self.df['Short_MA'].iloc[i-1] > self.df['Long_MA'].iloc[i-1] and
-                self.df['Close'].iloc[i] < self.df['Short_MA'].iloc[i] and
-                self.df['Close'].iloc[i-1] > self.df['Short_MA'].iloc[i-1]):
-                pullbacks.append(i)
+        close = self.df['Close'].to_numpy()
+        short_ma = self.df['Short_MA'].to_numpy()
+        long_ma = self.df['Long_MA'].to_numpy()
+        pullbacks = np.flatnonzero((short_ma[:-1] > long_ma[:-1]) &
+                                   (close[1:] < short_ma[1:]) &
+                                   (close[:-1] > short_ma[:-1])) + 1
 
         return self.df.iloc[pullbacks]
 
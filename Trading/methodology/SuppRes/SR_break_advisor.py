@@ -1,26 +1,35 @@
+import numpy as np
 import pandas as pd
 from Reports.image_builder import CandlestickChartGenerator
+from Trading.methodology.data_store.repository import get_repository
+from Trading.methodology.SuppRes.level_index import get_level_index
 
 class StockBreakAnalyzer:
-    def __init__(self, data, max_price=None):
+    def __init__(self, data, max_price=None, index="SP500"):
         self.stock_name = data
         self.max_price = max_price
-        self.data = pd.read_csv(f'Trading/Data/Daily/{data}_historical_data.csv')
-        self.support_resistance_data = pd.read_csv(f'Trading/Data/SuppResist/{data}_SR.csv', skiprows=1, header=None, names=['Level', 'Weight']).set_index('Level')['Weight'].to_dict()
+        self.data = get_repository().frame(data, index=index, columns=['Open', 'High', 'Low', 'Close'])
+        level_index = get_level_index()
+        if data in level_index:
+            self.support_resistance_data = level_index.levels_for(data)
+        else:
+            self.support_resistance_data = pd.read_csv(f'Trading/Data/SuppResist/{data}_SR.csv', skiprows=1, header=None, names=['Level', 'Weight']).set_index('Level')['Weight'].to_dict()
         self.image = CandlestickChartGenerator(self.data)
 
+    def _level_arrays(self):
+        levels = np.fromiter(self.support_resistance_data.keys(), dtype=np.float64, count=len(self.support_resistance_data))
+        weights = np.fromiter(self.support_resistance_data.values(), dtype=np.float64, count=len(self.support_resistance_data))
+        if self.max_price is not None:
+            keep = levels <= self.max_price  # Ignora i livelli oltre il prezzo massimo
+            levels, weights = levels[keep], weights[keep]
+        return levels, weights
+
     def _analyze_last_price(self, threshold=0.02):
         last_price = self.data['Close'].iloc[-1]
-        near_levels = []
-
-        for level, weight in self.support_resistance_data.items():
-            if self.max_price is not None and level > self.max_price:
-                continue  # Ignora i livelli oltre il prezzo massimo
-            
-            if abs(last_price - level) / level <= threshold:
-                near_levels.append((level, 'Support' if last_price > level else 'Resistance', weight))
-
-        return near_levels
+        levels, weights = self._level_arrays()
+        near = np.abs(last_price - levels) / levels <= threshold
+        return [(level, 'Support' if last_price > level else 'Resistance', weight)
+                for level, weight in zip(levels[near].tolist(), weights[near].tolist())]
 
     def alert_near_levels(self):
         print(f"checking stock {self.stock_name}")
@@ -35,18 +44,11 @@ class StockBreakAnalyzer:
         return content, image, self.data
     
     def _check_level_break(self, sessions=2):
-        last_closes = self.data['Close'].iloc[-sessions:]
-        breaks = []
-
-        for level, weight in self.support_resistance_data.items():
-            if self.max_price is not None and level > self.max_price:
-                continue  # Ignora i livelli oltre il prezzo massimo
-
-            if any(last_closes > level) and any(last_closes < level):
-                level_type = 'Support' if last_closes.iloc[-1] > level else 'Resistance'
-                breaks.append((level, level_type, weight))
-
-        return breaks
+        last_closes = self.data['Close'].iloc[-sessions:].to_numpy()
+        levels, weights = self._level_arrays()
+        broken = (last_closes.max() > levels) & (last_closes.min() < levels)
+        return [(level, 'Support' if last_closes[-1] > level else 'Resistance', weight)
+                for level, weight in zip(levels[broken].tolist(), weights[broken].tolist())]
 
     def alert_break_level(self):
         print(f"checking stock {self.stock_name}")
@@ -64,3 +66,17 @@ class StockBreakAnalyzer:
         self.image.clear_temp_files()
 
 
+
+
+def chart_level(ticker, data, levels, action="break"):
+    """
+    Analyzer per run_scan: commento e grafico dell'ultimo livello trovato per il ticker.
+    :param levels: Dizionario {ticker: (livello, tipo, peso)}.
+    :param action: "break" o "near".
+    :return: Dict con 'content' e 'image', oppure None se il grafico non è stato creato.
+    """
+    level, level_type, weight = levels[ticker]
+    image = CandlestickChartGenerator(data).create_chart_with_horizontal_lines(lines=[level], max_points=30)
+    if image is None:
+        return None
+    return {'content': f"Alert: Price {action} {level_type} level at {level} with weight {weight}", 'image': image}
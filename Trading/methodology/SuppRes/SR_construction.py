@@ -1,48 +1,37 @@
 import pandas as pd
 import numpy as np
 import os
+from Trading.methodology.data_store.price_store import PriceStore
+from Trading.methodology.data_store.resample import resample_ohlcv
+from Trading.methodology.Indicators.indicators import sma
+from Trading.methodology.SuppRes.pivots import find_pivots, cluster_levels, count_contacts
 
-class StockAnalysis:
-    def __init__(self, csv_file, interval='1d'):
-        self.interval = interval
-        data_path = 'Trading/Data/'
+# Peso relativo dei livelli di ciascun timeframe quando vengono uniti
+TIMEFRAME_WEIGHTS = {'1d': 1, '1wk': 2, '1mo': 3}
 
-        if interval == '1d':
-            data_path += 'Daily/'
-        elif interval == '1wk':
-            data_path += 'Weekly/'
-        else:
-            raise ValueError("Invalid interval. Choose '1d' for daily or '1wk' for weekly data.")
 
-        self.data = pd.read_csv(f'{data_path}{csv_file}_historical_data.csv')
+class StockAnalysis:
+    def __init__(self, csv_file, interval='1d', index="SP500", base_path=None, directory='Trading/Data/SuppResist',
+                 timeframes=None):
+        """
+        :param csv_file: Ticker del titolo.
+        :param interval: Intervallo dei dati letti dall'archivio.
+        :param timeframes: Se indicato (ad esempio ('1d', '1wk', '1mo')) i livelli vengono calcolati su ogni
+                           timeframe, ricavando in memoria le barre settimanali e mensili da quelle giornaliere,
+                           e uniti in un solo insieme pesato.
+        """
+        self.interval = interval
+        self.timeframes = tuple(timeframes) if timeframes else None
+        self.data = PriceStore(index=index, interval=interval, base_path=base_path).read(csv_file)
         self.support_resistance_levels = {}
-        self.filepath = f'Trading/Data/SuppResist/{csv_file}_SR.csv'
+        self.filepath = f'{directory}/{csv_file}_SR.csv'
 
         # Assicurati che la cartella esista per il file di output
         os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
 
     def _identify_pivots(self, close_prices, thresholds=(25, 50, 75), days=(7, 5, 3)):
-        pivots = []
-        for i in range(max(days), len(close_prices) - max(days)):
-            # Determinare il numero di giorni da considerare in base al prezzo
-            if close_prices.iloc[i] < thresholds[0]:
-                day_range = days[0]
-            elif close_prices.iloc[i] < thresholds[1]:
-                day_range = days[1]
-            elif close_prices.iloc[i] < thresholds[2]:
-                day_range = days[2]
-            else:
-                day_range = days[-1]  # Usa 3 giorni per prezzi superiori a 75
-
-            max_range = close_prices[i-day_range:i+day_range+1]
-            min_range = close_prices[i-day_range:i+day_range+1]
-
-            if close_prices.iloc[i] == max_range.max():
-                pivots.append(close_prices.iloc[i])
-            elif close_prices.iloc[i] == min_range.min():
-                pivots.append(close_prices.iloc[i])
-        
-        return pivots
+        _, pivots = find_pivots(close_prices, thresholds, days)
+        return pivots.tolist()
     
     def _round_to_nearest(self, value, tick_size):
         # Arrotonda il valore al multiplo di tick_size più vicino
@@ -71,64 +60,79 @@ class StockAnalysis:
         # return normalized_pivots
         # Raggruppamento dei Pivot Vicini
     def _group_and_normalize_pivots(self, pivots, close_prices):
-        pivot_groups = {}
-        for pivot in pivots:
-            found_group = False
-            for key in pivot_groups.keys():
-                if abs(pivot - key) / key < 0.01:  # Ad esempio, 1% di differenza
-                    pivot_groups[key].append(pivot)
-                    found_group = True
-                    break
-            if not found_group:
-                pivot_groups[pivot] = [pivot]
-
-        # Calcolare la Frequenza di Contatto
-        contact_freq = {k: 0 for k in pivot_groups}
-        for price in close_prices:
-            for pivot in pivot_groups:
-                if abs(price - pivot) / pivot < 0.01:  # Utilizzando la stessa soglia di percentuale
-                    contact_freq[pivot] += 1
+        if len(pivots) == 0:
+            return {}
+        # Raggruppamento dei Pivot Vicini (entro l'1% dal primo pivot del gruppo)
+        labels, keys = cluster_levels(pivots, tolerance=0.01)
+
+        # Calcolare la Frequenza di Contatto, utilizzando la stessa soglia di percentuale
+        contact_freq = count_contacts(close_prices, keys, tolerance=0.01)
 
         # Calcolare i Pesi
-        max_freq = max(contact_freq.values())
-        pivot_weights = {self._round_to_nearest(np.mean(v), 0.5): contact_freq[k]/max_freq * 10 
-                         for k, v in pivot_groups.items()}
+        max_freq = contact_freq.max()
+        pivots = np.asarray(pivots, dtype=np.float64)
+        pivot_weights = {}
+        for group, key in enumerate(keys):
+            level = self._round_to_nearest(np.mean(pivots[labels == group]), 0.5)
+            pivot_weights[level] = contact_freq[group] / max_freq * 10
 
         return pivot_weights
     
 
-    def calculate_support_resistance(self):
+    def calculate_support_resistance(self, data=None):
+        """
+        :param data: Barre su cui calcolare i livelli (default self.data).
+        :return: Dizionario {livello: peso}.
+        """
+        data = self.data if data is None else data
         # Assicurarsi che i dati siano disponibili
-        if self.data.empty:
+        if data.empty:
             return
 
-        close_prices = self.data['Close']
-
-        # Identificazione dei Pivot
-        pivots = self._identify_pivots(close_prices)
-
-        # Raggruppamento e normalizzazione dei Pivot
-        # support_resistance_levels = self._group_and_normalize_pivots(pivots, close_prices)
-        
         # Calcolare la Media Mobile
         window_size = 20  # Ad esempio, una media mobile di 20 giorni
-        self.data['SMA'] = self.data['Close'].rolling(window=window_size).mean()
+        data['SMA'] = sma(data['Close'], window_size)
 
-        # Identificare i Pivot
-        pivots = self._identify_pivots(self.data['Close'])
+        # Identificare i Pivot, con la loro posizione nella serie
+        positions, pivots = find_pivots(data['Close'])
 
-        # Filtrare i Pivot in Base alla Media Mobile
-        filtered_pivots = []
-        for pivot in pivots:
-            pivot_index = self.data[self.data['Close'] == pivot].index[0]
-            if abs(pivot - self.data.loc[pivot_index, 'SMA']) / self.data.loc[pivot_index, 'SMA'] < 0.01:  # Ad esempio, entro l'1% della SMA
-                filtered_pivots.append(pivot)
+        # Filtrare i Pivot in Base alla Media Mobile, entro l'1% della SMA del giorno del pivot
+        pivot_sma = data['SMA'].to_numpy()[positions]
+        with np.errstate(invalid='ignore'):
+            near_sma = np.abs(pivots - pivot_sma) / pivot_sma < 0.01
+        filtered_pivots = pivots[near_sma]
 
         # Raggruppare e Normalizzare i Pivot
-        pivot_weights = self._group_and_normalize_pivots(filtered_pivots, self.data['Close'])
+        pivot_weights = self._group_and_normalize_pivots(filtered_pivots, data['Close'].to_numpy())
 
         return pivot_weights
 
+    def calculate_multi_timeframe(self, timeframes=('1d', '1wk', '1mo'), tolerance=0.01):
+        """
+        Livelli calcolati su più timeframe ricavati dalle barre giornaliere e uniti: i livelli entro
+        tolerance l'uno dall'altro diventano uno solo (il livello del timeframe più lungo) con la somma
+        dei pesi, moltiplicati per TIMEFRAME_WEIGHTS. I pesi finali sono riportati sulla scala 0-10.
+        :param timeframes: Timeframe da usare ('1d', '1wk', '1mo').
+        :param tolerance: Distanza relativa entro cui due livelli vengono uniti.
+        :return: Dizionario {livello: peso}.
+        """
+        if self.data.empty:
+            return {}
+        levels = []
+        weights = []
+        # Prima i timeframe più lunghi, così il loro livello fa da riferimento del gruppo
+        for timeframe in sorted(timeframes, key=lambda timeframe: -TIMEFRAME_WEIGHTS[timeframe]):
+            bars = self.data if timeframe == self.interval else resample_ohlcv(self.data, timeframe)
+            for level, weight in (self.calculate_support_resistance(bars) or {}).items():
+                levels.append(level)
+                weights.append(weight * TIMEFRAME_WEIGHTS[timeframe])
+        if not levels:
+            return {}
+
+        labels, keys = cluster_levels(levels, tolerance=tolerance)
+        merged = np.bincount(labels, weights=weights, minlength=len(keys))
+        return {level: weight for level, weight in zip(keys, (merged / merged.max() * 10).tolist())}
+
     def assign_weight(self, level):
         # Implementare la logica per calcolare il peso in base al numero di volte
         # in cui il livello è stato raggiunto
@@ -161,7 +165,10 @@ class StockAnalysis:
         return {overall_max: 10, overall_min: 10}
 
     def get_support_resistance_levels(self):
-        support_resistance_levels = self.calculate_support_resistance()
+        if self.timeframes:
+            support_resistance_levels = self.calculate_multi_timeframe(self.timeframes)
+        else:
+            support_resistance_levels = self.calculate_support_resistance() or {}
 
         # Aggiungere max e min
         max_min_levels = self.find_max_min()
@@ -175,12 +182,16 @@ class StockAnalysis:
         return ordered_levels
 
     def update_pivot_data(self):
+        """
+        Ricalcola i livelli e riscrive il file solo se sono cambiati.
+        :return: True se il file è stato scritto.
+        """
         # Calcolare i nuovi livelli di supporto e resistenza
         new_pivot_data = self.get_support_resistance_levels()
 
         try:
-            # Provare a leggere il file esistente
-            existing_data = pd.read_csv(self.filepath)
+            # Provare a leggere il file esistente (round_trip: stessi float scritti da to_csv)
+            existing_data = pd.read_csv(self.filepath, float_precision='round_trip')
 
             # Convertire i nuovi dati in un DataFrame per il confronto
             new_data_df = pd.DataFrame(new_pivot_data, columns=['Level', 'Weight'])
@@ -190,15 +201,18 @@ class StockAnalysis:
                 # Se ci sono nuovi dati, aggiornare il file
                 new_data_df.to_csv(self.filepath, index=False)
                 print(f"Pivot data updated in {self.filepath}")
-            else:
-                print("No new pivot data to update.")
+                return True
+            print("No new pivot data to update.")
+            return False
 
         except FileNotFoundError:
-            # Se il file non esiste, salvarlo per la prima volta
-            self.save_pivot_data(self.filepath)
+            # Se il file non esiste, salvarlo per la prima volta con i livelli appena calcolati
+            self.save_pivot_data(self.filepath, new_pivot_data)
+            return True
     
-    def save_pivot_data(self,csv_file_name):
-        support_resistance_levels = self.get_support_resistance_levels()
+    def save_pivot_data(self,csv_file_name, support_resistance_levels=None):
+        if support_resistance_levels is None:
+            support_resistance_levels = self.get_support_resistance_levels()
         pivot_data = pd.DataFrame(support_resistance_levels, columns=['Level', 'Weight'])
 
         # Salvare in un file CSV
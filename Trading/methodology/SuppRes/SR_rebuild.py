@@ -0,0 +1,115 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Trading.methodology.data_store.price_store import PriceStore
+from Trading.methodology.SuppRes.SR_construction import StockAnalysis
+from Trading.methodology.SuppRes.level_index import LEVEL_DIRECTORY, LEVEL_INDEX_FILE, SR_SUFFIX, build_level_index
+
+MANIFEST_FILE = "_manifest.json"
+
+
+def _rebuild_ticker(ticker, index, interval, base_path, directory, timeframes):
+    """
+    Ricalcola i livelli di un ticker in un processo separato.
+    :return: Tupla (ticker, esito, secondi, messaggio di errore).
+    """
+    start = time.perf_counter()
+    try:
+        written = StockAnalysis(ticker, interval=interval, index=index, base_path=base_path,
+                                directory=directory, timeframes=timeframes).update_pivot_data()
+        return ticker, "updated" if written else "unchanged", time.perf_counter() - start, None
+    except Exception as e:
+        return ticker, "failed", time.perf_counter() - start, str(e)
+
+
+def load_manifest(directory=LEVEL_DIRECTORY):
+    """
+    :return: Dizionario {ticker: impronta dei dati usati per l'ultimo calcolo dei livelli}.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, directory=LEVEL_DIRECTORY):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w') as file:
+        json.dump(manifest, file, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def rebuild_support_resistance(tickers=None, index="SP500", interval='1d', max_workers=None, force=False,
+                               base_path=None, directory=LEVEL_DIRECTORY, report=10, timeframes=None):
+    """
+    Ricalcola i file <ticker>_SR.csv in parallelo su più processi, saltando i ticker i cui dati
+    non sono cambiati dall'ultimo calcolo (stessa impronta in _manifest.json e file presente).
+    Alla fine ricostruisce l'indice dei livelli se almeno un file è stato riscritto.
+    :param tickers: Lista dei ticker (default tutti quelli della partizione).
+    :param index: Nome dell'indice ("SP500" o "Russel").
+    :param interval: Intervallo dei dati.
+    :param max_workers: Numero di processi (default os.cpu_count()).
+    :param force: Se True ricalcola tutti i ticker.
+    :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+    :param directory: Cartella dei file dei livelli.
+    :param report: Numero di ticker più lenti da stampare.
+    :param timeframes: Timeframe da unire (ad esempio ('1d', '1wk', '1mo')), vedi StockAnalysis.
+    :return: Lista di tuple (ticker, esito, secondi) con esito 'updated', 'unchanged', 'skipped' o 'failed'.
+    """
+    store = PriceStore(index=index, interval=interval, base_path=base_path)
+    tickers = store.tickers() if tickers is None else list(tickers)
+    manifest = load_manifest(directory)
+    os.makedirs(directory, exist_ok=True)
+
+    results = []
+    pending = {}
+    for ticker in tickers:
+        fingerprint = store.fingerprint(ticker)
+        if fingerprint is None:
+            results.append((ticker, "failed", 0.0))
+            print(f"No data for {ticker}")
+            continue
+        # Cambiando i timeframe cambia anche il risultato
+        if timeframes:
+            fingerprint = f"{fingerprint}|{','.join(timeframes)}"
+        sr_file = os.path.join(directory, f"{ticker}{SR_SUFFIX}")
+        if not force and manifest.get(ticker) == fingerprint and os.path.exists(sr_file):
+            results.append((ticker, "skipped", 0.0))
+        else:
+            pending[ticker] = fingerprint
+
+    start = time.perf_counter()
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_rebuild_ticker, ticker, index, interval, base_path, directory, timeframes)
+                       for ticker in pending]
+            for future in as_completed(futures):
+                ticker, status, seconds, error = future.result()
+                results.append((ticker, status, seconds))
+                if status == "failed":
+                    print(f"Failed to rebuild levels for {ticker}: {error}")
+                    manifest.pop(ticker, None)
+                else:
+                    manifest[ticker] = pending[ticker]
+        save_manifest(manifest, directory)
+    elapsed = time.perf_counter() - start
+
+    counts = {}
+    for _, status, _ in results:
+        counts[status] = counts.get(status, 0) + 1
+    print(f"Support/resistance rebuild: {len(pending)} tickers computed in {elapsed:.2f}s, "
+          + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    for ticker, status, seconds in sorted(results, key=lambda result: -result[2])[:report]:
+        if status != "skipped":
+            print(f"  {ticker:<8} {seconds:7.3f}s {status}")
+
+    if counts.get("updated") or not os.path.exists(os.path.join(directory, LEVEL_INDEX_FILE)):
+        build_level_index(directory)
+    return results
+
+
+if __name__ == "__main__":
+    rebuild_support_resistance()
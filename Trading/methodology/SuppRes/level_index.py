@@ -0,0 +1,207 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+LEVEL_DIRECTORY = "Trading/Data/SuppResist"
+LEVEL_INDEX_FILE = "_levels.parquet"
+SR_SUFFIX = "_SR.csv"
+
+
+def recent_closes(close, sessions=2):
+    """
+    Ultimi prezzi validi di ogni ticker da una matrice (ticker x date) con NaN per le barre mancanti.
+    Per ogni riga vengono considerate le ultime sessions chiusure valide, come iloc[-sessions:]
+    sullo storico del singolo ticker.
+    :param close: Matrice delle chiusure (ad esempio UniversePanel.field('Close')).
+    :param sessions: Numero di sessioni.
+    :return: Tupla (ultima chiusura, massimo, minimo) per riga; NaN per i ticker senza dati.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    valid = ~np.isnan(close)
+    # Posizione di ogni barra valida contando dalla fine: 1 è l'ultima
+    from_end = np.cumsum(valid[:, ::-1], axis=1)[:, ::-1]
+    recent = valid & (from_end <= sessions)
+    highest = np.where(recent, close, -np.inf).max(axis=1)
+    lowest = np.where(recent, close, np.inf).min(axis=1)
+    last = np.where(valid & (from_end == 1), close, 0.0).sum(axis=1)
+    has_data = recent.any(axis=1)
+    return np.where(has_data, last, np.nan), np.where(has_data, highest, np.nan), np.where(has_data, lowest, np.nan)
+
+
+class LevelIndex:
+    """
+    Tabella unica dei livelli di supporto e resistenza di tutto l'universo, ordinata per
+    (ticker, livello) e salvata in Trading/Data/SuppResist/_levels.parquet.
+    Le ricerche "livelli vicini all'ultimo prezzo" e "livelli attraversati nelle ultime N sessioni"
+    sono un unico join vettoriale tra la tabella e i prezzi di tutti i ticker.
+    # Esempio d'uso:
+    # levels = get_level_index()
+    # panel = get_repository().panel("SP500")
+    # near = levels.near(panel.tickers, recent_closes(panel.field('Close'))[0], threshold=0.02)
+    """
+    def __init__(self, tickers, levels, weights):
+        """
+        :param tickers: Ticker di ogni livello.
+        :param levels: Prezzi dei livelli.
+        :param weights: Pesi dei livelli.
+        """
+        tickers = np.asarray(tickers, dtype=object)
+        levels = np.asarray(levels, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        order = np.lexsort((levels, tickers.astype(str)))
+        self.tickers = tickers[order]
+        self.levels = levels[order]
+        self.weights = weights[order]
+        # Ticker distinti e intervallo [start, end) delle loro righe
+        self.names, self.starts, counts = np.unique(self.tickers.astype(str), return_index=True, return_counts=True)
+        self.ends = self.starts + counts
+        self._positions = {name: row for row, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __contains__(self, ticker):
+        return ticker in self._positions
+
+    def levels_for(self, ticker):
+        """
+        :return: Dizionario {livello: peso} del ticker in ordine crescente di livello.
+        """
+        row = self._positions.get(ticker)
+        if row is None:
+            return {}
+        rows = slice(self.starts[row], self.ends[row])
+        return dict(zip(self.levels[rows].tolist(), self.weights[rows].tolist()))
+
+    def _join(self, tickers):
+        # Per ogni livello, la posizione del suo ticker nella lista dei prezzi (-1 se assente)
+        universe = {ticker: position for position, ticker in enumerate(tickers)}
+        name_positions = np.array([universe.get(name, -1) for name in self.names], dtype=np.int64)
+        return np.repeat(name_positions, self.ends - self.starts)
+
+    def _result(self, mask, reference):
+        rows = np.flatnonzero(mask)
+        return pd.DataFrame({'Ticker': self.tickers[rows], 'Level': self.levels[rows],
+                             'Type': np.where(reference[rows] > self.levels[rows], 'Support', 'Resistance'),
+                             'Weight': self.weights[rows]})
+
+    def near(self, tickers, last_prices, threshold=0.02, max_price=None):
+        """
+        Livelli che distano al massimo threshold (in termini relativi) dall'ultimo prezzo del ticker.
+        :param tickers: Lista dei ticker, allineata a last_prices.
+        :param last_prices: Ultimo prezzo di ogni ticker.
+        :param threshold: Distanza relativa massima.
+        :param max_price: Se indicato, i livelli superiori vengono ignorati.
+        :return: DataFrame con colonne 'Ticker', 'Level', 'Type' ('Support'/'Resistance'), 'Weight'.
+        """
+        positions = self._join(tickers)
+        known = positions >= 0
+        price = np.full(len(self.levels), np.nan)
+        price[known] = np.asarray(last_prices, dtype=np.float64)[positions[known]]
+        with np.errstate(invalid='ignore'):
+            mask = np.abs(price - self.levels) / self.levels <= threshold
+        if max_price is not None:
+            mask &= self.levels <= max_price
+        return self._result(mask, price)
+
+    def crossed(self, tickers, closes, sessions=2, max_price=None):
+        """
+        Livelli attraversati nelle ultime sessions sedute: almeno una chiusura sopra e una sotto il livello.
+        :param tickers: Lista dei ticker, nell'ordine delle righe di closes.
+        :param closes: Matrice (ticker x date) delle chiusure, NaN per le barre mancanti.
+        :param sessions: Numero di sedute da considerare.
+        :param max_price: Se indicato, i livelli superiori vengono ignorati.
+        :return: DataFrame con colonne 'Ticker', 'Level', 'Type', 'Weight'; il tipo dipende dall'ultima chiusura.
+        """
+        last, highest, lowest = recent_closes(closes, sessions)
+        positions = self._join(tickers)
+        known = positions >= 0
+        reference = np.full(len(self.levels), np.nan)
+        mask = np.zeros(len(self.levels), dtype=bool)
+        reference[known] = last[positions[known]]
+        with np.errstate(invalid='ignore'):
+            mask[known] = (highest[positions[known]] > self.levels[known]) & \
+                          (lowest[positions[known]] < self.levels[known])
+        if max_price is not None:
+            mask &= self.levels <= max_price
+        return self._result(mask, reference)
+
+    def replace(self, ticker, levels):
+        """
+        Nuovo indice con i livelli di un ticker sostituiti.
+        :param levels: Dizionario {livello: peso} o lista di coppie (livello, peso).
+        :return: LevelIndex.
+        """
+        levels = list(levels.items()) if isinstance(levels, dict) else list(levels)
+        keep = self.tickers != ticker
+        return LevelIndex(np.concatenate([self.tickers[keep], np.array([ticker] * len(levels), dtype=object)]),
+                          np.concatenate([self.levels[keep], [level for level, _ in levels]]),
+                          np.concatenate([self.weights[keep], [weight for _, weight in levels]]))
+
+    def to_frame(self):
+        return pd.DataFrame({'Ticker': self.tickers.astype(str), 'Level': self.levels, 'Weight': self.weights})
+
+    def save(self, directory=LEVEL_DIRECTORY):
+        """
+        Salva l'indice (scrittura atomica).
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, LEVEL_INDEX_FILE)
+        self.to_frame().to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, directory=LEVEL_DIRECTORY):
+        df = pd.read_parquet(os.path.join(directory, LEVEL_INDEX_FILE))
+        return cls(df['Ticker'].to_numpy(dtype=object), df['Level'].to_numpy(), df['Weight'].to_numpy())
+
+    @classmethod
+    def from_sr_files(cls, directory=LEVEL_DIRECTORY):
+        """
+        Costruisce l'indice dai file <ticker>_SR.csv (colonne Level, Weight) della cartella.
+        """
+        frames = []
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            if name.endswith(SR_SUFFIX):
+                df = pd.read_csv(os.path.join(directory, name), skiprows=1, header=None, names=['Level', 'Weight'])
+                df['Ticker'] = name[:-len(SR_SUFFIX)]
+                frames.append(df)
+        if not frames:
+            return cls([], [], [])
+        df = pd.concat(frames, ignore_index=True)
+        return cls(df['Ticker'].to_numpy(dtype=object), df['Level'].to_numpy(), df['Weight'].to_numpy())
+
+
+def build_level_index(directory=LEVEL_DIRECTORY):
+    """
+    Ricostruisce e salva l'indice dei livelli dai file _SR.csv.
+    :return: LevelIndex.
+    """
+    index = LevelIndex.from_sr_files(directory)
+    index.save(directory)
+    print(f"Level index built: {len(index.names)} tickers, {len(index)} levels")
+    return index
+
+
+_level_index = None
+_level_index_version = None
+_level_index_lock = threading.Lock()
+
+
+def get_level_index(directory=LEVEL_DIRECTORY):
+    """
+    Indice dei livelli condiviso dal processo, riletto solo se il file su disco è cambiato.
+    Se l'indice non esiste viene costruito dai file _SR.csv.
+    :return: LevelIndex.
+    """
+    global _level_index, _level_index_version
+    path = os.path.join(directory, LEVEL_INDEX_FILE)
+    with _level_index_lock:
+        if not os.path.exists(path):
+            build_level_index(directory)
+        version = (path, os.stat(path).st_mtime_ns)
+        if _level_index is None or _level_index_version != version:
+            _level_index = LevelIndex.load(directory)
+            _level_index_version = version
+        return _level_index
@@ -0,0 +1,106 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
+
+
+def pivot_windows(close, thresholds=(25, 50, 75), days=(7, 5, 3)):
+    """
+    Semi-ampiezza della finestra da usare per ogni barra in base alla fascia di prezzo:
+    sotto thresholds[0] days[0], sotto thresholds[1] days[1], sotto thresholds[2] days[2],
+    altrimenti days[-1].
+    :param close: ndarray dei prezzi di chiusura.
+    :return: ndarray di interi della stessa lunghezza.
+    """
+    with np.errstate(invalid='ignore'):
+        buckets = [close < threshold for threshold in thresholds]
+    return np.select(buckets, days[:len(thresholds)], default=days[-1])
+
+
+def find_pivots(close, thresholds=(25, 50, 75), days=(7, 5, 3)):
+    """
+    Massimi e minimi locali della chiusura: una barra è un pivot se la sua chiusura è il massimo
+    (oppure il minimo) della finestra centrata di semi-ampiezza scelta in base al prezzo.
+    Per ogni ampiezza distinta viene calcolato un solo massimo/minimo mobile centrato su tutta la
+    serie; ogni barra usa poi quello della propria fascia di prezzo.
+    Come nel calcolo originale sono escluse le prime e le ultime max(days) barre.
+    :param close: pd.Series o ndarray dei prezzi di chiusura.
+    :param thresholds: Soglie di prezzo delle fasce.
+    :param days: Semi-ampiezza della finestra per ogni fascia.
+    :return: Tupla (posizioni, valori) dei pivot in ordine cronologico.
+    """
+    close = close.to_numpy(dtype=np.float64) if hasattr(close, 'to_numpy') else np.asarray(close, dtype=np.float64)
+    margin = max(days)
+    if len(close) <= 2 * margin:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    half_widths = pivot_windows(close, thresholds, days)
+    is_pivot = np.zeros(len(close), dtype=bool)
+    series = pd.Series(close)
+    for half_width in np.unique(half_widths):
+        rolling = series.rolling(2 * int(half_width) + 1, center=True, min_periods=1)
+        selected = half_widths == half_width
+        is_pivot |= selected & ((close == rolling.max().to_numpy()) | (close == rolling.min().to_numpy()))
+
+    positions = np.flatnonzero(is_pivot[margin:len(close) - margin]) + margin
+    return positions, close[positions]
+
+
+def _within(value, key, tolerance):
+    return abs(value - key) / key < tolerance
+
+
+def cluster_levels(values, tolerance=0.01):
+    """
+    Raggruppa i livelli nell'ordine in cui arrivano: ogni valore entra nel primo gruppo creato il cui
+    valore di riferimento (il primo valore del gruppo) dista meno di tolerance in termini relativi,
+    altrimenti apre un nuovo gruppo. I riferimenti sono tenuti ordinati: i gruppi candidati si trovano
+    con una ricerca binaria invece di confrontare il valore con tutti i gruppi.
+    :param values: Sequenza dei livelli (prezzi positivi).
+    :param tolerance: Distanza relativa massima dal riferimento del gruppo.
+    :return: Tupla (ndarray con il gruppo di ogni valore, lista dei riferimenti in ordine di creazione).
+    """
+    sorted_keys = []
+    sorted_ids = []
+    keys = []
+    labels = np.empty(len(values), dtype=np.int64)
+    for position, value in enumerate(values):
+        # |value - key| / key < tolerance  <=>  value / (1 + tolerance) < key < value / (1 - tolerance)
+        low = bisect_left(sorted_keys, value / (1 + tolerance) * (1 - 1e-9))
+        high = bisect_right(sorted_keys, value / (1 - tolerance) * (1 + 1e-9))
+        candidates = [sorted_ids[i] for i in range(low, high) if _within(value, sorted_keys[i], tolerance)]
+        if candidates:
+            labels[position] = min(candidates)
+            continue
+        labels[position] = len(keys)
+        insert_at = bisect_left(sorted_keys, value)
+        sorted_keys.insert(insert_at, value)
+        sorted_ids.insert(insert_at, len(keys))
+        keys.append(value)
+    return labels, keys
+
+
+def count_contacts(prices, keys, tolerance=0.01):
+    """
+    Numero di prezzi che distano meno di tolerance (in termini relativi) da ogni livello, con due
+    ricerche binarie per livello sui prezzi ordinati.
+    :param prices: Prezzi di chiusura.
+    :param keys: Livelli.
+    :return: ndarray di interi, uno per livello.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    prices = np.sort(prices[~np.isnan(prices)])
+    counts = np.zeros(len(keys), dtype=np.int64)
+    for position, key in enumerate(keys):
+        low = int(np.searchsorted(prices, key * (1 - tolerance), side='left'))
+        high = int(np.searchsorted(prices, key * (1 + tolerance), side='right'))
+        # Correzione dei bordi con lo stesso confronto del calcolo originale
+        while low < high and not _within(prices[low], key, tolerance):
+            low += 1
+        while low > 0 and _within(prices[low - 1], key, tolerance):
+            low -= 1
+        while high > low and not _within(prices[high - 1], key, tolerance):
+            high -= 1
+        while high < len(prices) and _within(prices[high], key, tolerance):
+            high += 1
+        counts[position] = high - low
+    return counts
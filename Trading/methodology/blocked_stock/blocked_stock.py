@@ -1,7 +1,11 @@
 from Reports.report_builder import ReportGenerator
 from Reports.image_builder import CandlestickChartGenerator
 import json
+from functools import partial
+import numpy as np
 import pandas as pd
+from Trading.methodology.data_store.repository import get_repository
+from Trading.methodology.scan_engine.scan_engine import run_scan, clear_scan_images
 
 
 class TradingAnalyzer:
@@ -25,83 +29,40 @@ class TradingAnalyzer:
             return last_price if self.max_price is None or last_price <= self.max_price else None
         return None
 
-    def calculate_support_resistance(self, price):
+    def calculate_support_resistance(self, price, step=1.0, grid=None):
         """
         Calculate support and resistance levels based on the given price.
         :param price: The stock price.
+        :param step: Passo della griglia dei livelli (1 = int(price) e int(price) + 1, 0.5 = mezzi dollari).
+        :param grid: Livelli espliciti in ordine crescente, al posto del passo.
         :return: A tuple of (support, resistance).
         """
-        resistance = int(price) + 1 if price and not pd.isna(price) else None
-        support = int(price) if price and not pd.isna(price) else None
-        return support, resistance
+        if not price or pd.isna(price):
+            return None, None
+        support, resistance = grid_levels(np.array([price], dtype=np.float64), step, grid)
+        return _plain(support[0]), _plain(resistance[0])
 
-    def check_price_range(self, period=60):
+    def check_price_range(self, period=60, step=1.0, grid=None):
         """
         Check if the stock price remains below resistance for more than 30 sessions and count how many times it touches or comes close to resistance within a 1% margin. Then do the opposite for support.
+        Il conteggio è lo stesso di scan_blocked_stocks, su una sola riga.
         :param period: The number of periods to check.
+        :param step: Passo della griglia dei livelli.
+        :param grid: Livelli espliciti in ordine crescente.
         :return: A dictionary with details of price interactions with support and resistance.
         """
         if len(self.dataset) < period:
             return False
 
-        last_price = self.get_last_value()
-        support, resistance = self.calculate_support_resistance(last_price)
-
-        below_resistance_count = 0
-        touch_resistance_count = 0
-        above_support_count = 0
-        touch_support_count = 0
-
-        for index in range(-period, 0):  # Utilizza un indice per accedere a più colonne
-            row = self.dataset.iloc[index]  # Ottieni la riga corrente
-            open_price = row['Open']
-            close_price = row['Close']
-
-            if self.max_price is not None and (pd.isna(open_price) or pd.isna(close_price)):
-                continue
-
-            if self.max_price is not None and (open_price > self.max_price or close_price > self.max_price):
-                continue
-
-            # Checking for resistance interactions
-            if resistance is not None:
-                if open_price < resistance and close_price < resistance:
-                    below_resistance_count += 1
-                    if resistance * 0.99 <= close_price <= resistance or resistance * 0.99 <= open_price <= resistance:
-                        touch_resistance_count += 1
-
-            # Checking for support interactions
-            if support is not None:
-                if open_price > support and close_price > support:
-                    above_support_count += 1
-                    if support <= close_price <= support * 1.01 or support <= open_price <= support * 1.01:
-                        touch_support_count += 1
-
-        interesting_below_resistance = below_resistance_count >45 and touch_resistance_count > 3
-        interesting_above_support = above_support_count > 45 and touch_support_count > 3
-
-        if interesting_below_resistance :
-            image = self.image.create_chart_with_horizontal_lines(lines=[resistance], max_points=90)
-            result = {
-                "status": interesting_below_resistance,
-                "details":{
-                    "resistence": resistance,
-                    "below_resistance_count": below_resistance_count,
-                    "touch_resistance_count": touch_resistance_count,
-                }
-            }
-        elif interesting_above_support:
-            image = self.image.create_chart_with_horizontal_lines(lines=[support], max_points=90)
-            result = {
-                "status": interesting_above_support,
-                "details": {
-                    "support": support,
-                    "above_support_count": above_support_count,
-                    "touch_support_count": touch_support_count
-                }
-            }
+        recent = self.dataset.iloc[-period:]
+        counts = blocked_counts(recent['Open'].to_numpy(dtype=np.float64)[None, :],
+                                recent['Close'].to_numpy(dtype=np.float64)[None, :],
+                                max_price=self.max_price, step=step, grid=grid)
+        result = blocked_result({name: values[0] for name, values in counts.items()})
+        if result:
+            level = result["details"].get("resistence", result["details"].get("support"))
+            image = self.image.create_chart_with_horizontal_lines(lines=[level], max_points=90)
         else:
-            result = False
             image = None
         return result, image
 
@@ -109,7 +70,172 @@ class TradingAnalyzer:
         self.image.clear_temp_files()
 
 
-def main():
+def grid_levels(price, step=1.0, grid=None):
+    """
+    Livelli della griglia che racchiudono ogni prezzo: il supporto è il livello più alto non superiore
+    al prezzo, la resistenza il livello successivo. Con step=1 sono int(price) e int(price) + 1.
+    :param price: Array dei prezzi.
+    :param step: Passo della griglia (ad esempio 1, 0.5, 5).
+    :param grid: Livelli espliciti in ordine crescente, al posto del passo.
+    :return: Tupla (supporto, resistenza); NaN fuori dalla griglia o per prezzi mancanti.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    if grid is None:
+        # Piccola tolleranza: 0.3 / 0.1 vale 2.9999999999999996
+        support = np.round(np.floor(price / step + 1e-9) * step, 10)
+        return support, np.round(support + step, 10)
+    grid = np.asarray(grid, dtype=np.float64)
+    position = np.searchsorted(grid, price, side='right') - 1
+    inside = ~np.isnan(price) & (position >= 0) & (position < len(grid) - 1)
+    safe = np.clip(position, 0, max(len(grid) - 2, 0))
+    return np.where(inside, grid[safe], np.nan), np.where(inside, grid[np.minimum(safe + 1, len(grid) - 1)], np.nan)
+
+
+def blocked_counts(open_prices, close_prices, max_price=None, step=1.0, grid=None):
+    """
+    Conteggi di check_price_range su una matrice (ticker x periodo), un ticker per riga e l'ultima
+    barra nell'ultima colonna.
+    :param open_prices: Matrice delle aperture.
+    :param close_prices: Matrice delle chiusure.
+    :param max_price: Se indicato, i ticker con ultima chiusura superiore non hanno livelli e le barre
+                      con prezzi mancanti o superiori vengono ignorate.
+    :param step: Passo della griglia dei livelli.
+    :param grid: Livelli espliciti in ordine crescente.
+    :return: Dizionario di array per ticker: support, resistance, below_resistance_count,
+             touch_resistance_count, above_support_count, touch_support_count.
+    """
+    open_prices = np.asarray(open_prices, dtype=np.float64)
+    close_prices = np.asarray(close_prices, dtype=np.float64)
+    last_price = close_prices[:, -1]
+    with np.errstate(invalid='ignore'):
+        has_levels = ~np.isnan(last_price) & (last_price != 0)
+        if max_price is not None:
+            has_levels &= last_price <= max_price
+        support, resistance = grid_levels(np.where(has_levels, last_price, np.nan), step, grid)
+        support, resistance = support[:, None], resistance[:, None]
+
+        counted = np.ones(open_prices.shape, dtype=bool)
+        if max_price is not None:
+            counted = ~np.isnan(open_prices) & ~np.isnan(close_prices) & \
+                      (open_prices <= max_price) & (close_prices <= max_price)
+
+        def near(prices, low, high):
+            return (low <= prices) & (prices <= high)
+
+        below_resistance = counted & (open_prices < resistance) & (close_prices < resistance)
+        touch_resistance = below_resistance & (near(close_prices, resistance * 0.99, resistance) |
+                                               near(open_prices, resistance * 0.99, resistance))
+        above_support = counted & (open_prices > support) & (close_prices > support)
+        touch_support = above_support & (near(close_prices, support, support * 1.01) |
+                                         near(open_prices, support, support * 1.01))
+    return {"support": support[:, 0], "resistance": resistance[:, 0],
+            "below_resistance_count": below_resistance.sum(axis=1),
+            "touch_resistance_count": touch_resistance.sum(axis=1),
+            "above_support_count": above_support.sum(axis=1),
+            "touch_support_count": touch_support.sum(axis=1)}
+
+
+def blocked_result(counts, min_sessions=45, min_touches=3):
+    """
+    Stato e dettagli di un ticker nello stesso formato di check_price_range.
+    :param counts: Conteggi di un ticker (una riga di blocked_counts o di scan_blocked_stocks).
+    :return: Dict con 'status' e 'details', oppure False.
+    """
+    if counts["below_resistance_count"] > min_sessions and counts["touch_resistance_count"] > min_touches:
+        return {"status": True,
+                "details": {"resistence": _plain(counts["resistance"]),
+                            "below_resistance_count": int(counts["below_resistance_count"]),
+                            "touch_resistance_count": int(counts["touch_resistance_count"])}}
+    if counts["above_support_count"] > min_sessions and counts["touch_support_count"] > min_touches:
+        return {"status": True,
+                "details": {"support": _plain(counts["support"]),
+                            "above_support_count": int(counts["above_support_count"]),
+                            "touch_support_count": int(counts["touch_support_count"])}}
+    return False
+
+
+def _plain(level):
+    # Con la griglia intera il livello resta un int, come int(price) nel calcolo originale
+    level = float(level)
+    return int(level) if level.is_integer() else level
+
+
+def _right_aligned(values, valid):
+    # Sposta le barre valide di ogni riga verso destra, mantenendone l'ordine
+    order = np.argsort(valid, axis=1, kind='stable')
+    return np.take_along_axis(values, order, axis=1)
+
+
+def scan_blocked_stocks(panel, tickers=None, period=60, max_price=None, step=1.0, grid=None,
+                        min_sessions=45, min_touches=3):
+    """
+    Versione vettoriale di check_price_range per tutto l'universo: per ogni ticker vengono usate le
+    sue ultime period barre (le date senza dati del panel vengono saltate, come nel DataFrame del
+    singolo ticker).
+    # Esempio d'uso:
+    # panel = get_repository().panel("SP500")
+    # blocked = scan_blocked_stocks(panel, max_price=50, step=0.5)
+    # blocked[blocked['status']]
+    :param panel: UniversePanel con i campi 'Open' e 'Close'.
+    :param tickers: Sottoinsieme dei ticker (default tutti quelli del panel).
+    :param period: Numero di barre da controllare.
+    :param max_price: Prezzo massimo (vedi blocked_counts).
+    :param step: Passo della griglia dei livelli (1, 0.5, 5, ...).
+    :param grid: Livelli espliciti in ordine crescente, al posto del passo.
+    :param min_sessions: Sedute minime sotto la resistenza (o sopra il supporto).
+    :param min_touches: Contatti minimi entro l'1% dal livello.
+    :return: DataFrame con indice 'Ticker', i conteggi di blocked_counts, 'status' e 'side'
+             ('resistance' o 'support'); i ticker con meno di period barre sono esclusi.
+    """
+    rows = np.arange(len(panel.tickers)) if tickers is None else \
+        np.array([panel.ticker_index[ticker] for ticker in tickers if ticker in panel.ticker_index], dtype=np.int64)
+    names = [panel.tickers[row] for row in rows]
+    open_prices = np.asarray(panel.field('Open'))[rows]
+    close_prices = np.asarray(panel.field('Close'))[rows]
+
+    valid = ~(np.isnan(open_prices) & np.isnan(close_prices))
+    enough = valid.sum(axis=1) >= period
+    open_prices = _right_aligned(open_prices[enough], valid[enough])[:, -period:]
+    close_prices = _right_aligned(close_prices[enough], valid[enough])[:, -period:]
+
+    counts = blocked_counts(open_prices, close_prices, max_price=max_price, step=step, grid=grid)
+    result = pd.DataFrame(counts, index=pd.Index(np.asarray(names, dtype=object)[enough], name='Ticker'))
+    below = (result["below_resistance_count"] > min_sessions) & (result["touch_resistance_count"] > min_touches)
+    above = (result["above_support_count"] > min_sessions) & (result["touch_support_count"] > min_touches)
+    result["status"] = below | above
+    result["side"] = np.where(below, 'resistance', np.where(above, 'support', None))
+    return result
+
+
+def chart_blocked_stock(ticker, data, levels):
+    """
+    Analyzer per run_scan: grafico del livello che blocca il titolo.
+    :param levels: Dizionario {ticker: livello}.
+    """
+    return CandlestickChartGenerator(data).create_chart_with_horizontal_lines(lines=[levels[ticker]], max_points=90)
+
+
+def find_blocked_stocks(tickers, index="SP500", max_price=50, step=1.0, grid=None, max_workers=None):
+    """
+    Titoli bloccati sotto una resistenza o sopra un supporto: conteggi su tutto l'universo in una sola
+    passata, grafici dei soli titoli trovati con run_scan.
+    :return: Lista di tuple (ticker, {'details', 'image'}) come run_scan.
+    """
+    repository = get_repository()
+    if max_price is not None:
+        # I titoli con ultima chiusura oltre max_price non hanno livelli: scartati dalla tabella di snapshot
+        tickers = repository.snapshot(index).select(tickers, max_price=max_price)
+    blocked = scan_blocked_stocks(repository.panel(index), tickers, max_price=max_price, step=step, grid=grid)
+    blocked = blocked[blocked["status"]]
+    details = {ticker: blocked_result(row) for ticker, row in blocked.iterrows()}
+    levels = {ticker: row["resistance"] if row["side"] == 'resistance' else row["support"]
+              for ticker, row in blocked.iterrows()}
+    images = run_scan(partial(chart_blocked_stock, levels=levels), list(levels), index=index,
+                      columns=['Open', 'High', 'Low', 'Close'], max_workers=max_workers)
+    return [(ticker, {'details': details[ticker]['details'], 'image': image}) for ticker, image in images]
+
+
+def main(max_workers=None):
     report = ReportGenerator()
     report.add_title(title="Report blocked stock")
 
@@ -124,17 +250,12 @@ def main():
             tickers = json.load(file)
             tickers_list = list(tickers.keys())
 
-    for item in tickers_list:
-        data = pd.read_csv(f"Trading/Data/Daily/{item}_historical_data.csv")
-        enhanced_strategy = TradingAnalyzer(data, max_price=50)
-        result, image = enhanced_strategy.check_price_range()
-        if result:
-            print(f'stock = {item} -- FOUND ')
-            report.add_content(f'stock = {item} ')
-            report.add_commented_image(df=data, comment=f'Description = {result["details"]}', image_path=image)
-        print(f"checked stock {item}")
+    results = find_blocked_stocks(tickers_list, index="SP500", max_price=50, max_workers=max_workers)
+    for item, result in results:
+        report.add_content(f'stock = {item} ')
+        report.add_commented_image(df=None, comment=f'Description = {result["details"]}', image_path=result['image'])
     file_report = report.save_report(filename="Report_blocked_stock")
-    enhanced_strategy.clear_img_temp_files()
+    clear_scan_images(results)
     return file_report
 
 if __name__ == '__main__':
@@ -1,8 +1,7 @@
-import pandas as pd
-
 from Trading.methodology.breakout_lateral_mov.break_lateral_mov_second import BreakoutSignalAnalyzer_lateral_move_second
 from Reports.report_builder import ReportGenerator
 import json
+from Trading.methodology.data_store.price_store import PriceStore
 
 parameters_dict = {}
 report= ReportGenerator()
@@ -19,8 +18,9 @@ with open("json_files/SP500-short.json", 'r') as file:
         tickers = json.load(file)
         tickers_list = list(tickers.keys())
 
+price_store = PriceStore(index="SP500", interval='1d')
 for item in tickers_list:
-    data = pd.read_csv(f"Trading/Data/Daily/{item}_historical_data.csv")
+    data = price_store.read(item)
     analyzer = BreakoutSignalAnalyzer_lateral_move_second(data, parameters_dict)
     # Variabili per il backtest
     total_signals = 0
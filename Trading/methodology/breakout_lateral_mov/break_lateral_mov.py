@@ -1,7 +1,8 @@
-import pandas as pd
 import json
 from Reports.report_builder import ReportGenerator
 from Reports.image_builder import CandlestickChartGenerator
+from Trading.methodology.data_store.price_store import PriceStore
+from Trading.methodology.Indicators.indicators import atr, bollinger_bands
 
 class BreakoutSignalAnalyzer_lateral_move:
     def __init__(self, data, params):
@@ -22,19 +23,12 @@ class BreakoutSignalAnalyzer_lateral_move:
 
     def BollingerBands(self):
         """ Calcola le Bande di Bollinger. """
-        sma = self.data['Close'].rolling(window=self.window).mean()
-        rstd = self.data['Close'].rolling(window=self.window).std()
-        self.data['Upper Band'] = sma + self.num_of_std * rstd
-        self.data['Lower Band'] = sma - self.num_of_std * rstd
+        _, self.data['Upper Band'], self.data['Lower Band'] = bollinger_bands(self.data['Close'], self.window,
+                                                                              self.num_of_std)
 
     def ATR(self):
         """ Calcola l'Average True Range (ATR). """
-        high_low = self.data['High'] - self.data['Low']
-        high_close = (self.data['High'] - self.data['Close'].shift()).abs()
-        low_close = (self.data['Low'] - self.data['Close'].shift()).abs()
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = ranges.max(axis=1)
-        self.data['ATR'] = true_range.rolling(window=self.window).mean()
+        self.data['ATR'] = atr(self.data['High'], self.data['Low'], self.data['Close'], self.window)
 
     def detect_breakout(self):
         """
@@ -86,8 +80,9 @@ with open("json_files/SP500-stock.json", 'r') as file:
         tickers = json.load(file)
         tickers_list = list(tickers.keys())
 
+price_store = PriceStore(index="SP500", interval='1d')
 for item in tickers_list:
-    data = pd.read_csv(f"Trading/Data/Daily/{item}_historical_data.csv")
+    data = price_store.read(item)
     enhanced_strategy = BreakoutSignalAnalyzer_lateral_move(data, parameters_dict)
     enhanced_signals, content, image = enhanced_strategy.detect_breakout()
     if enhanced_signals != 0.0: 
@@ -1,7 +1,7 @@
-import pandas as pd
 import json
 from Reports.report_builder import ReportGenerator
 from Reports.image_builder import CandlestickChartGenerator
+from Trading.methodology.data_store.price_store import PriceStore
 
 class BreakoutSignalAnalyzer_lateral_move_second:
     def __init__(self, data, params):
@@ -85,8 +85,9 @@ with open("json_files/SP500-stock.json", 'r') as file:
         tickers = json.load(file)
         tickers_list = list(tickers.keys())
 
+price_store = PriceStore(index="SP500", interval='1d')
 for item in tickers_list:
-    data = pd.read_csv(f"Trading/Data/Daily/{item}_historical_data.csv")
+    data = price_store.read(item)
     enhanced_strategy = BreakoutSignalAnalyzer_lateral_move_second(data, parameters_dict)
     enhanced_signals, content, image = enhanced_strategy.analyze_range()
     if enhanced_signals != 0.0: 
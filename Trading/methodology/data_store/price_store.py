@@ -0,0 +1,554 @@
+import os
+import json
+import shutil
+import threading
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+source_directory = "/home/dp/PycharmProjects/Portfolio_management/Portfolio_management"
+
+INTERVAL_FOLDERS = {'1d': 'Daily', '1wk': 'Weekly', '1mo': 'Monthly'}
+UNIVERSE_FILES = {"SP500": "json_files/SP500-stock.json", "Russel": "json_files/russell2000.json"}
+PRICE_SCHEMA = {'Open': 'float64', 'High': 'float64', 'Low': 'float64', 'Close': 'float64',
+                'Adj Close': 'float64', 'Volume': 'int64'}
+CSV_SUFFIX = "_historical_data.csv"
+STORE_SUFFIX = ".parquet"
+SNAPSHOT_DIR = ".snapshots"
+STAGING_DIR = ".staging"
+WATERMARK_FILE = "_watermarks.json"
+DELTA_DIR = "_delta"
+MAX_DELTA_PARTS = 20
+
+
+def load_tickers(index="SP500", base_path=source_directory):
+    """
+    Legge la lista dei ticker di un indice dai file json in json_files.
+    :param index: Nome dell'indice ("SP500" o "Russel").
+    :param base_path: Root del progetto.
+    :return: Lista dei ticker.
+    """
+    with open(os.path.join(base_path, UNIVERSE_FILES[index]), 'r') as file:
+        tickers = json.load(file)
+    return list(tickers.keys())
+
+
+def normalize_frame(df):
+    """
+    Porta un DataFrame OHLCV allo schema del price store: indice 'Date' datetime ordinato,
+    colonne float64 per i prezzi e int64 per il volume.
+    :param df: DataFrame scaricato da Yahoo o letto da CSV.
+    :return: DataFrame normalizzato.
+    """
+    df = df.copy()
+    # yfinance restituisce colonne MultiIndex (campo, ticker) anche per un solo ticker
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    if 'Date' in df.columns:
+        df = df.set_index('Date')
+    df.index = pd.to_datetime(df.index)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = 'Date'
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+
+    for column, dtype in PRICE_SCHEMA.items():
+        if column not in df.columns:
+            continue
+        if dtype == 'int64':
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(dtype)
+        else:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    return df[[column for column in PRICE_SCHEMA if column in df.columns]]
+
+
+def _file_version(path):
+    # Identità economica di un file (dimensione e mtime), None se non esiste
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def read_price_csv(path, columns=None, compact=False):
+    """
+    Lettura veloce di un file *_historical_data.csv con schema esplicito: nessuna inferenza
+    dei tipi, indice 'Date' già convertito in datetime e solo le colonne richieste.
+    :param path: Percorso del file CSV.
+    :param columns: Colonne da leggere oltre a 'Date' (default tutte quelle dello schema).
+    :param compact: Se True i prezzi sono float32 invece di float64 (il volume resta int64).
+    :return: DataFrame con indice 'Date'.
+    """
+    requested = columns
+    columns = list(PRICE_SCHEMA) if columns is None else list(columns)
+    price_type = pa.float32() if compact else pa.float64()
+    # Il volume viene letto come float perché Yahoo lascia a volte righe vuote
+    column_types = {'Date': pa.timestamp('ns')}
+    column_types.update({column: (pa.float64() if column == 'Volume' else price_type) for column in columns})
+    try:
+        table = pa_csv.read_csv(path, read_options=pa_csv.ReadOptions(use_threads=False),
+                                convert_options=pa_csv.ConvertOptions(column_types=column_types,
+                                                                      include_columns=['Date'] + columns))
+        df = table.to_pandas().set_index('Date')
+    except (pa.ArrowInvalid, KeyError):
+        # Righe malformate o colonne mancanti/rinominate (ad esempio senza 'Adj Close' o con 'date'):
+        # parser C di pandas, più tollerante, con i nomi delle colonne ricondotti allo schema
+        names = {name.lower(): name for name in ['Date'] + list(PRICE_SCHEMA)}
+        df = pd.read_csv(path, index_col=0, engine='c')
+        df = df.rename(columns=lambda column: names.get(str(column).strip().lower(), column))
+        df.index = pd.to_datetime(df.index)
+        df.index.name = 'Date'
+        if requested is None and 'Adj Close' not in df.columns:
+            # Le versioni recenti di yfinance non scrivono più 'Adj Close'
+            columns.remove('Adj Close')
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            raise KeyError(f"Columns {missing} not found in {path}")
+        df = df[columns].astype({column: column_types[column].to_pandas_dtype() for column in columns})
+    if 'Volume' in df.columns:
+        df['Volume'] = df['Volume'].fillna(0).astype('int64')
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
+
+
+class PriceStore:
+    """
+    Archivio colonnare dei prezzi, un file parquet per ticker, partizionato per indice e intervallo:
+    Trading/Data/<index>/<Daily|Weekly>/<ticker>.parquet
+    Gli aggiornamenti incrementali aggiungono solo le nuove barre in _delta/<ticker>.<n>.parquet;
+    l'indice _watermarks.json tiene per ogni ticker l'ultima data, il numero di parti aggiunte e
+    l'identità del file base a cui si riferiscono. Se il processo si interrompe prima di
+    save_watermarks l'indice su disco resta coerente: le parti sostituite vengono cancellate solo
+    dopo il salvataggio e un file base riscritto dopo l'ultimo salvataggio viene riconosciuto.
+    Dopo il primo refresh completo la cartella della partizione è un link simbolico allo
+    snapshot corrente in Trading/Data/<index>/.snapshots/. Il link viene risolto a ogni lettura:
+    un PriceStore creato prima di una pubblicazione legge lo snapshot nuovo, e ogni lettura vede
+    per intero un solo snapshot.
+    # Esempio d'uso:
+    # store = PriceStore(index="SP500", interval="1d")
+    # df = store.read("AAPL", columns=["Close"])
+    """
+    def __init__(self, index="SP500", interval='1d', base_path=None, data_path=None):
+        """
+        :param index: Nome dell'indice ("SP500" o "Russel").
+        :param interval: '1d' per i dati giornalieri, '1wk' per quelli settimanali, '1mo' per i mensili.
+        :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+        :param data_path: Cartella esplicita da usare al posto dello snapshot corrente (area di staging).
+        """
+        if interval not in INTERVAL_FOLDERS:
+            raise ValueError("Invalid interval. Choose '1d' for daily, '1wk' for weekly or '1mo' for monthly data.")
+        self.index = index
+        self.interval = interval
+        self.base_path = base_path if base_path is not None else f"{source_directory}/Trading/Data"
+        self.partition_path = os.path.join(self.base_path, index, INTERVAL_FOLDERS[interval])
+        self._data_path = data_path
+        self._watermarks = None
+        self._watermarks_source = None
+        self._watermarks_version = None
+        # Modifiche all'indice non ancora salvate e parti incrementali da cancellare dopo il salvataggio
+        self._dirty = False
+        self._obsolete = set()
+        self._lock = threading.Lock()
+
+    @property
+    def data_path(self):
+        """
+        Cartella dei dati: l'area di staging indicata alla creazione oppure lo snapshot corrente della
+        partizione, risolto a ogni accesso.
+        """
+        if self._data_path is not None:
+            return self._data_path
+        path = os.path.realpath(self.partition_path)
+        if os.path.isdir(path):
+            return path
+        # Durante il primo publish la cartella reale è già tra gli snapshot ma il link non esiste ancora:
+        # il più recente è quello appena pubblicato
+        snapshots_path = os.path.join(self.base_path, self.index, SNAPSHOT_DIR)
+        prefix = f"{INTERVAL_FOLDERS[self.interval]}-"
+        snapshots = sorted(name for name in os.listdir(snapshots_path) if name.startswith(prefix)) \
+            if os.path.isdir(snapshots_path) else []
+        return os.path.join(snapshots_path, snapshots[-1]) if snapshots else path
+
+    def file_path(self, ticker, data_path=None):
+        return os.path.join(data_path or self.data_path, f"{ticker}{STORE_SUFFIX}")
+
+    def csv_path(self, ticker, data_path=None):
+        return os.path.join(data_path or self.data_path, f"{ticker}{CSV_SUFFIX}")
+
+    def exists(self, ticker):
+        data_path = self.data_path
+        return os.path.exists(self.file_path(ticker, data_path)) or os.path.exists(self.csv_path(ticker, data_path))
+
+    def tickers(self):
+        """
+        :return: Lista ordinata dei ticker presenti nella partizione (parquet o CSV non ancora migrati).
+        """
+        data_path = self.data_path
+        if not os.path.isdir(data_path):
+            return []
+        found = set()
+        for filename in os.listdir(data_path):
+            if filename.endswith(STORE_SUFFIX):
+                found.add(filename[:-len(STORE_SUFFIX)])
+            elif filename.endswith(CSV_SUFFIX):
+                found.add(filename[:-len(CSV_SUFFIX)])
+        return sorted(found)
+
+    def data_version(self):
+        """
+        Identificativo economico della versione dei dati della partizione: cambia ogni volta
+        che un file viene aggiunto, riscritto o cancellato.
+        :return: Stringa "<numero file>-<mtime più recente in ns>".
+        """
+        data_path = self.data_path
+        if not os.path.isdir(data_path):
+            return "0-0"
+        count = 0
+        latest = 0
+        with os.scandir(data_path) as entries:
+            for entry in entries:
+                if entry.name.endswith(STORE_SUFFIX) or entry.name.endswith(CSV_SUFFIX) or entry.name == WATERMARK_FILE:
+                    count += 1
+                    latest = max(latest, entry.stat().st_mtime_ns)
+        return f"{count}-{latest}"
+
+    def fingerprint(self, ticker):
+        """
+        Impronta economica dei dati di un ticker (dimensione e mtime del file più le parti
+        incrementali registrate nei watermark), senza leggerne il contenuto.
+        :return: Stringa, oppure None se il ticker non ha dati.
+        """
+        data_path = self.data_path
+        for path in (self.file_path(ticker, data_path), self.csv_path(ticker, data_path)):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                entry = self._entry(ticker, data_path) or {}
+                return f"{self.index}/{self.interval}:{stat.st_size}-{stat.st_mtime_ns}:{entry.get('last_date')}-{entry.get('parts', 0)}"
+        return None
+
+    def read(self, ticker, columns=None, compact=False, start=None):
+        """
+        Legge lo storico di un ticker, comprese le barre aggiunte in modo incrementale.
+        Se il file parquet non esiste ancora usa il vecchio CSV.
+        :param ticker: Simbolo del titolo.
+        :param columns: Colonne da leggere (default tutte).
+        :param compact: Se True i prezzi sono restituiti come float32.
+        :param start: Prima data da leggere (default tutto lo storico); nel parquet le righe precedenti
+                      non vengono caricate.
+        :return: DataFrame con indice 'Date'.
+        """
+        # Un solo snapshot per tutta la lettura, anche se nel frattempo ne viene pubblicato un altro
+        data_path = self.data_path
+        start = pd.Timestamp(start) if start is not None else None
+        df = self._read_base(ticker, data_path, columns, compact, start)
+        parts = (self._entry(ticker, data_path) or {}).get("parts", 0)
+        if parts:
+            deltas = [pd.read_parquet(self._delta_path(ticker, part, data_path), columns=columns)
+                      for part in range(1, parts + 1)]
+            df = pd.concat([df] + deltas)
+            # Una parte può sostituire l'ultima barra (append con replace_last)
+            df = df[~df.index.duplicated(keep='last')]
+            if start is not None:
+                df = df[df.index >= start]
+        if compact:
+            df = df.astype({column: 'float32' for column in df.columns if column != 'Volume'})
+        return df
+
+    def _read_base(self, ticker, data_path, columns=None, compact=False, start=None):
+        # File base del ticker (parquet o vecchio CSV), senza le parti incrementali
+        path = self.file_path(ticker, data_path)
+        csv_file = self.csv_path(ticker, data_path)
+        if os.path.exists(path):
+            filters = [('Date', '>=', start)] if start is not None else None
+            return pd.read_parquet(path, columns=columns, filters=filters)
+        if os.path.exists(csv_file):
+            df = read_price_csv(csv_file, columns=columns, compact=compact)
+            return df[df.index >= start] if start is not None else df
+        raise FileNotFoundError(f"No data for {ticker} in {data_path}")
+
+    def _base_version(self, ticker, data_path):
+        return _file_version(self.file_path(ticker, data_path)) or _file_version(self.csv_path(ticker, data_path))
+
+    def _entry(self, ticker, data_path=None):
+        """
+        Voce dei watermark di un ticker, verificata rispetto al file base. Se il file base è stato
+        riscritto dopo l'ultimo salvataggio dei watermark (ad esempio un'interruzione tra una
+        compattazione e save_watermarks) contiene già le parti incrementali: la voce viene ricalcolata
+        dal file e le parti ignorate.
+        :return: Dizionario con 'last_date', 'parts' e 'base', oppure None se il ticker non è indicizzato.
+        """
+        data_path = data_path or self.data_path
+        entry = self._load_watermarks(data_path).get(ticker)
+        # Le voci salvate dalle versioni precedenti non hanno l'identità del file base
+        if entry is None or "base" not in entry:
+            return entry
+        version = self._base_version(ticker, data_path)
+        if version == entry["base"]:
+            return entry
+        entry = None
+        if version is not None:
+            df = self._read_base(ticker, data_path, columns=['Close'])
+            if not df.empty:
+                entry = {"last_date": df.index[-1].strftime('%Y-%m-%d'), "parts": 0, "base": version}
+        with self._lock:
+            watermarks = self._load_watermarks(data_path)
+            if entry is None:
+                watermarks.pop(ticker, None)
+            else:
+                watermarks[ticker] = entry
+            self._dirty = True
+        return entry
+
+    def read_many(self, tickers, columns=None, compact=False):
+        """
+        Legge più ticker saltando quelli mancanti.
+        :return: Generatore di tuple (ticker, DataFrame).
+        """
+        for ticker in tickers:
+            try:
+                yield ticker, self.read(ticker, columns=columns, compact=compact)
+            except FileNotFoundError as e:
+                print(e)
+
+    def write(self, ticker, df):
+        """
+        Salva lo storico completo di un ticker sostituendo il file precedente e le eventuali
+        parti incrementali.
+        :param ticker: Simbolo del titolo.
+        :param df: DataFrame OHLCV.
+        """
+        df = normalize_frame(df)
+        data_path = self.data_path
+        os.makedirs(data_path, exist_ok=True)
+        path = self.file_path(ticker, data_path)
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            watermarks = self._load_watermarks(data_path)
+            # Le parti precedenti vengono cancellate solo dopo il salvataggio del nuovo watermark
+            parts = watermarks.get(ticker, {}).get("parts", 0)
+            self._obsolete.update(self._delta_path(ticker, part, data_path) for part in range(1, parts + 1))
+            if df.empty:
+                watermarks.pop(ticker, None)
+            else:
+                watermarks[ticker] = {"last_date": df.index[-1].strftime('%Y-%m-%d'), "parts": 0,
+                                      "base": _file_version(path)}
+            self._dirty = True
+
+    def append(self, ticker, new_rows, replace_last=False):
+        """
+        Aggiunge solo le barre successive all'ultima data salvata, senza riscrivere lo storico.
+        Oltre MAX_DELTA_PARTS parti il ticker viene compattato in un unico file.
+        Il watermark in memoria viene aggiornato; per renderlo persistente chiamare save_watermarks().
+        Fino ad allora l'indice su disco non vede la nuova parte e resta coerente.
+        :param ticker: Simbolo del titolo.
+        :param new_rows: DataFrame OHLCV con le nuove barre.
+        :param replace_last: Se True anche la barra con l'ultima data salvata viene sostituita da quella di
+                             new_rows (ad esempio la settimana parziale ricostruita).
+        """
+        new_rows = normalize_frame(new_rows)
+        last_date = self.last_date(ticker)
+        if last_date is None:
+            self.write(ticker, new_rows)
+            return
+        new_rows = new_rows[(new_rows.index >= last_date) if replace_last else (new_rows.index > last_date)]
+        if new_rows.empty:
+            return
+
+        data_path = self.data_path
+        entry = self._entry(ticker, data_path)
+        parts = entry["parts"] + 1
+        if parts > MAX_DELTA_PARTS:
+            existing = self.read(ticker)
+            self.write(ticker, pd.concat([existing[existing.index < new_rows.index[0]], new_rows]))
+            return
+
+        path = self._delta_path(ticker, parts, data_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        new_rows.to_parquet(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        with self._lock:
+            self._load_watermarks(data_path)[ticker] = dict(entry, last_date=new_rows.index[-1].strftime('%Y-%m-%d'),
+                                                           parts=parts)
+            self._dirty = True
+
+    def last_date(self, ticker):
+        """
+        Ultima data salvata per un ticker, letta dall'indice dei watermark senza aprire il file.
+        Per i ticker non ancora indicizzati il file viene letto una sola volta.
+        :return: pd.Timestamp oppure None se il ticker non ha dati.
+        """
+        data_path = self.data_path
+        entry = self._entry(ticker, data_path)
+        if entry is not None:
+            return pd.Timestamp(entry["last_date"])
+        version = self._base_version(ticker, data_path)
+        if version is None:
+            return None
+        df = self._read_base(ticker, data_path, columns=['Close'])
+        if df.empty:
+            return None
+        with self._lock:
+            self._load_watermarks(data_path)[ticker] = {"last_date": df.index[-1].strftime('%Y-%m-%d'), "parts": 0,
+                                                        "base": version}
+            self._dirty = True
+        return df.index[-1]
+
+    def save_watermarks(self):
+        """
+        Salva su disco l'indice dei watermark (scrittura atomica) e solo dopo cancella le parti
+        incrementali sostituite da write o da una compattazione.
+        """
+        with self._lock:
+            data_path = self._watermarks_source or self.data_path
+            watermarks = dict(self._load_watermarks(data_path))
+            obsolete, self._obsolete = self._obsolete, set()
+            os.makedirs(data_path, exist_ok=True)
+            path = os.path.join(data_path, WATERMARK_FILE)
+            with open(f"{path}.tmp", 'w') as file:
+                json.dump(watermarks, file, sort_keys=True)
+            os.replace(f"{path}.tmp", path)
+            self._watermarks_version = _file_version(path)
+            self._dirty = False
+        # Una parte può essere stata riscritta da un append successivo alla compattazione
+        referenced = {self._delta_path(ticker, part, data_path)
+                      for ticker, entry in watermarks.items() for part in range(1, entry.get("parts", 0) + 1)}
+        for part_path in obsolete - referenced:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def _load_watermarks(self, data_path=None):
+        # Indice dei watermark dello snapshot corrente, riletto se nel frattempo ne è stato pubblicato un
+        # altro o se un altro processo lo ha salvato (e qui non ci sono modifiche in sospeso)
+        data_path = data_path or self.data_path
+        path = os.path.join(data_path, WATERMARK_FILE)
+        version = _file_version(path)
+        if self._watermarks is None or self._watermarks_source != data_path or \
+                (not self._dirty and version != self._watermarks_version):
+            try:
+                with open(path, 'r') as file:
+                    self._watermarks = json.load(file)
+            except FileNotFoundError:
+                self._watermarks = {}
+            self._watermarks_source = data_path
+            self._watermarks_version = version
+            self._dirty = False
+        return self._watermarks
+
+    def _delta_path(self, ticker, part, data_path=None):
+        return os.path.join(data_path or self.data_path, DELTA_DIR, f"{ticker}.{part}{STORE_SUFFIX}")
+
+    def staging(self, copy_current=False):
+        """
+        Crea un'area di staging per un refresh della partizione.
+        :param copy_current: Se False l'area è vuota (refresh completo); se True parte dai file dello
+                             snapshot corrente, collegati con hard link senza copiare i dati. Il PriceStore
+                             sostituisce sempre i file (os.replace) invece di modificarli, quindi le scritture
+                             nell'area di staging non toccano i file pubblicati.
+        :return: PriceStore che scrive nell'area di staging.
+        """
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        path = os.path.join(self.base_path, self.index, STAGING_DIR,
+                            f"{INTERVAL_FOLDERS[self.interval]}-{stamp}-{os.getpid()}")
+        os.makedirs(path)
+        current = self.data_path
+        if copy_current and os.path.isdir(current):
+            for root, _, filenames in os.walk(current):
+                target = os.path.join(path, os.path.relpath(root, current))
+                os.makedirs(target, exist_ok=True)
+                for filename in filenames:
+                    if filename.endswith('.tmp'):
+                        continue
+                    try:
+                        os.link(os.path.join(root, filename), os.path.join(target, filename))
+                    except OSError:
+                        shutil.copy2(os.path.join(root, filename), os.path.join(target, filename))
+        return PriceStore(index=self.index, interval=self.interval, base_path=self.base_path, data_path=path)
+
+    def discard(self, staging):
+        """
+        Elimina un'area di staging senza toccare i dati pubblicati.
+        """
+        shutil.rmtree(staging.data_path, ignore_errors=True)
+
+    def publish(self, staging, keep=2):
+        """
+        Pubblica un'area di staging come nuovo snapshot della partizione. Lo scambio avviene
+        sostituendo atomicamente il link simbolico della partizione, quindi un lettore vede
+        sempre o il vecchio snapshot completo o quello nuovo.
+        :param staging: PriceStore restituito da staging().
+        :param keep: Numero di snapshot da conservare (corrente compreso).
+        """
+        staging.save_watermarks()
+        folder = INTERVAL_FOLDERS[self.interval]
+        index_path = os.path.join(self.base_path, self.index)
+        snapshots_path = os.path.join(index_path, SNAPSHOT_DIR)
+        os.makedirs(snapshots_path, exist_ok=True)
+
+        snapshot_name = f"{folder}-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        os.rename(staging.data_path, os.path.join(snapshots_path, snapshot_name))
+
+        # Primo refresh: la vecchia cartella reale diventa lo snapshot più vecchio
+        if os.path.isdir(self.partition_path) and not os.path.islink(self.partition_path):
+            os.rename(self.partition_path, os.path.join(snapshots_path, f"{folder}-{'0' * 20}"))
+
+        tmp_link = f"{self.partition_path}.tmp-link"
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(os.path.join(SNAPSHOT_DIR, snapshot_name), tmp_link)
+        os.replace(tmp_link, self.partition_path)
+
+        self._watermarks = None
+        # Gli snapshot precedenti al penultimo non sono più raggiungibili: i PriceStore risolvono il
+        # link a ogni lettura e una lettura già iniziata usa al più lo snapshot appena sostituito
+        self._prune_snapshots(keep)
+        print(f"Published snapshot {snapshot_name} for {self.partition_path}")
+
+    def _prune_snapshots(self, keep):
+        snapshots_path = os.path.join(self.base_path, self.index, SNAPSHOT_DIR)
+        prefix = f"{INTERVAL_FOLDERS[self.interval]}-"
+        snapshots = sorted(name for name in os.listdir(snapshots_path) if name.startswith(prefix))
+        for name in snapshots[:-max(1, keep)]:
+            path = os.path.join(snapshots_path, name)
+            if os.path.realpath(path) != os.path.realpath(self.partition_path):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def migrate_csv_tree(base_path=None, remove_csv=False):
+    """
+    Converte una volta sola tutti i file *_historical_data.csv di Trading/Data nel price store.
+    :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+    :param remove_csv: Se True cancella i CSV convertiti.
+    :return: Numero di file convertiti.
+    """
+    base_path = base_path if base_path is not None else f"{source_directory}/Trading/Data"
+    migrated = 0
+    for index in sorted(os.listdir(base_path)):
+        for interval, folder in INTERVAL_FOLDERS.items():
+            if not os.path.isdir(os.path.join(base_path, index, folder)):
+                continue
+            store = PriceStore(index=index, interval=interval, base_path=base_path)
+            for filename in sorted(os.listdir(store.data_path)):
+                if not filename.endswith(CSV_SUFFIX):
+                    continue
+                ticker = filename[:-len(CSV_SUFFIX)]
+                try:
+                    store.write(ticker, read_price_csv(store.csv_path(ticker)))
+                except Exception as e:
+                    print(f"Failed to migrate {ticker}: {e}")
+                    continue
+                if remove_csv:
+                    os.remove(store.csv_path(ticker))
+                migrated += 1
+            store.save_watermarks()
+            print(f"Migrated {store.data_path}")
+    return migrated
+
+
+if __name__ == '__main__':
+    print(f"Converted {migrate_csv_tree()} files")
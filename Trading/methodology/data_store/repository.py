@@ -0,0 +1,185 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from Trading.methodology.data_store.price_store import PriceStore, WATERMARK_FILE
+from Trading.methodology.data_store.universe_panel import UniversePanel
+from Trading.methodology.data_store.snapshot import SnapshotTable
+from Trading.methodology.Indicators.streaming import IndicatorStateStore
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class DataRepository:
+    """
+    Repository dei dati condiviso da tutto il processo (bot e scanner), con una cache LRU
+    limitata in memoria di DataFrame per ticker e di panel dell'universo.
+    Ogni elemento in cache è legato alla versione dei file da cui è stato letto: se il file,
+    l'indice dei watermark o lo snapshot della partizione cambiano, viene riletto dal disco;
+    altrimenti le richieste ripetute non fanno I/O.
+    # Esempio d'uso:
+    # repository = get_repository()
+    # df = repository.frame("AAPL", index="SP500")
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, base_path=None):
+        """
+        :param max_bytes: Memoria massima occupata dai DataFrame in cache.
+        :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+        """
+        self.max_bytes = max_bytes
+        self.base_path = base_path
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._size = 0
+        self._stores = {}
+        self._lock = threading.RLock()
+
+    def store(self, index="SP500", interval='1d'):
+        """
+        PriceStore della partizione, ricreato quando viene pubblicato un nuovo snapshot o quando
+        cambia l'indice dei watermark (nuove barre aggiunte da update_data).
+        :return: Tupla (PriceStore, mtime dell'indice dei watermark).
+        """
+        with self._lock:
+            cached = self._stores.get((index, interval))
+            if cached is not None:
+                store, data_path, watermark_mtime = cached
+                if store.data_path == data_path and \
+                        _mtime(os.path.join(data_path, WATERMARK_FILE)) == watermark_mtime:
+                    return store, watermark_mtime
+            store = PriceStore(index=index, interval=interval, base_path=self.base_path)
+            data_path = store.data_path
+            watermark_mtime = _mtime(os.path.join(data_path, WATERMARK_FILE))
+            self._stores[(index, interval)] = (store, data_path, watermark_mtime)
+            return store, watermark_mtime
+
+    def frame(self, ticker, index="SP500", interval='1d', columns=None):
+        """
+        Storico di un ticker, dalla cache se ancora valido.
+        Viene restituita una copia superficiale: aggiungere colonne non modifica la cache.
+        :param ticker: Simbolo del titolo.
+        :param index: Nome dell'indice ("SP500" o "Russel").
+        :param interval: '1d', '1wk' o '1mo'.
+        :param columns: Colonne da leggere (default tutte).
+        :return: DataFrame con indice 'Date'.
+        """
+        store, watermark_mtime = self.store(index, interval)
+        version = (store.data_path, watermark_mtime,
+                   _mtime(store.file_path(ticker)) or _mtime(store.csv_path(ticker)))
+        key = ('frame', index, interval, ticker, tuple(columns) if columns is not None else None)
+
+        df = self._get(key, version)
+        if df is None:
+            df = store.read(ticker, columns=columns)
+            self._put(key, version, df, int(df.memory_usage(deep=True).sum()))
+        return df.copy(deep=False)
+
+    def panel(self, index="SP500", interval='1d'):
+        """
+        Panel dell'universo, dalla cache se l'indice dei watermark e i metadati del panel non sono
+        cambiati (come per frame, senza elencare i file della partizione).
+        :return: UniversePanel.
+        """
+        store, watermark_mtime = self.store(index, interval)
+        _, meta_path = UniversePanel.paths(store)
+        version = (store.data_path, watermark_mtime, _mtime(meta_path))
+        key = ('panel', index, interval)
+
+        panel = self._get(key, version)
+        if panel is None:
+            panel = UniversePanel.load(index=index, interval=interval, base_path=self.base_path)
+            # load può aver ricostruito il panel e riscritto i metadati
+            version = (store.data_path, watermark_mtime, _mtime(meta_path))
+            # Un panel in memory-map occupa page cache condivisa, non memoria del processo
+            size = 0 if isinstance(panel.values, np.memmap) else panel.values.nbytes
+            self._put(key, version, panel, size)
+        return panel
+
+    def snapshot(self, index="SP500", interval='1d'):
+        """
+        Tabella dell'ultima barra della partizione, riletta solo quando il downloader la salva.
+        Se non esiste ancora viene costruita una volta dall'archivio.
+        :return: SnapshotTable.
+        """
+        store, _ = self.store(index, interval)
+        table = SnapshotTable(store)
+        version = (store.data_path, _mtime(table.path))
+        key = ('snapshot', index, interval)
+
+        cached = self._get(key, version)
+        if cached is not None:
+            return cached
+        if version[1] is None:
+            table.rebuild()
+            table.save()
+            version = (store.data_path, _mtime(table.path))
+        self._put(key, version, table, 0)
+        return table
+
+    def indicator_states(self, index="SP500", interval='1d'):
+        """
+        Stato incrementale degli indicatori salvato dal downloader, ricreato quando cambiano lo snapshot
+        o l'indice dei watermark. Gli stati dei ticker vengono letti alla prima richiesta e poi restano
+        in memoria.
+        :return: IndicatorStateStore.
+        """
+        store, watermark_mtime = self.store(index, interval)
+        version = (store.data_path, watermark_mtime)
+        key = ('indicator_states', index, interval)
+
+        states = self._get(key, version)
+        if states is None:
+            states = IndicatorStateStore(store)
+            self._put(key, version, states, 0)
+        return states
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._size = 0
+
+    def _get(self, key, version):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key, version, value, size):
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._size -= old[2]
+            if size > self.max_bytes:
+                return
+            self._cache[key] = (version, value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, _, evicted_size) = self._cache.popitem(last=False)
+                self._size -= evicted_size
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """
+    :return: Il DataRepository condiviso dal processo.
+    """
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = DataRepository()
+        return _repository
@@ -0,0 +1,116 @@
+import json
+import os
+from Trading.methodology.data_store.price_store import PriceStore
+
+RESAMPLE_STATE_FILE = "_resampled.json"
+# Le barre settimanali e mensili sono etichettate con l'inizio del periodo, come quelle di Yahoo
+RESAMPLE_RULES = {'1wk': 'W-MON', '1mo': 'MS'}
+OHLCV_AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+                     'Adj Close': 'last', 'Volume': 'sum'}
+
+
+def resample_ohlcv(df, interval='1wk'):
+    """
+    Aggrega barre giornaliere in barre settimanali o mensili: primo Open, massimo High,
+    minimo Low, ultimo Close e somma dei volumi. I periodi senza barre vengono scartati.
+    :param df: DataFrame OHLCV giornaliero con indice datetime.
+    :param interval: '1wk' o '1mo'.
+    :return: DataFrame OHLCV con indice alla data di inizio del periodo.
+    """
+    if interval not in RESAMPLE_RULES:
+        raise ValueError("Invalid interval. Choose '1wk' for weekly or '1mo' for monthly data.")
+    aggregation = {column: how for column, how in OHLCV_AGGREGATION.items() if column in df.columns}
+    bars = df.resample(RESAMPLE_RULES[interval], label='left', closed='left').agg(aggregation)
+    bars = bars.dropna(subset=['Close'])
+    bars.index.name = 'Date'
+    return bars
+
+
+def _load_state(store):
+    # Snapshot giornaliero di partenza e ultima data giornaliera usata per ogni ticker del resample in store
+    try:
+        with open(os.path.join(store.data_path, RESAMPLE_STATE_FILE), 'r') as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        return {}
+    # Le versioni precedenti salvavano solo le date per ticker
+    return state if 'tickers' in state else {}
+
+
+def _save_state(store, state):
+    path = os.path.join(store.data_path, RESAMPLE_STATE_FILE)
+    with open(f"{path}.tmp", 'w') as file:
+        json.dump(state, file, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def build_resampled(index="SP500", intervals=('1wk',), tickers=None, base_path=None, incremental=True):
+    """
+    Costruisce le barre settimanali (e opzionalmente mensili) di tutto l'indice a partire dai
+    dati giornalieri, da eseguire dopo l'aggiornamento giornaliero.
+    Ogni partizione viene costruita in un'area di staging e pubblicata come nuovo snapshot (vedi
+    PriceStore.publish): i lettori vedono sempre barre coerenti e un'interruzione non lascia dati a metà.
+    Nelle esecuzioni incrementali l'area di staging parte dallo snapshot corrente, i ticker senza nuove
+    barre giornaliere vengono saltati e per gli altri si leggono solo le barre giornaliere dall'inizio
+    dell'ultimo periodo salvato (di solito la settimana parziale), che viene sostituito e completato
+    con i periodi successivi tramite append. Dopo un nuovo snapshot giornaliero (refresh completo dei
+    dati) lo storico viene invece ricostruito per intero.
+    :param index: Nome dell'indice ("SP500" o "Russel").
+    :param intervals: Intervalli da costruire ('1wk', '1mo').
+    :param tickers: Ticker da elaborare (default tutti quelli giornalieri).
+    :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+    :param incremental: Se False ricostruisce tutto lo storico.
+    :return: Numero di ticker elaborati.
+    """
+    daily = PriceStore(index=index, interval='1d', base_path=base_path)
+    # Tutte le letture dallo stesso snapshot giornaliero, anche se nel frattempo ne viene pubblicato un altro
+    daily = PriceStore(index=index, interval='1d', base_path=base_path, data_path=daily.data_path)
+    daily_snapshot = os.path.basename(daily.data_path)
+    partial_universe = tickers is not None
+    tickers = daily.tickers() if tickers is None else tickers
+    targets = [PriceStore(index=index, interval=interval, base_path=base_path) for interval in intervals]
+    states = [_load_state(target) if incremental else {} for target in targets]
+    rebuilds = [state.get('daily') != daily_snapshot for state in states]
+    sources = [{} if rebuild else state['tickers'] for state, rebuild in zip(states, rebuilds)]
+    stagings = [target.staging(copy_current=partial_universe or not rebuild)
+                for target, rebuild in zip(targets, rebuilds)]
+
+    processed = 0
+    try:
+        for ticker in tickers:
+            daily_last = daily.last_date(ticker)
+            if daily_last is None:
+                print(f"No data for {ticker} in {daily.data_path}")
+                continue
+            daily_last = daily_last.strftime('%Y-%m-%d')
+            pending = []
+            for staging, source, rebuild in zip(stagings, sources, rebuilds):
+                last_period = None if rebuild else staging.last_date(ticker)
+                if last_period is None or source.get(ticker) != daily_last:
+                    pending.append((staging, source, last_period))
+            if not pending:
+                continue
+
+            periods = [last_period for _, _, last_period in pending]
+            daily_bars = daily.read(ticker, start=None if None in periods else min(periods))
+            for staging, source, last_period in pending:
+                if last_period is None:
+                    staging.write(ticker, resample_ohlcv(daily_bars, staging.interval))
+                else:
+                    trailing = resample_ohlcv(daily_bars[daily_bars.index >= last_period], staging.interval)
+                    staging.append(ticker, trailing, replace_last=True)
+                source[ticker] = daily_last
+            processed += 1
+
+        for staging, source in zip(stagings, sources):
+            staging.save_watermarks()
+            _save_state(staging, {'daily': daily_snapshot, 'tickers': source})
+    except BaseException:
+        for target, staging in zip(targets, stagings):
+            target.discard(staging)
+        raise
+
+    for target, staging in zip(targets, stagings):
+        target.publish(staging)
+    print(f"Resampled {processed} of {len(tickers)} tickers of {index} to {', '.join(intervals)}")
+    return processed
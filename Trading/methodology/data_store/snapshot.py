@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FILE = "_snapshot.json"
+SNAPSHOT_COLUMNS = ['LastDate', 'Price', 'AverageVolume', 'DollarVolume', 'Bars']
+
+
+def last_bar_summary(df, window=20):
+    """
+    Riga della tabella di snapshot di un ticker.
+    :param df: DataFrame con colonne 'Close' e 'Volume' e indice datetime.
+    :param window: Numero di sedute per le medie di volume e controvalore.
+    :return: Dizionario con LastDate, Price (ultima chiusura), AverageVolume, DollarVolume, Bars; None se vuoto.
+    """
+    close = df['Close'].to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(close))
+    if len(valid) == 0:
+        return None
+    recent = valid[-window:]
+    volume = df['Volume'].to_numpy(dtype=np.float64)[recent]
+    close = close[recent]
+    return {'LastDate': df.index[valid[-1]].strftime('%Y-%m-%d'), 'Price': float(close[-1]),
+            'AverageVolume': float(volume.mean()), 'DollarVolume': float((close * volume).mean()),
+            'Bars': int(len(valid))}
+
+
+class SnapshotTable:
+    """
+    Tabella dell'ultima barra di ogni ticker di una partizione (ultima chiusura, volume e controvalore
+    medi delle ultime sedute, ultima data), salvata in _snapshot.json accanto ai dati dello snapshot e
+    aggiornata dal downloader. Gli scanner la interrogano prima di leggere gli storici: vengono letti
+    solo i ticker che superano i filtri su prezzo e volume.
+    # Esempio d'uso:
+    # snapshot = SnapshotTable(PriceStore(index="SP500"))
+    # tickers = snapshot.select(max_price=50, min_volume=1e6)
+    """
+    def __init__(self, store, window=20):
+        """
+        :param store: PriceStore della partizione.
+        :param window: Numero di sedute per le medie di volume e controvalore.
+        """
+        self.store = store
+        self.window = window
+        # Righe in memoria e file da cui sono state lette
+        self._rows = None
+        self._source = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """
+        File della tabella nello snapshot corrente: risolto a ogni accesso come PriceStore.data_path,
+        così una tabella di lunga durata segue gli snapshot pubblicati dopo la sua creazione.
+        """
+        return os.path.join(self.store.data_path, SNAPSHOT_FILE)
+
+    def _load(self):
+        path = self.path
+        with self._lock:
+            if self._rows is None or self._source != path:
+                try:
+                    with open(path, 'r') as file:
+                        self._rows = json.load(file)
+                except FileNotFoundError:
+                    self._rows = {}
+                self._source = path
+            return self._rows
+
+    def __contains__(self, ticker):
+        return ticker in self._load()
+
+    def refresh(self, ticker, df=None):
+        """
+        Ricalcola la riga di un ticker leggendo solo le colonne Close e Volume.
+        :param df: Storico già in memoria, al posto della lettura dall'archivio.
+        :return: Dizionario della riga oppure None se il ticker non ha dati.
+        """
+        if df is None:
+            df = self.store.read(ticker, columns=['Close', 'Volume']) if self.store.exists(ticker) else None
+        row = last_bar_summary(df, self.window) if df is not None else None
+        rows = self._load()
+        with self._lock:
+            if row is None:
+                rows.pop(ticker, None)
+            else:
+                rows[ticker] = row
+        return row
+
+    def rebuild(self, tickers=None):
+        """
+        Ricostruisce la tabella per i ticker indicati (default tutti quelli della partizione).
+        """
+        for ticker in self.store.tickers() if tickers is None else tickers:
+            self.refresh(ticker)
+
+    def frame(self):
+        """
+        :return: DataFrame con indice 'Ticker' e colonne SNAPSHOT_COLUMNS.
+        """
+        rows = self._load()
+        with self._lock:
+            df = pd.DataFrame.from_dict(dict(rows), orient='index', columns=SNAPSHOT_COLUMNS)
+        df.index.name = 'Ticker'
+        return df
+
+    def select(self, tickers=None, min_price=None, max_price=None, min_volume=None, max_volume=None,
+               min_dollar_volume=None, max_dollar_volume=None):
+        """
+        Ticker che superano i filtri sull'ultima barra, nell'ordine di tickers. I ticker assenti dalla
+        tabella (ad esempio aggiunti dopo l'ultimo aggiornamento) vengono mantenuti.
+        :param tickers: Lista dei ticker (default tutti quelli della tabella).
+        :return: Lista dei ticker.
+        """
+        df = self.frame()
+        keep = pd.Series(True, index=df.index)
+        for column, low, high in (('Price', min_price, max_price), ('AverageVolume', min_volume, max_volume),
+                                  ('DollarVolume', min_dollar_volume, max_dollar_volume)):
+            if low is not None:
+                keep &= df[column] >= low
+            if high is not None:
+                keep &= df[column] <= high
+        if tickers is None:
+            return df.index[keep].tolist()
+        passed = set(df.index[keep])
+        return [ticker for ticker in tickers if ticker in passed or ticker not in df.index]
+
+    def save(self):
+        """
+        Salva la tabella (scrittura atomica).
+        """
+        rows = self._load()
+        with self._lock:
+            data, path = dict(rows), self._source
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", 'w') as file:
+            json.dump(data, file, sort_keys=True)
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,183 @@
+import os
+import glob
+import json
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from Trading.methodology.data_store.price_store import PriceStore, INTERVAL_FOLDERS
+
+PANEL_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class UniversePanel:
+    """
+    Panel allineato (ticker x date x OHLCV) di un intero indice, salvato su disco come .npy
+    e aperto in memory-map in sola lettura: più processi possono mappare lo stesso file
+    condividendo la page cache senza copiarlo.
+    I dati sono memorizzati campo per campo, quindi panel.field("Close") è una matrice
+    contigua (ticker x date). Le barre mancanti valgono NaN.
+    # Esempio d'uso:
+    # panel = UniversePanel.load(index="SP500")
+    # close = panel.field("Close")
+    # last_close = close[panel.ticker_index["AAPL"], -1]
+    """
+    def __init__(self, values, tickers, dates, fields=PANEL_FIELDS, data_version=None):
+        """
+        :param values: Array (campi, ticker, date).
+        :param tickers: Lista dei ticker, nell'ordine delle righe.
+        :param dates: Calendario condiviso (DatetimeIndex).
+        :param fields: Nomi dei campi, nell'ordine del primo asse.
+        :param data_version: Versione dei dati del price store da cui è stato costruito.
+        """
+        self.values = values
+        self.tickers = list(tickers)
+        self.dates = pd.DatetimeIndex(dates, name='Date')
+        self.fields = list(fields)
+        self.data_version = data_version
+        self.ticker_index = {ticker: row for row, ticker in enumerate(self.tickers)}
+
+    @property
+    def shape(self):
+        """
+        :return: Forma di values: (campi, ticker, date).
+        """
+        return self.values.shape
+
+    def field(self, name):
+        """
+        :param name: Nome del campo ('Open', 'High', 'Low', 'Close', 'Volume').
+        :return: Matrice (ticker x date) del campo, senza copie.
+        """
+        return self.values[self.fields.index(name)]
+
+    def frame(self, ticker):
+        """
+        Ricostruisce il DataFrame di un singolo ticker eliminando le date senza dati.
+        :param ticker: Simbolo del titolo.
+        :return: DataFrame con indice 'Date' e colonne OHLCV.
+        """
+        row = self.ticker_index[ticker]
+        df = pd.DataFrame(self.values[:, row, :].T, index=self.dates, columns=self.fields)
+        return df.dropna(how='all')
+
+    @staticmethod
+    def paths(store):
+        """
+        :return: Tupla (prefisso dei file .npy, file .json dei metadati) del panel di una partizione.
+                 Ogni costruzione scrive i dati in <prefisso>.<build>.npy e i metadati indicano quale file leggere.
+        """
+        prefix = os.path.join(store.base_path, store.index, f"{INTERVAL_FOLDERS[store.interval]}_panel")
+        return prefix, f"{prefix}.json"
+
+    @classmethod
+    def build(cls, store, tickers=None, fields=PANEL_FIELDS):
+        """
+        Costruisce il panel leggendo tutti i ticker della partizione e lo salva su disco.
+        :param store: PriceStore della partizione.
+        :param tickers: Ticker da includere (default tutti quelli presenti nel price store).
+        :param fields: Campi da includere.
+        :return: UniversePanel mappato in memoria.
+        """
+        data_version = store.data_version()
+        tickers = store.tickers() if tickers is None else list(tickers)
+        fields = list(fields)
+        frames = dict(store.read_many(tickers, columns=fields))
+        tickers = [ticker for ticker in tickers if ticker in frames]
+
+        dates = pd.DatetimeIndex([])
+        for df in frames.values():
+            dates = dates.union(df.index)
+
+        prefix, meta_path = cls.paths(store)
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        build = uuid.uuid4().hex[:12]
+        values_path = f"{prefix}.{build}.npy"
+        tmp_values = f"{values_path}.tmp"
+        tmp_meta = f"{meta_path}.{build}.tmp"
+
+        values = np.lib.format.open_memmap(tmp_values, mode='w+', dtype=np.float64,
+                                           shape=(len(fields), len(tickers), len(dates)))
+        values[:] = np.nan
+        for row, ticker in enumerate(tickers):
+            df = frames[ticker]
+            positions = dates.get_indexer(df.index)
+            values[:, row, positions] = df[fields].to_numpy(dtype=np.float64).T
+        values.flush()
+        del values
+
+        meta = {
+            "tickers": tickers,
+            "dates": [date.strftime('%Y-%m-%d') for date in dates],
+            "fields": fields,
+            "data_version": data_version,
+            "values_file": os.path.basename(values_path),
+            "shape": [len(fields), len(tickers), len(dates)],
+        }
+        with open(tmp_meta, 'w') as file:
+            json.dump(meta, file)
+
+        # Ogni costruzione ha il suo file di dati e i metadati, sostituiti per ultimi, indicano quale
+        # leggere: un lettore non può abbinare metadati di una costruzione ai dati di un'altra.
+        os.replace(tmp_values, values_path)
+        os.replace(tmp_meta, meta_path)
+        # I file delle costruzioni precedenti restano leggibili da chi li ha già mappati in memoria
+        for old in glob.glob(f"{glob.escape(prefix)}.*.npy"):
+            if old != values_path:
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+        print(f"Panel built for {store.data_path}: {len(tickers)} tickers x {len(dates)} dates")
+        return cls.open(store)
+
+    @classmethod
+    def open(cls, store, attempts=5):
+        """
+        Apre il panel esistente in memory-map senza verificarne l'aggiornamento. Se nel frattempo una
+        nuova costruzione ha sostituito i file, i metadati vengono riletti.
+        :param attempts: Numero massimo di letture dei metadati.
+        :return: UniversePanel; FileNotFoundError se il panel non esiste o non è coerente.
+        """
+        prefix, meta_path = cls.paths(store)
+        for attempt in range(attempts):
+            with open(meta_path, 'r') as file:
+                meta = json.load(file)
+            try:
+                values = np.load(os.path.join(os.path.dirname(prefix), meta["values_file"]), mmap_mode='r')
+            except (KeyError, FileNotFoundError):
+                # Metadati di un formato precedente o file dei dati già rimosso da una nuova costruzione
+                values = None
+            if values is not None and list(values.shape) == meta["shape"]:
+                return cls(values, meta["tickers"], pd.to_datetime(meta["dates"]), meta["fields"],
+                           meta["data_version"])
+            time.sleep(0.05 * (attempt + 1))
+        raise FileNotFoundError(f"Panel {meta_path} is missing or inconsistent")
+
+    @classmethod
+    def load(cls, index="SP500", interval='1d', base_path=None, fields=PANEL_FIELDS):
+        """
+        Apre il panel di un indice ricostruendolo se manca o se il price store è cambiato
+        (ad esempio dopo StockDataDownloader.update_data).
+        :param index: Nome dell'indice ("SP500" o "Russel").
+        :param interval: '1d' o '1wk'.
+        :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+        :param fields: Campi richiesti.
+        :return: UniversePanel mappato in memoria.
+        """
+        store = PriceStore(index=index, interval=interval, base_path=base_path)
+        _, meta_path = cls.paths(store)
+        if os.path.exists(meta_path):
+            try:
+                panel = cls.open(store)
+            except FileNotFoundError:
+                panel = None
+            if panel is not None and panel.data_version == store.data_version() and set(fields) <= set(panel.fields):
+                return panel
+        return cls.build(store, fields=fields)
+
+
+if __name__ == '__main__':
+    for index in ("SP500", "Russel"):
+        panel = UniversePanel.load(index=index)
+        print(index, panel.shape)
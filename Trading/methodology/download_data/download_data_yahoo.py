@@ -1,91 +1,188 @@
 import os
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import pandas as pd
-import shutil
+from Trading.methodology.data_store.price_store import PriceStore, normalize_frame
+from Trading.methodology.download_data.providers import YahooProvider
+from Trading.methodology.Indicators.streaming import IndicatorStateStore
+from Trading.methodology.data_store.snapshot import SnapshotTable
 
 source_directory ="/home/dp/PycharmProjects/Portfolio_management/Portfolio_management"
 class StockDataDownloader:
-    def __init__(self, stock_list, interval='1d', index = "SP500"):
+    def __init__(self, stock_list, interval='1d', index = "SP500", provider=None, batch_size=50, max_workers=4,
+                 base_path=None):
+        """
+        :param stock_list: Lista dei ticker da scaricare.
+        :param interval: '1d' per i dati giornalieri, '1wk' per quelli settimanali.
+        :param index: Nome dell'indice ("SP500" o "Russel").
+        :param provider: Sorgente dati (default YahooProvider).
+        :param batch_size: Numero di ticker richiesti con una sola chiamata alla sorgente.
+        :param max_workers: Numero massimo di gruppi scaricati in parallelo.
+        :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+        """
         self.tickers = stock_list
         self.interval = interval
+        self.provider = provider if provider is not None else YahooProvider()
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
 
-        if interval == '1d' and index == "SP500":
-            self.data_path = f'{source_directory}/Trading/Data/SP500/Daily/'
-        elif interval == '1wk'and index == "SP500":
-            self.data_path = f'{source_directory}/Trading/Data/SP500/Weekly/'
-        elif interval == '1d' and index == "Russel":
-            self.data_path = f'{source_directory}/Trading/Data/Russel/Daily/'
-        elif interval == '1wk'and index == "Russel":
-            self.data_path = f'{source_directory}/Trading/Data/Russel/Weekly/'
-        else:
-            raise ValueError("Invalid interval. Choose '1d' for daily or '1wk' for weekly data.")
+        if index not in ("SP500", "Russel"):
+            raise ValueError("Invalid index. Choose 'SP500' or 'Russel'.")
+        if base_path is None:
+            base_path = f'{source_directory}/Trading/Data'
+        self.store = PriceStore(index=index, interval=interval, base_path=base_path)
+        self.data_path = f'{self.store.data_path}/'
+        self.indicator_states = IndicatorStateStore(self.store)
+        self.snapshot = SnapshotTable(self.store)
 
         # Creare la cartella se non esiste
         if not os.path.exists(self.data_path):
             os.makedirs(self.data_path)
 
+    def _batches(self, tickers):
+        return [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+
+    def _download_batch(self, store, batch, start_date, end_date, states, snapshot):
+        """
+        Scarica un gruppo di ticker con una sola richiesta e salva un file per ticker. Stato degli
+        indicatori e riga di snapshot vengono ricostruiti subito dai dati scaricati, senza rileggerli.
+        :param store: PriceStore in cui scrivere (area di staging durante un refresh completo).
+        :param states: IndicatorStateStore della stessa partizione di store.
+        :param snapshot: SnapshotTable della stessa partizione di store.
+        :return: Lista dei ticker del gruppo per cui non sono arrivati dati.
+        """
+        frames = self.provider.download(batch, start=start_date, end=end_date, interval=self.interval)
+        failed = []
+        for ticker in batch:
+            data = frames.get(ticker)
+            if data is None or data.empty:
+                failed.append(ticker)
+                continue
+            data = normalize_frame(data)
+            store.write(ticker, data)
+            states.rebuild(ticker, data)
+            snapshot.refresh(ticker, data)
+        return failed
+
     def download_data(self):
+        """
+        Riscarica l'intero dataset in un'area di staging e la pubblica con uno scambio atomico
+        solo a fine download. Fino ad allora lettori e bot continuano a vedere i dati precedenti;
+        se il download fallisce i dati precedenti restano invariati.
+        """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=1*365)  # 1 anni fa
-        self.delete_folder_contents(self.data_path)
-        for ticker in self.tickers[:]:
-            try:
-                data = yf.download(ticker, start=start_date, end=end_date, interval=self.interval)
-                data.to_csv(f"{self.data_path}{ticker}_historical_data.csv")
-                print(f"Dati aggiornati per {ticker}")
-            except Exception as e:
-                print(f"Failed to download data for {ticker}: {e}")
-                self.tickers.remove(ticker)  # Rimuovi il ticker dalla lista
+        staging = self.store.staging()
+        # Stato degli indicatori e snapshot del nuovo storico, pubblicati insieme ai dati
+        states = IndicatorStateStore(staging)
+        snapshot = SnapshotTable(staging)
+
+        failed = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self._download_batch, staging, batch, start_date, end_date, states,
+                                           snapshot): batch
+                           for batch in self._batches(self.tickers)}
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        failed.extend(future.result())
+                        print(f"Dati aggiornati per {len(batch)} ticker ({batch[0]} - {batch[-1]})")
+                    except Exception as e:
+                        print(f"Failed to download data for {batch}: {e}")
+                        failed.extend(batch)
+        except BaseException:
+            self.store.discard(staging)
+            raise
+
+        if len(failed) == len(self.tickers):
+            print("Download failed for every ticker, previous data kept.")
+            self.store.discard(staging)
+            return
+
+        for ticker in failed:
+            print(f"Failed to download data for {ticker}")
+            # Per non lasciare buchi si conserva l'ultimo storico valido del ticker
+            if self.store.exists(ticker):
+                data = self.store.read(ticker)
+                staging.write(ticker, data)
+                states.rebuild(ticker, data)
+                snapshot.refresh(ticker, data)
+            self.tickers.remove(ticker)  # Rimuovi il ticker dalla lista
 
+        states.save()
+        snapshot.save()
+        self.store.publish(staging)
+        self.data_path = f'{self.store.data_path}/'
+        self.indicator_states = IndicatorStateStore(self.store)
+        self.snapshot = SnapshotTable(self.store)
+
+    def _update_batch(self, batch, start_date, end_date):
+        """
+        Scarica per un gruppo di ticker solo le barre mancanti e le aggiunge in coda allo storico.
+        Un ticker senza dati nel risultato non ha barre nuove (ad esempio nei giorni festivi).
+        :return: Lista vuota, per uniformità con _download_batch.
+        """
+        frames = self.provider.download(batch, start=start_date, end=end_date, interval=self.interval)
+        for ticker, data in frames.items():
+            data = normalize_frame(data)
+            synced_at = self.store.last_date(ticker)
+            self.store.append(ticker, data)
+            # Gli indicatori avanzano solo con le barre nuove
+            self.indicator_states.advance(ticker, data, synced_at)
+            self.snapshot.refresh(ticker)
+        return []
 
     def update_data(self):
+        """
+        Aggiornamento incrementale: per ogni ticker l'ultima data viene letta dall'indice dei
+        watermark, i ticker già aggiornati vengono saltati senza aprirne i file e per gli altri si
+        scarica solo l'intervallo mancante, raggruppando i ticker con la stessa data di partenza.
+        I ticker senza storico vengono scaricati per intero.
+        """
         end_date = datetime.now()
+        step = pd.Timedelta(days=1 if self.interval == '1d' else 7)
 
         # Assicurarsi che la cartella esista
         if not os.path.exists(self.data_path):
             os.makedirs(self.data_path)
-        
-        for ticker in self.tickers[:]:
-            csv_file = f"{self.data_path}{ticker}_historical_data.csv"
-            
-            try:
-                df = pd.read_csv(csv_file, index_col='Date')
-                df.index = pd.to_datetime(df.index)
-
-                if df.empty:
-                    raise Exception("CSV file is empty")
-
-                last_date = df.index[-1]
-                start_date = last_date + pd.Timedelta(days=1 if self.interval == '1d' else 7)
-
-                if start_date < end_date:
-                    new_data = yf.download(ticker, start=start_date, end=end_date, interval=self.interval)
-                    new_data.index = pd.to_datetime(new_data.index)
-
-                    # Rimuovere i duplicati
-                    combined_df = pd.concat([df, new_data]).drop_duplicates()
-
-                    # Salvare i dati aggiornati
-                    combined_df.to_csv(csv_file)
-                    print(f"Dati aggiornati per {ticker}")
-                else:
-                    print(f"{ticker} è già aggiornato.")
-
-            except FileNotFoundError:
-                print(f"Il file {csv_file} non esiste. Scarico tutto il dataset.")
-                self._download_data()
-            except (IndexError, Exception) as e:
-                print(f"Errore durante la lettura o il download di {ticker}: {e}")
-                self.tickers.remove(ticker)  # Rimuovi il ticker dalla lista
-
-    def delete_folder_contents(self, folder):
-        for filename in os.listdir(folder):
-            file_path = os.path.join(folder, filename)
-            try:
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.unlink(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-            except Exception as e:
-                print(f'Failed to delete {file_path}. Reason: {e}')
\ No newline at end of file
+
+        groups = {}
+        missing = []
+        up_to_date = 0
+        for ticker in self.tickers:
+            last_date = self.store.last_date(ticker)
+            if last_date is None:
+                print(f"Il file per {ticker} non esiste. Scarico tutto il dataset.")
+                missing.append(ticker)
+                continue
+            start_date = last_date + step
+            if start_date < end_date:
+                groups.setdefault(start_date, []).append(ticker)
+            else:
+                up_to_date += 1
+        print(f"{up_to_date} ticker già aggiornati, {sum(len(t) for t in groups.values())} da aggiornare, "
+              f"{len(missing)} da scaricare.")
+
+        jobs = [(self._update_batch, (batch, start_date, end_date), batch)
+                for start_date, tickers in sorted(groups.items()) for batch in self._batches(tickers)]
+        jobs += [(self._download_batch, (self.store, batch, end_date - timedelta(days=1*365), end_date,
+                                         self.indicator_states, self.snapshot), batch)
+                 for batch in self._batches(missing)]
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(function, *args): batch for function, args, batch in jobs}
+            for future in as_completed(futures):
+                try:
+                    failed.extend(future.result())
+                except Exception as e:
+                    print(f"Errore durante il download di {futures[future]}: {e}")
+                    failed.extend(futures[future])
+
+        self.store.save_watermarks()
+        for ticker in failed:
+            print(f"Errore durante il download di {ticker}")
+            self.tickers.remove(ticker)  # Rimuovi il ticker dalla lista
+        self.indicator_states.save()
+        self.snapshot.save()
@@ -0,0 +1,136 @@
+import time
+import zlib
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+
+def split_multi_ticker(data, tickers):
+    """
+    Divide il DataFrame multi-ticker restituito da yf.download(group_by='ticker') in un
+    DataFrame per ticker, scartando i ticker senza dati.
+    :param data: DataFrame con colonne MultiIndex (ticker, campo) o colonne semplici per un solo ticker.
+    :param tickers: Lista dei ticker richiesti.
+    :return: Dizionario {ticker: DataFrame}.
+    """
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        if len(tickers) == 1:
+            frames[tickers[0]] = data.dropna(how='all')
+        return frames
+
+    # Il livello del ticker cambia tra le versioni di yfinance
+    level = 0 if set(tickers) & set(data.columns.get_level_values(0)) else 1
+    available = set(data.columns.get_level_values(level))
+    for ticker in tickers:
+        if ticker not in available:
+            continue
+        df = data.xs(ticker, axis=1, level=level).dropna(how='all')
+        if not df.empty:
+            frames[ticker] = df
+    return frames
+
+
+class DataProvider:
+    """
+    Interfaccia delle sorgenti dati usate da StockDataDownloader.
+    Una sorgente riceve un gruppo di ticker e restituisce un DataFrame OHLCV per ognuno.
+    """
+    def download(self, tickers, start, end, interval='1d'):
+        """
+        :param tickers: Lista dei ticker del gruppo.
+        :param start: Data iniziale.
+        :param end: Data finale (esclusa).
+        :param interval: '1d' o '1wk'.
+        :return: Dizionario {ticker: DataFrame}; i ticker senza dati non compaiono.
+        """
+        raise NotImplementedError
+
+
+class YahooProvider(DataProvider):
+    """
+    Sorgente Yahoo Finance: una sola richiesta yf.download per tutto il gruppo di ticker.
+    """
+    def download(self, tickers, start, end, interval='1d'):
+        data = yf.download(tickers, start=start, end=end, interval=interval, group_by='ticker',
+                           auto_adjust=False, threads=False, progress=False)
+        return split_multi_ticker(data, tickers)
+
+
+class LocalFakeProvider(DataProvider):
+    """
+    Sorgente finta senza rete per test e benchmark. Genera barre deterministiche per ogni
+    ticker e simula la latenza di una richiesta.
+    # Esempio d'uso:
+    # downloader = StockDataDownloader(tickers, provider=LocalFakeProvider(latency=0.2))
+    """
+    def __init__(self, latency=0.0, latency_per_ticker=0.0, missing=()):
+        """
+        :param latency: Secondi di attesa fissi per ogni richiesta.
+        :param latency_per_ticker: Secondi di attesa aggiuntivi per ogni ticker della richiesta.
+        :param missing: Ticker per cui la sorgente non restituisce dati.
+        """
+        self.latency = latency
+        self.latency_per_ticker = latency_per_ticker
+        self.missing = set(missing)
+        self.requests = 0
+
+    def bars(self, ticker, start, end, interval='1d'):
+        """
+        :return: DataFrame OHLCV deterministico per il ticker nell'intervallo [start, end).
+        """
+        freq = 'B' if interval == '1d' else 'W-MON'
+        dates = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end), freq=freq, inclusive='left')
+        dates.name = 'Date'
+        # Il seme dipende solo dal ticker: una data ha sempre la stessa barra, qualunque sia l'intervallo richiesto
+        epoch = pd.Timestamp('2000-01-03')
+        offset = int(np.busday_count(epoch.date(), dates[0].date())) if len(dates) else 0
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        steps = rng.normal(0, 0.01, size=offset + len(dates))
+        base = 10 + zlib.crc32(ticker.encode()) % 90
+        close = (base * np.exp(np.cumsum(steps)))[offset:]
+        steps = steps[offset:]
+        open_ = close * (1 - steps / 2)
+        high = np.maximum(open_, close) * 1.005
+        low = np.minimum(open_, close) * 0.995
+        volume = (1e5 + (zlib.crc32(ticker.encode()) % 1000) * 1e3) * np.ones(len(dates))
+        return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close,
+                             'Adj Close': close, 'Volume': volume.astype('int64')}, index=dates)
+
+    def download(self, tickers, start, end, interval='1d'):
+        self.requests += 1
+        time.sleep(self.latency + self.latency_per_ticker * len(tickers))
+        return {ticker: self.bars(ticker, start, end, interval)
+                for ticker in tickers if ticker not in self.missing}
+
+
+def benchmark_download(tickers, provider, configurations=((1, 1), (50, 1), (50, 4)), base_path=None):
+    """
+    Confronta i tempi di download_data con diverse combinazioni (batch_size, max_workers).
+    :param tickers: Lista dei ticker.
+    :param provider: Sorgente dati (tipicamente LocalFakeProvider).
+    :param configurations: Tuple (batch_size, max_workers) da provare.
+    :param base_path: Cartella radice dei dati in cui scrivere.
+    :return: Dizionario {(batch_size, max_workers): secondi}.
+    """
+    from Trading.methodology.download_data.download_data_yahoo import StockDataDownloader
+
+    timings = {}
+    for batch_size, max_workers in configurations:
+        downloader = StockDataDownloader(list(tickers), provider=provider, batch_size=batch_size,
+                                         max_workers=max_workers, base_path=base_path)
+        start = time.perf_counter()
+        downloader.download_data()
+        timings[(batch_size, max_workers)] = time.perf_counter() - start
+        print(f"batch_size={batch_size} max_workers={max_workers}: {timings[(batch_size, max_workers)]:.2f}s")
+    return timings
+
+
+if __name__ == '__main__':
+    import tempfile
+    fake_tickers = [f"T{i:03d}" for i in range(200)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        benchmark_download(fake_tickers, LocalFakeProvider(latency=0.05, latency_per_ticker=0.002), base_path=tmp_dir)
@@ -0,0 +1,76 @@
+import numpy as np
+
+
+def find_peaks_batch(values, start=0):
+    """
+    Massimi locali di più serie in una sola chiamata, con la stessa definizione di
+    scipy.signal.find_peaks senza parametri: una barra (o un plateau di valori uguali) è un picco
+    se i valori subito prima e subito dopo sono strettamente minori; per un plateau il picco è la
+    barra centrale. La prima e l'ultima barra di ogni finestra non sono mai picchi.
+    :param values: Array con il tempo sull'ultimo asse, ad esempio (date), (ticker x date) o
+                   (campi x ticker x date).
+    :param start: Prima barra della finestra di ricerca, uno scalare o un array con la forma degli
+                  assi iniziali (una per serie); le barre precedenti vengono ignorate.
+    :return: Array booleano della stessa forma di values, True sui picchi.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    length = values.shape[-1]
+    rows = values.reshape(-1, length)
+    starts = np.broadcast_to(np.asarray(start, dtype=np.int64), values.shape[:-1]).reshape(-1)
+
+    # Tutte le finestre concatenate in un solo vettore, riga dopo riga
+    in_window = np.arange(length) >= starts[:, None]
+    row_of, column_of = np.nonzero(in_window)
+    flat = rows[in_window]
+    peaks = np.zeros(rows.shape, dtype=bool)
+    if flat.size == 0:
+        return peaks.reshape(values.shape)
+
+    # Sequenze di valori uguali (i NaN sono sempre sequenze a sé); una nuova riga apre una nuova sequenza
+    new_run = np.ones(len(flat), dtype=bool)
+    new_run[1:] = (flat[1:] != flat[:-1]) | (row_of[1:] != row_of[:-1])
+    run_start = np.flatnonzero(new_run)
+    run_end = np.append(run_start[1:], len(flat)) - 1
+    run_value = flat[run_start]
+    run_row = row_of[run_start]
+
+    is_peak = np.zeros(len(run_start), dtype=bool)
+    if len(run_start) > 2:
+        same_row = (run_row[:-2] == run_row[1:-1]) & (run_row[2:] == run_row[1:-1])
+        is_peak[1:-1] = same_row & (run_value[:-2] < run_value[1:-1]) & (run_value[2:] < run_value[1:-1])
+    middle = (run_start[is_peak] + run_end[is_peak]) // 2
+    peaks[row_of[middle], column_of[middle]] = True
+    return peaks.reshape(values.shape)
+
+
+def lateral_levels(ohlc, start=0):
+    """
+    Supporto e resistenza della finestra laterale di una o più serie OHLC: la resistenza è il
+    picco più alto tra tutte le colonne, il supporto il minimo locale più basso.
+    :param ohlc: Array (4 x ... x date) con Open, High, Low e Close sul primo asse, ad esempio
+                 panel.values[:4] per tutto l'universo.
+    :param start: Prima barra della finestra laterale, scalare o array con la forma degli assi intermedi.
+    :return: Tupla (supporto, resistenza); NaN se nella finestra non ci sono picchi.
+    """
+    ohlc = np.asarray(ohlc, dtype=np.float64)
+    start = np.broadcast_to(np.asarray(start, dtype=np.int64), ohlc.shape[1:-1])
+    max_peaks = find_peaks_batch(ohlc, start)
+    min_peaks = find_peaks_batch(-ohlc, start)
+    with np.errstate(invalid='ignore'):
+        resistance = np.where(max_peaks, ohlc, -np.inf).max(axis=(0, -1))
+        support = np.where(min_peaks, ohlc, np.inf).min(axis=(0, -1))
+    return np.where(np.isfinite(support), support, np.nan), np.where(np.isfinite(resistance), resistance, np.nan)
+
+
+def current_streak(condition):
+    """
+    Numero di barre consecutive, contando dall'ultima, in cui la condizione è vera.
+    :param condition: Array booleano con il tempo sull'ultimo asse.
+    :return: Array di interi con la forma degli assi iniziali.
+    """
+    condition = np.asarray(condition, dtype=bool)
+    length = condition.shape[-1]
+    if length == 0:
+        return np.zeros(condition.shape[:-1], dtype=np.int64)
+    last_false = np.where(~condition, np.arange(length), -1).max(axis=-1)
+    return length - 1 - last_false
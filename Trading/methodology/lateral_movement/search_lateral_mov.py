@@ -1,8 +1,13 @@
 import numpy as np
 import pandas as pd
 from scipy.signal import find_peaks
+from Trading.methodology.Indicators import indicators
+from Trading.methodology.lateral_movement.peaks import lateral_levels, current_streak
+from Trading.methodology.lateral_movement.trendlines import linear_fit
 from Trading.methodology.lateral_movement.search_type_mov import TrendMovementAnalyzer
 
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
 class SupportResistanceFinder:
     def __init__(self, data):
         """
@@ -25,33 +30,31 @@ class SupportResistanceFinder:
         # Esegui la regressione lineare
         x = peak_points.index
         y = peak_points.values
-        slope, intercept = np.polyfit(x, y, 1)
+        slope, intercept = linear_fit(x, y)
         return slope, intercept
 
-    def find_peaks_for_series(self, series, lateral_period):
+    def find_peaks_for_series(self, series, lateral_period=None):
         """
         Trova i picchi per una serie di dati in un periodo laterale specificato.
         :param series: Serie di dati (prezzo di apertura, massimo, minimo o chiusura).
-        :param lateral_period: Intervallo di tempo del periodo laterale.
+        :param lateral_period: Intervallo di tempo del periodo laterale (default tutta la serie).
         """
         # Limita la ricerca dei picchi al periodo laterale
-        lateral_series = series[lateral_period]
+        lateral_series = series if lateral_period is None else series[lateral_period]
         peaks, _ = find_peaks(lateral_series)
         return lateral_series.iloc[peaks]
 
-    def find_support_resistance(self):
+    def find_support_resistance(self, lateral_period=None):
         """
-        Trova i livelli di supporto e resistenza.
+        Trova i livelli di supporto e resistenza: picchi e minimi locali delle quattro colonne OHLC,
+        cercati in una sola chiamata (vedi peaks.find_peaks_batch).
+        :param lateral_period: Numero di barre finali del periodo laterale (default tutta la serie).
+        :return: Tupla (supporto, resistenza); NaN se non ci sono picchi.
         """
-        # Trova i picchi per ogni tipo di prezzo
-        max_peaks = pd.concat([self.find_peaks_for_series(self.data[col]) for col in ['Open', 'High', 'Low', 'Close']])
-        min_peaks = pd.concat([self.find_peaks_for_series(-self.data[col]) for col in ['Open', 'High', 'Low', 'Close']])
-
-        # Calcola i livelli di supporto e resistenza
-        resistance_levels = max_peaks.max()
-        support_levels = -min_peaks.max()
-
-        return support_levels, resistance_levels
+        ohlc = self.data[OHLC_COLUMNS].to_numpy(dtype=np.float64).T
+        start = 0 if lateral_period is None else max(len(self.data) - int(lateral_period), 0)
+        support_levels, resistance_levels = lateral_levels(ohlc, start)
+        return float(support_levels), float(resistance_levels)
 
 
 def analyze_stock_for_lateral_movement(data, method='ADX', **kwargs):
@@ -62,6 +65,8 @@ def analyze_stock_for_lateral_movement(data, method='ADX', **kwargs):
     :param kwargs: Parametri aggiuntivi per i metodi di movimento laterale.
     :return: Tuple con (is_lateral, max_streak, support_line, resistance_line) se il movimento è laterale, altrimenti (False, None, None, None).
     """
+    # Le barre incomplete non entrano nelle finestre degli indicatori
+    data = data.dropna(subset=OHLC_COLUMNS)
     lateral_checker = TrendMovementAnalyzer(data)
     support_finder = SupportResistanceFinder(data)
 
@@ -78,8 +83,89 @@ def analyze_stock_for_lateral_movement(data, method='ADX', **kwargs):
     if not is_lateral:
         return False, None, None, None
 
-    # Trova le linee di supporto e resistenza
-    support_line, resistance_line = support_finder.find_support_resistance()
+    # Trova le linee di supporto e resistenza nelle barre del movimento laterale in corso
+    support_line, resistance_line = support_finder.find_support_resistance(lateral_period=int(max_streak.iloc[-1]))
 
     return is_lateral, max_streak, support_line, resistance_line
 
+
+
+def _lateral_condition(ohlc, method, window=None, adx_threshold=25, adx_method='rolling', last_periods=10,
+                       threshold=0.05, num_std_dev=2, threshold_percentage=0.05):
+    # Stesse condizioni dei metodi is_lateral_movement_* di TrendMovementAnalyzer, su tutte le righe insieme
+    _, high, low, close = ohlc
+    with np.errstate(invalid='ignore'):
+        if method == 'ADX':
+            adx_values, _, _ = indicators.adx(high, low, close, window or 14, adx_method)
+            return adx_values < adx_threshold
+        if method == 'Percent':
+            return np.abs(indicators.rolling_sum(indicators.pct_change(close), last_periods)) < threshold
+        if method == 'Bollinger':
+            middle, upper_band, lower_band = indicators.bollinger_bands(close, window or 20, num_std_dev)
+            return (upper_band - lower_band) / middle < threshold_percentage
+    raise ValueError("Invalid method specified")
+
+
+def _align_valid_bars(ohlc):
+    """
+    Barre complete di ogni ticker spostate in fondo, nell'ordine originale, con i NaN all'inizio: come
+    se le serie fossero lette dal DataFrame del ticker senza le date in cui non ha barre.
+    :param ohlc: Array (4 x ticker x date).
+    :return: Array della stessa forma.
+    """
+    valid = ~np.isnan(ohlc).any(axis=0)
+    # Ordinamento stabile: prima le barre mancanti, poi quelle valide nel loro ordine
+    order = np.argsort(valid, axis=-1, kind='stable')
+    aligned = np.take_along_axis(ohlc, np.broadcast_to(order, ohlc.shape), axis=-1)
+    aligned[:, ~np.take_along_axis(valid, order, axis=-1)] = np.nan
+    return aligned
+
+
+def analyze_universe_for_lateral_movement(ohlc, method='ADX', **kwargs):
+    """
+    Versione di analyze_stock_for_lateral_movement per tutti i ticker insieme. Come nell'analisi per
+    ticker le barre incomplete vengono scartate prima di calcolare gli indicatori.
+    :param ohlc: Array (4 x ticker x date) con Open, High, Low, Close, ad esempio panel.values[:4]
+                 di un UniversePanel (NaN per le barre mancanti).
+    :param method: Metodo per determinare il movimento laterale ('ADX', 'Percent', 'Bollinger').
+    :param kwargs: Parametri del metodo (window, adx_threshold, adx_method, last_periods, threshold,
+                   num_std_dev, threshold_percentage).
+    :return: Tupla di array per ticker (is_lateral, barre del movimento laterale in corso, supporto, resistenza);
+             supporto e resistenza sono NaN per i ticker non laterali.
+    """
+    ohlc = _align_valid_bars(np.asarray(ohlc, dtype=np.float64))
+    condition = _lateral_condition(ohlc, method, **kwargs)
+    streak = current_streak(condition)
+    is_lateral = streak > 0
+
+    support_line, resistance_line = lateral_levels(ohlc, ohlc.shape[-1] - streak)
+    support_line[~is_lateral] = np.nan
+    resistance_line[~is_lateral] = np.nan
+    return is_lateral, streak, support_line, resistance_line
+
+
+def scan_lateral_movement(panel, tickers=None, method='ADX', max_price=None, **kwargs):
+    """
+    Movimento laterale, supporto e resistenza di tutti i ticker di un UniversePanel in una sola analisi
+    (vedi analyze_universe_for_lateral_movement).
+    # Esempio d'uso:
+    # found = scan_lateral_movement(get_repository().panel("SP500"), method='Percent', max_price=50)
+    :param panel: UniversePanel.
+    :param tickers: Ticker da analizzare (default tutti quelli del panel); quelli assenti vengono ignorati.
+    :param method: Metodo per determinare il movimento laterale ('ADX', 'Percent', 'Bollinger').
+    :param max_price: Se indicato, solo i ticker con l'ultima chiusura non superiore.
+    :param kwargs: Parametri del metodo, come per analyze_universe_for_lateral_movement.
+    :return: DataFrame con indice 'Ticker' e colonne 'Streak', 'Support', 'Resistance' dei soli ticker laterali.
+    """
+    tickers = panel.tickers if tickers is None else [ticker for ticker in tickers if ticker in panel.ticker_index]
+    rows = np.array([panel.ticker_index[ticker] for ticker in tickers], dtype=np.int64)
+    ohlc = np.stack([np.asarray(panel.field(column))[rows] for column in OHLC_COLUMNS])
+    is_lateral, streak, support_line, resistance_line = analyze_universe_for_lateral_movement(ohlc, method, **kwargs)
+    if max_price is not None:
+        close = ohlc[3]
+        last = np.where(~np.isnan(close), np.arange(close.shape[1]), -1).max(axis=1)
+        with np.errstate(invalid='ignore'):
+            is_lateral &= (last >= 0) & (close[np.arange(len(rows)), np.maximum(last, 0)] <= max_price)
+    found = np.flatnonzero(is_lateral)
+    return pd.DataFrame({'Streak': streak[found], 'Support': support_line[found], 'Resistance': resistance_line[found]},
+                        index=pd.Index([tickers[position] for position in found], name='Ticker'))
@@ -2,6 +2,17 @@ import pandas as pd
 import json
 from Reports.report_builder import ReportGenerator
 from Reports.image_builder import CandlestickChartGenerator
+from Trading.methodology.scan_engine.scan_engine import run_scan, clear_scan_images
+from Trading.methodology.Indicators.feature_frame import FeatureFrame
+
+
+def _streak(condition):
+    """
+    :param condition: pd.Series booleana.
+    :return: Tupla (condizione sull'ultima barra, serie delle barre consecutive in cui la condizione è vera).
+    """
+    max_streak = condition.cumsum() - condition.cumsum().where(~condition).ffill().fillna(0).max()
+    return condition.iloc[-1], max_streak
 
 
 class TrendMovementAnalyzer:
@@ -9,32 +20,34 @@ class TrendMovementAnalyzer:
         self.data = df
         if max_price is not None:
             self.data= self.data[self.data['Close'] <= max_price]
+        # Indicatori calcolati una sola volta e condivisi da tutti i metodi, senza copie del DataFrame
+        self.features = FeatureFrame(self.data)
         self.image = CandlestickChartGenerator(self.data)
 
+    def _has_close(self):
+        if self.data is None:
+            print("Data not found.")
+            return False
+        # Verify that dataset contain close column
+        if 'Close' not in self.data.columns:
+            print("Close column is not present.")
+            return False
+        return True
+
     def is_upward_trend_SMA(self, window=20, lookback_period=20, threshold=0.5):
         """
         Identify if moovemnte is upware.
         :param window: SMA period.
         :return: return boolean value if trand is upware.
         """
-        self.data_copy = self.data.copy()
-        if self.data_copy is None:
-            print("Data not found.")
-            return False, None
-
-        # Verify that dataset contain close column
-        if 'Close' not in self.data_copy.columns:
-            print("Close column is not present.")
+        if not self._has_close():
             return False, None
 
-        # Calculate SMA
-        self.data_copy['Moving_Average'] = self.data_copy['Close'].rolling(window=window).mean()
-
         # Determine if Close is above Moving Average
-        self.data_copy['Above_MA'] = self.data_copy['Close'] > self.data_copy['Moving_Average']
+        above_ma = self.features.column('Close') > self.features.sma(window)
 
         # Calculate the proportion of recent periods where Close is above MA
-        recent_trend = self.data_copy['Above_MA'].iloc[-lookback_period:]
+        recent_trend = above_ma[-lookback_period:]
         upward_trend_proportion = recent_trend.sum() / len(recent_trend)
         is_trend_up= upward_trend_proportion >= threshold
         # if is_trend_up:
@@ -48,24 +61,14 @@ class TrendMovementAnalyzer:
         :param window: SMA period.
         :return: return boolean value if trand is upware.
         """
-        self.data_copy = self.data.copy()
-        if self.data_copy is None:
-            print("Data not found.")
-            return False, None
-
-        # Verify that dataset contain close column
-        if 'Close' not in self.data_copy.columns:
-            print("Close column is not present.")
+        if not self._has_close():
             return False, None
 
-        # Calculate SMA
-        self.data_copy['Moving_Average'] = self.data_copy['Close'].rolling(window=window).mean()
+        # Determine if Close is below Moving Average
+        below_ma = self.features.column('Close') < self.features.sma(window)
 
-        # Determine if Close is above Moving Average
-        self.data_copy['Above_MA'] = self.data_copy['Close'] < self.data_copy['Moving_Average']
-
-        # Calculate the proportion of recent periods where Close is above MA
-        recent_trend = self.data_copy['Above_MA'].iloc[-lookback_period:]
+        # Calculate the proportion of recent periods where Close is below MA
+        recent_trend = below_ma[-lookback_period:]
         downward_trend_proportion = recent_trend.sum() / len(recent_trend)
         is_trend_down = downward_trend_proportion >= threshold
         # if is_trend_down:
@@ -80,15 +83,7 @@ class TrendMovementAnalyzer:
         :param window: Numero di periodi da usare per calcolare l'RSI.
         :return: Serie RSI.
         """
-        self.data_copy = self.data.copy()
-        delta = self.data_copy['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-
-        return rsi
+        return self.features.series(self.features.rsi(window))
 
     def is_upward_trend_using_RSI(self, rsi_threshold=50, window=14):
         """
@@ -97,16 +92,12 @@ class TrendMovementAnalyzer:
         :param window: period number for to define RSI.
         :return: Bool, True if trend is up, False otherwise.
         """
-        self.data_copy = self.data.copy()
-        if self.data_copy is None:
+        if self.data is None:
             print("Data not found.")
             return False, None
 
-        # RSI
-        self.data_copy['RSI'] = self._calculate_RSI(window)
-
         # Verify if movement is upware
-        is_trend_up = self.data_copy['RSI'] > rsi_threshold
+        is_trend_up = self._calculate_RSI(window) > rsi_threshold
         # if is_trend_up:
         #     image =self.image.create_chart_with_RSI(max_points=90)
 
@@ -119,47 +110,29 @@ class TrendMovementAnalyzer:
         :param window: period number for to devine RSI.
         :return: Bool, True if trend is down, False otherwise.
         """
-        self.data_copy = self.data.copy()
-        if self.data_copy is None:
+        if self.data is None:
             print("Data not found.")
             return False, None
 
-        # RSI
-        self.data_copy['RSI'] = self._calculate_RSI(window)
-
         # Verify if movement is downware
-        is_trend_down = self.data_copy['RSI'] < rsi_threshold
+        is_trend_down = self._calculate_RSI(window) < rsi_threshold
         # if is_trend_down:
         #     image =self.image.create_chart_with_RSI(max_points=90)
 
         return is_trend_down#, image
 
-    def _calculate_MACD(self, span_short=12, span_long=26, span_signal=9):
-        """
-        Calculates the Moving Average Convergence Divergence (MACD).
-        :param span_short: Span for the short-term EMA.
-        :param span_long: Span for the long-term EMA.
-        :param span_signal: Span for the signal line.
-        """
-        self.data_copy['EMA_short'] = self.data_copy['Close'].ewm(span=span_short, adjust=False).mean()
-        self.data_copy['EMA_long'] = self.data_copy['Close'].ewm(span=span_long, adjust=False).mean()
-        self.data_copy['MACD'] = self.data_copy['EMA_short'] - self.data_copy['EMA_long']
-        self.data_copy['Signal_Line'] = self.data_copy['MACD'].ewm(span=span_signal, adjust=False).mean()
-
     def is_upward_trend_using_MACD(self):
         """
         Determines if there is an upward trend using MACD.
         :return: Bool, True if there is an upward trend, False otherwise.
         """
-        self.data_copy = self.data.copy()
-        if self.data_copy is None:
+        if self.data is None:
             print("Data not loaded.")
             return False, None
 
-        self._calculate_MACD()
-
         # Check if MACD is above the signal line
-        is_trend_up = self.data_copy['MACD'].iloc[-1] > self.data_copy['Signal_Line'].iloc[-1]
+        macd_line, signal_line = self.features.macd()
+        is_trend_up = macd_line[-1] > signal_line[-1]
         # if is_trend_up:
         #     image =self.image.create_chart_with_MACD(max_points=90)
 
@@ -171,79 +144,46 @@ class TrendMovementAnalyzer:
         Determines if there is a downward trend using MACD.
         :return: Bool, True if there is a downward trend, False otherwise.
         """
-        self.data_copy = self.data.copy()
-        if self.data_copy is None:
+        if self.data is None:
             print("Data not loaded.")
             return False, None
 
-        self._calculate_MACD()
-        is_trend_down= self.data_copy['MACD'].iloc[-1] < self.data_copy['Signal_Line'].iloc[-1]
+        macd_line, signal_line = self.features.macd()
+        is_trend_down= macd_line[-1] < signal_line[-1]
         # if is_trend_down:
         #     image =self.image.create_chart_with_MACD(max_points=90)
 
         return is_trend_down#, image
 
     def is_lateral_movement_bollinger_bands(self, window=20, num_std_dev=2, threshold_percentage=0.05):
-        self.data_copy = self.data.copy()
-        self.data_copy['SMA'] = self.data_copy['Close'].rolling(window=window).mean()
-        self.data_copy['STD_DEV'] = self.data_copy['Close'].rolling(window=window).std()
-        self.data_copy['Upper_Band'] = self.data_copy['SMA'] + (self.data_copy['STD_DEV'] * num_std_dev)
-        self.data_copy['Lower_Band'] = self.data_copy['SMA'] - (self.data_copy['STD_DEV'] * num_std_dev)
-     
-        band_width = (self.data_copy['Upper_Band'] - self.data_copy['Lower_Band']) / self.data_copy['SMA']
-        narrow_band = band_width < threshold_percentage
-        max_streak = narrow_band.cumsum() - narrow_band.cumsum().where(~narrow_band).ffill().fillna(0).max()
-        is_lateral = narrow_band.iloc[-1]
-    
-        return is_lateral, max_streak
-
-    def calculate_ADX(self, window=14):
-        # Calcolo delle differenze positive e negative
-        self.data_copy['+DM'] = self.data_copy['High'].diff()
-        self.data_copy['-DM'] = self.data_copy['Low'].diff()
-
-        # Determina quali differenze devono essere considerate
-        self.data_copy['+DM'] = self.data_copy.apply(lambda row: row['+DM'] if row['+DM'] > row['-DM'] and row['+DM'] > 0 else 0,
-                                           axis=1)
-        self.data_copy['-DM'] = self.data_copy.apply(lambda row: -row['-DM'] if row['-DM'] > row['+DM'] and row['-DM'] > 0 else 0,
-                                           axis=1)
-
-        # Shift the 'Close' column by one to get the previous value
-        self.data_copy['Prev_Close'] = self.data_copy['Close'].shift()
-
-        # Now apply your function
-        self.data_copy['TR'] = self.data_copy.apply(lambda row: max(abs(row['High'] - row['Low']),
-                                                          abs(row['High'] - row['Prev_Close']),
-                                                          abs(row['Low'] - row['Prev_Close'])), axis=1)
-
-        # Calcola gli indicatori direzionali lisciati
-        self.data_copy['+DMI'] = self.data_copy['+DM'].rolling(window=window).mean() / self.data_copy['TR'].rolling(
-            window=window).mean()
-        self.data_copy['-DMI'] = self.data_copy['-DM'].rolling(window=window).mean() / self.data_copy['TR'].rolling(
-            window=window).mean()
-
-        # Calcola l'ADX
-        self.data_copy['DX'] = (abs(self.data_copy['+DMI'] - self.data_copy['-DMI']) / (self.data_copy['+DMI'] + self.data_copy['-DMI'])) * 100
-        self.data_copy['ADX'] = self.data_copy['DX'].rolling(window=window).mean()
-
-    def is_lateral_movement_ADX(self, window=14, adx_threshold=25):
+        middle, upper_band, lower_band = self.features.bollinger_bands(window, num_std_dev)
+        band_width = (upper_band - lower_band) / middle
+        narrow_band = self.features.series(band_width < threshold_percentage)
+        return _streak(narrow_band)
+
+    def calculate_ADX(self, window=14, method='rolling'):
+        """
+        ADX e indicatori direzionali, calcolati una sola volta per ogni combinazione di parametri.
+        :param window: Numero di periodi.
+        :param method: 'rolling' (medie mobili semplici, calcolo storico) o 'wilder'.
+        :return: Tupla (ADX, +DMI, -DMI) di ndarray.
+        """
+        return self.features.adx(window, method)
+
+    def is_lateral_movement_ADX(self, window=14, adx_threshold=25, method='rolling'):
         """
         Determines if there is a lateral movement using the Average Directional Index (ADX).
         :param window: Number of periods for the ADX calculation.
+        :param method: 'rolling' or 'wilder' smoothing.
         :return: Bool, True if there is a lateral movement, False otherwise.
         """
-         self.data_copy = self.data.copy()
-        self.calculate_ADX(window)
-    
-        if not self.data_copy['ADX'].empty:
-            below_threshold = self.data_copy['ADX'] < adx_threshold
-            max_streak = below_threshold.cumsum() - below_threshold.cumsum().where(~below_threshold).ffill().fillna(0).max()
-            is_lateral = below_threshold.iloc[-1]
-        else:
+        adx_values, _, _ = self.calculate_ADX(window, method)
+
+        if len(adx_values) == 0:
             print("ADX empty")
             return False, None
-    
-        return is_lateral, max_streak
+
+        return _streak(self.features.series(adx_values < adx_threshold))
 
     def is_lateral_movement_percent(self, last_periods=10, threshold=0.05):
         """
@@ -252,18 +192,11 @@ class TrendMovementAnalyzer:
         :param threshold: Threshold for defining a lateral movement.
         :return: Bool, True if there is a lateral movement, False otherwise.
         """
-        self.data_copy = self.data.copy()
-
-        if self.data_copy is None or 'Close' not in self.data_copy.columns or len(self.data_copy) < last_periods:
+        if self.data is None or 'Close' not in self.data.columns or len(self.data) < last_periods:
             return False, None
-    
-        self.data_copy['Price_Change'] = self.data_copy['Close'].pct_change()
-        cum_change = self.data_copy['Price_Change'].rolling(window=last_periods).sum().abs()
-        lateral_periods = cum_change < threshold
-        max_streak = lateral_periods.cumsum() - lateral_periods.cumsum().where(~lateral_periods).ffill().fillna(0).max()
-        is_lateral = lateral_periods.iloc[-1]
 
-        return is_lateral, max_streak
+        cum_change = abs(self.features.cumulative_change(last_periods))
+        return _streak(self.features.series(cum_change < threshold))
 
     def evaluate_trend_and_laterality(self, periods= [40], lateral_check_method="percent", lateral_threshold=0.05):
         """
@@ -273,7 +206,6 @@ class TrendMovementAnalyzer:
         :param lateral_threshold: Soglia per il movimento laterale.
         :return: Dict con i risultati della valutazione del trend e del movimento laterale.
         """
-        self.data_copy = self.data.copy()
         trend_results = {}
         for period in periods:
             trend_up = self.is_upward_trend_SMA(window=period)
@@ -306,7 +238,19 @@ class TrendMovementAnalyzer:
     def clear_img_temp_files(self):
         self.image.clear_temp_files()
 
-def main():
+def analyze_trend_and_laterality(ticker, data, lateral_check_method="percent", max_price=50):
+    """
+    Analyzer per run_scan: trend e movimento laterale (vedi evaluate_trend_and_laterality).
+    :return: Dict con 'image', oppure None.
+    """
+    if data["Close"].iloc[-1] >= max_price:
+        return None
+    if not TrendMovementAnalyzer(data).evaluate_trend_and_laterality(lateral_check_method=lateral_check_method):
+        return None
+    return {'image': CandlestickChartGenerator(data).create_simple_chart(max_points=50)}
+
+
+def main(max_workers=None):
     report = ReportGenerator()
     report.add_title(title="Report lateral movement")
 
@@ -318,22 +262,14 @@ def main():
         tickers = json.load(file)
         tickers_list = list(tickers.keys())
 
-    for item in tickers_list:
-        data = pd.read_csv(f"{source_directory}/Trading/Data/Daily/{item}_historical_data.csv")
-        if data["Close"].iloc[-1] < 50:
-            enhanced_strategy = TrendMovementAnalyzer(data)
-            image = CandlestickChartGenerator(data)
-            result = enhanced_strategy.evaluate_trend_and_laterality()
-            if result:
-                image = image.create_simple_chart(max_points=50)
-                print(f'stock = {item} -- FOUND ')
-                report.add_content(f'stock = {item} ')
-                report.add_commented_image(df=data, comment=f'Description', image_path=image)
-            print(f"checked stock {item}")
-        else:
-            print(f"stock {item} is over price")
+    # Solo i titoli sotto i 50 dollari all'ultima barra vengono letti
+    results = run_scan(analyze_trend_and_laterality, tickers_list, index="SP500",
+                       columns=['Open', 'High', 'Low', 'Close'], max_workers=max_workers, where={'max_price': 50})
+    for item, result in results:
+        report.add_content(f'stock = {item} ')
+        report.add_commented_image(df=None, comment=f'Description', image_path=result['image'])
     file_report = report.save_report(filename="Report_lateral_movement")
-    enhanced_strategy.clear_img_temp_files()
+    clear_scan_images(results)
     return file_report
 
 if __name__ == '__main__':
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+def linear_fit(x, y):
+    """
+    Retta dei minimi quadrati in forma chiusa, equivalente a np.polyfit(x, y, 1).
+    :param x: Ascisse.
+    :param y: Ordinate.
+    :return: Tupla (pendenza, intercetta).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x_mean = x.mean()
+    y_mean = y.mean()
+    slope = ((x - x_mean) * (y - y_mean)).sum() / ((x - x_mean) ** 2).sum()
+    return slope, y_mean - slope * x_mean
+
+
+def _window_sum(cumulative, window):
+    # Somma sulle ultime window barre a partire da una somma cumulativa (con uno zero iniziale)
+    result = np.full(cumulative.shape[:-1] + (cumulative.shape[-1] - 1,), np.nan)
+    result[..., window - 1:] = cumulative[..., window:] - cumulative[..., :-window]
+    return result
+
+
+def rolling_linear_fit(values, window):
+    """
+    Regressione lineare su finestre mobili di tutte le serie insieme, con le somme cumulative di
+    y, x*y e y^2 (le somme di x e x^2 sono costanti): nessuna chiamata a np.polyfit.
+    Le ascisse sono le barre della finestra (0 la prima, window - 1 l'ultima).
+    :param values: Array 1-D o (ticker x date) dei prezzi; le finestre con NaN danno NaN.
+    :param window: Numero di barre della finestra.
+    :return: Tupla di array della stessa forma di values, riferiti alla finestra che termina su ogni barra:
+             (pendenza, intercetta sulla prima barra, deviazione standard dei residui).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    length = values.shape[-1]
+    if window < 3 or length < window:
+        empty = np.full(values.shape, np.nan)
+        return empty, empty.copy(), empty.copy()
+
+    # Prezzi riferiti al primo valore valido di ogni serie, per limitare la cancellazione numerica
+    valid = ~np.isnan(values)
+    first = np.take_along_axis(values, valid.argmax(axis=-1)[..., None], axis=-1)
+    y = np.where(valid, values - np.where(np.isnan(first), 0.0, first), 0.0)
+    position = np.arange(length, dtype=np.float64)
+
+    def cumulative(series):
+        return np.concatenate([np.zeros(series.shape[:-1] + (1,)), np.cumsum(series, axis=-1)], axis=-1)
+
+    sum_y = _window_sum(cumulative(y), window)
+    sum_iy = _window_sum(cumulative(position * y), window)
+    sum_yy = _window_sum(cumulative(y * y), window)
+    missing = _window_sum(cumulative((~valid).astype(np.float64)), window)
+
+    # x locale = i - (t - window + 1)
+    sum_xy = sum_iy - (position - window + 1) * sum_y
+    sum_x = window * (window - 1) / 2
+    sum_xx = (window - 1) * window * (2 * window - 1) / 6
+    centered_xx = sum_xx - sum_x ** 2 / window
+    centered_xy = sum_xy - sum_x * sum_y / window
+    centered_yy = sum_yy - sum_y ** 2 / window
+
+    slope = centered_xy / centered_xx
+    intercept = (sum_y - slope * sum_x) / window + first
+    residual = np.sqrt(np.maximum(centered_yy - slope * centered_xy, 0.0) / (window - 2))
+    incomplete = missing > 0
+    for result in (slope, intercept, residual):
+        result[incomplete] = np.nan
+    return slope, intercept, residual
+
+
+def scan_channels(close, tickers, window=60, flat_slope=0.001, max_width=0.05):
+    """
+    Classifica il canale delle ultime window barre di ogni ticker in base alla pendenza relativa
+    della retta di regressione (variazione per barra rispetto al prezzo medio) e tiene solo i canali
+    stretti, con deviazione standard dei residui non oltre max_width del prezzo medio.
+    # Esempio d'uso:
+    # panel = get_repository().panel("SP500")
+    # channels = scan_channels(panel.field('Close'), panel.tickers, window=60)
+    # rising = channels[channels['Channel'] == 'rising']
+    :param close: Matrice (ticker x date) delle chiusure.
+    :param tickers: Ticker nell'ordine delle righe.
+    :param window: Numero di barre del canale.
+    :param flat_slope: Pendenza relativa per barra sotto la quale il canale è piatto.
+    :param max_width: Larghezza massima del canale (residui / prezzo medio).
+    :return: DataFrame con colonne 'Ticker', 'Channel' ('rising', 'falling', 'flat'), 'Slope', 'Width',
+             'Support', 'Resistance' (valori della retta ± 2 deviazioni sull'ultima barra).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    slope, intercept, residual = (result[..., -1] for result in rolling_linear_fit(close, window))
+    mean_price = intercept + slope * (window - 1) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        relative_slope = slope / mean_price
+        width = residual / mean_price
+    keep = width <= max_width
+    channel = np.where(relative_slope > flat_slope, 'rising', np.where(relative_slope < -flat_slope, 'falling', 'flat'))
+    last_value = intercept + slope * (window - 1)
+    return pd.DataFrame({'Ticker': np.asarray(tickers, dtype=object)[keep], 'Channel': channel[keep],
+                         'Slope': relative_slope[keep], 'Width': width[keep],
+                         'Support': (last_value - 2 * residual)[keep], 'Resistance': (last_value + 2 * residual)[keep]})
+
+
+def scan_panel_channels(panel, tickers=None, max_price=None, **kwargs):
+    """
+    Canali di tutti i ticker di un UniversePanel (vedi scan_channels). Le barre mancanti di ogni ticker
+    vengono scartate prima di prendere le ultime window barre, come nell'analisi del singolo storico.
+    # Esempio d'uso:
+    # channels = scan_panel_channels(get_repository().panel("SP500"), max_price=50, window=60)
+    :param panel: UniversePanel.
+    :param tickers: Ticker da analizzare (default tutti quelli del panel); quelli assenti vengono ignorati.
+    :param max_price: Se indicato, solo i ticker con l'ultima chiusura non superiore.
+    :param kwargs: Parametri di scan_channels (window, flat_slope, max_width).
+    :return: DataFrame come scan_channels con in più la colonna 'Close' (ultima chiusura).
+    """
+    tickers = panel.tickers if tickers is None else [ticker for ticker in tickers if ticker in panel.ticker_index]
+    rows = np.array([panel.ticker_index[ticker] for ticker in tickers], dtype=np.int64)
+    close = np.asarray(panel.field('Close'), dtype=np.float64)[rows]
+    # Barre valide in fondo a ogni riga, nel loro ordine
+    order = np.argsort(~np.isnan(close), axis=-1, kind='stable')
+    close = np.take_along_axis(close, order, axis=-1)
+    channels = scan_channels(close, tickers, **kwargs)
+    channels['Close'] = channels['Ticker'].map(dict(zip(tickers, close[:, -1]))).astype(np.float64)
+    if max_price is not None:
+        channels = channels[channels['Close'] <= max_price].reset_index(drop=True)
+    return channels
@@ -1,4 +1,5 @@
 import pandas as pd
+from Trading.methodology.patterns.pattern_engine import equal_extremes, head_and_shoulders, triple_extremes
 
 class InversionPatterns:
     def __init__(self, data):
@@ -16,12 +17,9 @@ class InversionPatterns:
         :param threshold_percentage: La massima differenza percentuale ammessa tra i due massimi.
         :return: Una lista di tuple. Ogni tupla contiene gli indici dei due massimi che formano un Doppio Massimo.
         """
-        indices = []
-        for i in range(1, len(self.data) - min_distance - 1):
-            for j in range(i + min_distance, len(self.data) - 1):
-                if self.is_valid_double_top(i, j, threshold_percentage):
-                    indices.append((i, j))
-        return indices
+        # Stesse coppie di is_valid_double_top su tutte le coppie (i, j), in O(n log n)
+        high = self.data['High'].to_numpy(dtype=float)
+        return equal_extremes(high, high, min_distance, threshold_percentage)
 
     def is_valid_double_top(self, i, j, threshold_percentage):
         """
@@ -32,8 +30,8 @@ class InversionPatterns:
         :param threshold_percentage: Differenza percentuale massima consentita tra i due massimi.
         :return: True se è un Doppio Massimo valido, altrimenti False.
         """
-        first_high = self.data['High'][i]
-        second_high = self.data['High'][j]
+        first_high = self.data['High'].iloc[i]
+        second_high = self.data['High'].iloc[j]
 
         # Controllo che il primo e il secondo massimo siano vicini in termini percentuali
         percentage_difference = abs(first_high - second_high) / first_high * 100
@@ -42,7 +40,7 @@ class InversionPatterns:
 
         # Verifica che non ci siano massimi superiori tra i e j
         for k in range(i + 1, j):
-            if self.data['High'][k] > first_high or self.data['High'][k] > second_high:
+            if self.data['High'].iloc[k] > first_high or self.data['High'].iloc[k] > second_high:
                 return False
 
         return True
@@ -56,12 +54,8 @@ class InversionPatterns:
         :param threshold_percentage: La massima differenza percentuale ammessa tra i due minimi.
         :return: Una lista di tuple. Ogni tupla contiene gli indici dei due minimi che formano un Doppio Minimo.
         """
-        indices = []
-        for i in range(1, len(self.data) - min_distance - 1):
-            for j in range(i + min_distance, len(self.data) - 1):
-                if self.is_valid_double_bottom(i, j, threshold_percentage):
-                    indices.append((i, j))
-        return indices
+        low = self.data['Low'].to_numpy(dtype=float)
+        return equal_extremes(-low, low, min_distance, threshold_percentage)
 
     def is_valid_double_bottom(self, i, j, threshold_percentage):
         """
@@ -72,8 +66,8 @@ class InversionPatterns:
         :param threshold_percentage: Differenza percentuale massima consentita tra i due minimi.
         :return: True se è un Doppio Minimo valido, altrimenti False.
         """
-        first_low = self.data['Low'][i]
-        second_low = self.data['Low'][j]
+        first_low = self.data['Low'].iloc[i]
+        second_low = self.data['Low'].iloc[j]
 
         # Controllo che il primo e il secondo minimo siano vicini in termini percentuali
         percentage_difference = abs(first_low - second_low) / first_low * 100
@@ -82,15 +76,54 @@ class InversionPatterns:
 
         # Verifica che non ci siano minimi inferiori tra i e j
         for k in range(i + 1, j):
-            if self.data['Low'][k] < first_low or self.data['Low'][k] < second_low:
+            if self.data['Low'].iloc[k] < first_low or self.data['Low'].iloc[k] < second_low:
                 return False
 
         return True
 
-    # Metodi simili possono essere aggiunti per altri pattern come Testa e Spalle, ecc.
+    def find_head_and_shoulders(self, order=5, threshold_percentage=3):
+        """
+        Identifica i pattern Testa e Spalle sui massimi locali.
+
+        :param order: Numero di giorni per lato con cui un massimo deve essere il più alto.
+        :param threshold_percentage: La massima differenza percentuale ammessa tra le due spalle.
+        :return: Una lista di tuple (spalla sinistra, testa, spalla destra).
+        """
+        high = self.data['High'].to_numpy(dtype=float)
+        return head_and_shoulders(high, high, order, threshold_percentage)
+
+    def find_inverse_head_and_shoulders(self, order=5, threshold_percentage=3):
+        """
+        Identifica i pattern Testa e Spalle rovesciati sui minimi locali.
+
+        :return: Una lista di tuple (spalla sinistra, testa, spalla destra).
+        """
+        low = self.data['Low'].to_numpy(dtype=float)
+        return head_and_shoulders(-low, low, order, threshold_percentage)
+
+    def find_triple_top(self, order=5, threshold_percentage=3):
+        """
+        Identifica i pattern di Triplo Massimo: tre massimi locali consecutivi allo stesso livello.
+
+        :param order: Numero di giorni per lato con cui un massimo deve essere il più alto.
+        :param threshold_percentage: La massima differenza percentuale ammessa tra i tre massimi.
+        :return: Una lista di tuple con gli indici dei tre massimi.
+        """
+        high = self.data['High'].to_numpy(dtype=float)
+        return triple_extremes(high, high, order, threshold_percentage)
+
+    def find_triple_bottom(self, order=5, threshold_percentage=3):
+        """
+        Identifica i pattern di Triplo Minimo: tre minimi locali consecutivi allo stesso livello.
+
+        :return: Una lista di tuple con gli indici dei tre minimi.
+        """
+        low = self.data['Low'].to_numpy(dtype=float)
+        return triple_extremes(-low, low, order, threshold_percentage)
 
 # Esempio d'uso:
 # data = pd.read_csv('path_to_your_data.csv')
 # pattern_finder = InversionPatterns(data)
 # double_tops = pattern_finder.find_double_top()
 # double_bottoms = pattern_finder.find_double_bottom()
+# head_and_shoulders = pattern_finder.find_head_and_shoulders()
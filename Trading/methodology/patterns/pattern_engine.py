@@ -0,0 +1,173 @@
+import numpy as np
+
+
+def sparse_table(values):
+    """
+    Sparse table dei massimi: il livello l contiene il massimo di ogni blocco [k, k + 2^l).
+    Costruzione O(n log n), interrogazioni O(1) (range_max) o O(log n) (first_reaching).
+    :param values: Array 1-D; i NaN valgono -inf.
+    :return: Lista di array, uno per livello.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    table = [np.where(np.isnan(values), -np.inf, values)]
+    width = 1
+    while 2 * width <= len(values):
+        previous = table[-1]
+        table.append(np.maximum(previous[:-width], previous[width:]))
+        width *= 2
+    return table
+
+
+def range_max(table, left, right):
+    """
+    Massimo di values[left:right] per più intervalli insieme.
+    :param left: Inizi degli intervalli (inclusi).
+    :param right: Fini degli intervalli (escluse); gli intervalli vuoti valgono -inf.
+    :return: Array dei massimi.
+    """
+    left = np.asarray(left, dtype=np.int64)
+    right = np.asarray(right, dtype=np.int64)
+    length = right - left
+    empty = length <= 0
+    level = np.floor(np.log2(np.maximum(length, 1))).astype(np.int64)
+    result = np.full(left.shape, -np.inf)
+    for value in np.unique(level[~empty]):
+        rows = ~empty & (level == value)
+        block = table[value]
+        result[rows] = np.maximum(block[left[rows]], block[right[rows] - (1 << value)])
+    return result
+
+
+def first_reaching(table, start, threshold, strict=False):
+    """
+    Per ogni coppia (start, threshold) la prima posizione k >= start con values[k] >= threshold
+    (values[k] > threshold se strict), con una discesa sui livelli della sparse table.
+    :return: Array delle posizioni; len(values) se la soglia non viene mai raggiunta.
+    """
+    length = len(table[0])
+    position = np.array(start, dtype=np.int64, copy=True)
+    threshold = np.broadcast_to(np.asarray(threshold, dtype=np.float64), position.shape)
+    for level in range(len(table) - 1, -1, -1):
+        width = 1 << level
+        fits = position + width <= length
+        block = np.full(position.shape, np.inf)
+        block[fits] = table[level][position[fits]]
+        # Il blocco viene saltato se resta tutto sotto la soglia
+        skip = fits & ((block <= threshold) if strict else (block < threshold))
+        position[skip] += width
+    return np.minimum(position, length)
+
+
+def equal_extremes(values, prices, min_distance=5, threshold_percentage=3):
+    """
+    Coppie (i, j) di barre con valori vicini e nessun valore superiore tra le due: il motore dei
+    doppi massimi (values = High) e dei doppi minimi (values = -Low).
+    Restituisce esattamente le coppie della ricerca su tutte le coppie di InversionPatterns, con
+    1 <= i, i + min_distance <= j <= n - 2, |p_i - p_j| / p_i * 100 <= threshold_percentage e
+    values[k] <= min(values[i], values[j]) per i < k < j.
+    Per ogni i i candidati j sono i massimi progressivi (record) della serie a partire da i + 1,
+    fino alla prima barra che supera values[i]: il primo candidato utile si trova con la sparse
+    table, i successivi seguendo il "prossimo valore non inferiore". Il costo è O(n log n) più
+    il numero di coppie trovate.
+    :param values: Serie orientata verso l'alto, senza NaN.
+    :param prices: Prezzi originali per il controllo della differenza percentuale.
+    :param min_distance: Numero minimo di barre tra le due barre della coppia.
+    :param threshold_percentage: Differenza percentuale massima tra i due prezzi.
+    :return: Lista di tuple (i, j) in ordine crescente.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    length = len(values)
+    first = np.arange(1, max(length - min_distance - 1, 1))
+    if length < 3 or len(first) == 0:
+        return []
+    table = sparse_table(values)
+    # Prossima barra con valore non inferiore, per ogni barra
+    next_at_least = first_reaching(table, np.arange(length) + 1, values)
+    # j non può superare la prima barra più alta di values[i] né la penultima barra
+    limit = np.minimum(first_reaching(table, first + 1, values[first], strict=True), length - 2)
+    # Le barre tra i + 1 e i + min_distance - 1 sono sempre interne alla coppia
+    inner = range_max(table, first + 1, first + min_distance)
+    tolerance = threshold_percentage / 100 * np.abs(prices[first])
+    lower = np.maximum(inner, values[first] - tolerance * (1 + 1e-9))
+    second = first_reaching(table, first + min_distance, lower)
+
+    found_first, found_second = [], []
+    active = second <= limit
+    while active.any():
+        i, j = first[active], second[active]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            close_enough = np.abs(prices[i] - prices[j]) / prices[i] * 100 <= threshold_percentage
+        found_first.append(i[close_enough])
+        found_second.append(j[close_enough])
+        second[active] = next_at_least[j]
+        active &= second <= limit
+    if not found_first:
+        return []
+    i, j = np.concatenate(found_first), np.concatenate(found_second)
+    order = np.lexsort((j, i))
+    return list(zip(i[order].tolist(), j[order].tolist()))
+
+
+def pivots(values, order=5):
+    """
+    Pivot di massimo: barre che sono il massimo della finestra di order barre per lato.
+    :param values: Serie orientata verso l'alto (High per i massimi, -Low per i minimi).
+    :param order: Barre per lato.
+    :return: Array delle posizioni dei pivot.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    candidates = np.arange(order, len(values) - order)
+    if len(candidates) == 0:
+        return candidates
+    table = sparse_table(values)
+    is_pivot = values[candidates] >= range_max(table, candidates - order, candidates + order + 1)
+    candidates = candidates[is_pivot]
+    # In un plateau resta solo la prima barra
+    if len(candidates) > 1:
+        keep = np.ones(len(candidates), dtype=bool)
+        keep[1:] = ~((np.diff(candidates) <= order) & (values[candidates[1:]] == values[candidates[:-1]]))
+        candidates = candidates[keep]
+    return candidates
+
+
+def head_and_shoulders(values, prices, order=5, threshold_percentage=3):
+    """
+    Testa e spalle sui pivot: tre pivot consecutivi con il centrale (testa) più alto degli altri
+    due (spalle) e spalle con differenza percentuale non oltre threshold_percentage.
+    :param values: Serie orientata verso l'alto (High, oppure -Low per la versione inversa).
+    :param prices: Prezzi originali per il controllo delle spalle.
+    :return: Lista di tuple (spalla sinistra, testa, spalla destra).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    points = pivots(values, order)
+    if len(points) < 3:
+        return []
+    left, head, right = points[:-2], points[1:-1], points[2:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shoulders = np.abs(prices[left] - prices[right]) / prices[left] * 100 <= threshold_percentage
+    keep = shoulders & (values[head] > values[left]) & (values[head] > values[right])
+    return list(zip(left[keep].tolist(), head[keep].tolist(), right[keep].tolist()))
+
+
+def triple_extremes(values, prices, order=5, threshold_percentage=3):
+    """
+    Tripli massimi (o minimi con values = -Low) sui pivot: tre pivot consecutivi con prezzi entro
+    threshold_percentage dal più basso e nessun valore tra il primo e il terzo più alto del massimo dei tre.
+    :return: Lista di tuple (primo, secondo, terzo).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    points = pivots(values, order)
+    if len(points) < 3:
+        return []
+    first, second, third = points[:-2], points[1:-1], points[2:]
+    levels = np.stack([prices[first], prices[second], prices[third]])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        close_enough = (levels.max(axis=0) - levels.min(axis=0)) / np.abs(levels).min(axis=0) * 100 \
+            <= threshold_percentage
+    table = sparse_table(values)
+    peak = np.maximum(np.maximum(values[first], values[second]), values[third])
+    keep = close_enough & (range_max(table, first, third + 1) <= peak)
+    return list(zip(first[keep].tolist(), second[keep].tolist(), third[keep].tolist()))
@@ -0,0 +1,207 @@
+import json
+import os
+from functools import partial
+import numpy as np
+import pandas as pd
+from Trading.methodology.data_store.price_store import INTERVAL_FOLDERS, PriceStore
+from Trading.methodology.patterns.pattern_engine import equal_extremes, head_and_shoulders, pivots, triple_extremes
+from Trading.methodology.scan_engine.scan_engine import run_scan
+
+PATTERN_FILE = "_patterns.json"
+PATTERN_HISTORY_FILE = "_patterns.parquet"
+PATTERN_COLUMNS = ['Ticker', 'Pattern', 'Completed', 'Anchors', 'Prices']
+
+
+def detect_patterns(high, low, start=0, max_span=120, order=5, min_distance=5, threshold_percentage=3):
+    """
+    Pattern di inversione completati a partire dalla barra start. Un doppio massimo/minimo (i, j) è
+    completato sulla barra j + 1, i pattern sui pivot (testa e spalle, tripli) order barre dopo l'ultimo
+    pivot. Dei doppi massimi/minimi di InversionPatterns, che comprendono anche coppie di barre vicine in
+    trend, vengono tenuti solo quelli con il primo punto su un pivot.
+    Vengono considerati solo i pattern lunghi al massimo max_span barre, quindi basta analizzare le ultime
+    barre: il risultato è lo stesso dell'analisi di tutto lo storico filtrata per completamento.
+    :param high: Array dei massimi, senza NaN.
+    :param low: Array dei minimi, senza NaN.
+    :param start: Prima barra nuova (0 per tutto lo storico).
+    :param max_span: Numero massimo di barre tra il primo e l'ultimo punto del pattern.
+    :param order: Barre per lato dei pivot (testa e spalle, tripli).
+    :param min_distance: Distanza minima tra i due punti dei doppi massimi/minimi.
+    :param threshold_percentage: Differenza percentuale massima tra i punti allo stesso livello.
+    :return: Lista di tuple (nome, posizioni dei punti, posizione della barra di completamento, prezzi dei punti).
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    # Margine per i pivot: order barre per lato e il confronto tra pivot vicini nei plateau
+    begin = max(0, start - max_span - 3 * order - 2)
+    window_high, window_low = high[begin:], low[begin:]
+    top_pivots, bottom_pivots = set(pivots(window_high, order).tolist()), set(pivots(-window_low, order).tolist())
+    found = [
+        ('double_top', [pair for pair in equal_extremes(window_high, window_high, min_distance, threshold_percentage)
+                        if pair[0] in top_pivots], 1, high),
+        ('double_bottom', [pair for pair in equal_extremes(-window_low, window_low, min_distance, threshold_percentage)
+                           if pair[0] in bottom_pivots], 1, low),
+        ('head_and_shoulders', head_and_shoulders(window_high, window_high, order, threshold_percentage), order, high),
+        ('inverse_head_and_shoulders', head_and_shoulders(-window_low, window_low, order, threshold_percentage),
+         order, low),
+        ('triple_top', triple_extremes(window_high, window_high, order, threshold_percentage), order, high),
+        ('triple_bottom', triple_extremes(-window_low, window_low, order, threshold_percentage), order, low),
+    ]
+    patterns = []
+    for name, anchors_list, lag, prices in found:
+        for anchors in anchors_list:
+            anchors = tuple(begin + anchor for anchor in anchors)
+            completed = anchors[-1] + lag
+            if completed >= start and anchors[-1] - anchors[0] <= max_span:
+                patterns.append((name, anchors, completed, prices[list(anchors)].tolist()))
+    patterns.sort(key=lambda pattern: (pattern[2], pattern[1]))
+    return patterns
+
+
+def _new_patterns(ticker, data, processed, options):
+    """
+    Analyzer di run_scan: pattern completati sulle barre successive all'ultima data già analizzata.
+    :return: Dizionario con 'last_date' e 'patterns' (righe con le date dei punti).
+    """
+    high, low = data['High'].to_numpy(dtype=np.float64), data['Low'].to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(high) | np.isnan(low))
+    if not valid.all():
+        high, low = high[valid], low[valid]
+    dates = data.index[valid]
+    if len(dates) == 0:
+        return None
+    last_date = processed.get(ticker)
+    start = int(dates.searchsorted(pd.Timestamp(last_date), side='right')) if last_date else 0
+    found = detect_patterns(high, low, start, **options) if start < len(dates) else []
+    labels = dates.strftime('%Y-%m-%d') if found else None
+    rows = [{'Ticker': ticker, 'Pattern': name, 'Completed': labels[completed],
+             'Anchors': [labels[anchor] for anchor in anchors], 'Prices': prices}
+            for name, anchors, completed, prices in found]
+    return {'last_date': dates[-1].strftime('%Y-%m-%d'), 'patterns': rows}
+
+
+class PatternScanner:
+    """
+    Scanner notturno dei pattern di inversione su tutto l'universo. I pattern trovati vengono salvati
+    con le date dei loro punti in Trading/Data/<index>/<Daily|Weekly|Monthly>_patterns.parquet, fuori dagli
+    snapshot della partizione (un refresh completo non li perde); il file _patterns.json accanto contiene
+    solo l'ultima data analizzata di ogni ticker: a ogni esecuzione si analizzano solo le barre nuove e il
+    risultato contiene solo i pattern completati da allora (alla prima esecuzione tutto lo storico).
+    Lo storico tiene solo i pattern completati negli ultimi keep_days giorni.
+    # Esempio d'uso:
+    # scanner = PatternScanner(index="SP500")
+    # new_patterns = scanner.scan(max_workers=4)
+    # history = scanner.patterns()
+    """
+    def __init__(self, index="SP500", interval='1d', base_path=None, max_span=120, order=5, min_distance=5,
+                 threshold_percentage=3, keep_days=365):
+        """
+        :param index: Nome dell'indice ("SP500" o "Russel").
+        :param interval: '1d', '1wk' o '1mo'.
+        :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+        :param max_span: Vedi detect_patterns; cambiando i parametri conviene ripartire con reset().
+        :param keep_days: Giorni di storico tenuti, contati dall'ultimo pattern completato (None per tutto).
+        """
+        self.index = index
+        self.interval = interval
+        self.base_path = base_path
+        self.store = PriceStore(index=index, interval=interval, base_path=base_path)
+        self.path = os.path.join(self.store.base_path, index, f"{INTERVAL_FOLDERS[interval]}{PATTERN_FILE}")
+        self.history_path = os.path.join(self.store.base_path, index,
+                                         f"{INTERVAL_FOLDERS[interval]}{PATTERN_HISTORY_FILE}")
+        self.keep_days = keep_days
+        self.options = dict(max_span=max_span, order=order, min_distance=min_distance,
+                            threshold_percentage=threshold_percentage)
+        # Pattern trovati e non ancora scritti nello storico; cleared se lo storico su disco va scartato
+        self._pending = []
+        self._cleared = False
+        self.state = self._load()
+
+    def _load(self):
+        # Le versioni precedenti salvavano lo stato dentro lo snapshot corrente e i pattern nel JSON
+        for path in (self.path, os.path.join(self.store.data_path, PATTERN_FILE)):
+            try:
+                with open(path, 'r') as file:
+                    state = json.load(file)
+            except FileNotFoundError:
+                continue
+            self._pending.extend(state.pop('patterns', []))
+            return state
+        return {'processed': {}}
+
+    def _history(self):
+        if self._cleared or not os.path.exists(self.history_path):
+            return pd.DataFrame(columns=PATTERN_COLUMNS)
+        history = pd.read_parquet(self.history_path)
+        # Le colonne lista tornano come array numpy
+        for column in ('Anchors', 'Prices'):
+            history[column] = [values.tolist() for values in history[column]]
+        return history
+
+    def save(self):
+        """
+        Salva lo stato (scrittura atomica) e aggiunge allo storico i pattern nuovi, scartando quelli
+        più vecchi di keep_days.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self._pending or self._cleared:
+            history = self.patterns()
+            if self.keep_days is not None and not history.empty:
+                oldest = pd.Timestamp(history['Completed'].max()) - pd.Timedelta(days=self.keep_days)
+                history = history[history['Completed'] >= oldest.strftime('%Y-%m-%d')]
+            history.reset_index(drop=True).to_parquet(f"{self.history_path}.tmp")
+            os.replace(f"{self.history_path}.tmp", self.history_path)
+            self._pending, self._cleared = [], False
+        with open(f"{self.path}.tmp", 'w') as file:
+            json.dump(self.state, file)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def reset(self):
+        """
+        Dimentica i pattern salvati e le date analizzate: la prossima scansione riparte da tutto lo storico.
+        """
+        self.state = {'processed': {}}
+        self._pending, self._cleared = [], True
+
+    def scan(self, tickers=None, max_workers=None, save=True):
+        """
+        Analizza le barre nuove di tutti i ticker in parallelo (vedi run_scan) e aggiunge allo storico
+        i pattern completati.
+        :param tickers: Lista dei ticker (default tutti quelli della partizione).
+        :param max_workers: Numero di processi.
+        :param save: Se True salva lo stato alla fine.
+        :return: DataFrame dei soli pattern nuovi, con colonne PATTERN_COLUMNS.
+        """
+        if tickers is None:
+            # Partizione letta al momento della scansione: nel frattempo può essere stato pubblicato uno snapshot
+            tickers = PriceStore(index=self.index, interval=self.interval, base_path=self.base_path).tickers()
+        tickers = list(tickers)
+        analyzer = partial(_new_patterns, processed=self.state['processed'], options=self.options)
+        results = run_scan(analyzer, tickers, index=self.index, interval=self.interval, columns=['High', 'Low'],
+                           max_workers=max_workers, base_path=self.base_path, verbose=False)
+        new_rows = []
+        for ticker, result in results:
+            self.state['processed'][ticker] = result['last_date']
+            new_rows.extend(result['patterns'])
+        self._pending.extend(new_rows)
+        if save:
+            self.save()
+        print(f"Pattern scan {self.index}: {len(results)} of {len(tickers)} stocks analyzed, "
+              f"{len(new_rows)} new patterns")
+        return pd.DataFrame(new_rows, columns=PATTERN_COLUMNS)
+
+    def patterns(self):
+        """
+        :return: DataFrame di tutti i pattern salvati (e di quelli trovati e non ancora salvati),
+            con colonne PATTERN_COLUMNS.
+        """
+        pending = pd.DataFrame(self._pending, columns=PATTERN_COLUMNS)
+        history = self._history()
+        if history.empty:
+            return pending
+        if pending.empty:
+            return history
+        return pd.concat([history, pending], ignore_index=True)
+
+
+if __name__ == "__main__":
+    PatternScanner(index="SP500").scan()
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from Trading.methodology.data_store.repository import DataRepository, get_repository
+
+
+def _load_frame(repository, ticker, index, interval, columns):
+    try:
+        return repository.frame(ticker, index=index, interval=interval, columns=columns)
+    except FileNotFoundError as e:
+        print(e)
+        return None
+
+
+def _scan_chunk(analyzer, tickers, index="SP500", interval='1d', columns=None, prefetch=2, base_path=None):
+    """
+    Analizza un gruppo di ticker nello stesso processo. Un thread legge in anticipo i DataFrame dei
+    prossimi prefetch ticker mentre il ticker corrente viene analizzato.
+    :return: Lista di tuple (ticker, risultato, errore, secondi).
+    """
+    repository = get_repository() if base_path is None else DataRepository(base_path=base_path)
+    results = []
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        pending = [reader.submit(_load_frame, repository, ticker, index, interval, columns)
+                   for ticker in tickers[:prefetch + 1]]
+        for position, ticker in enumerate(tickers):
+            data = pending[position].result()
+            next_position = position + prefetch + 1
+            if next_position < len(tickers):
+                pending.append(reader.submit(_load_frame, repository, tickers[next_position], index, interval, columns))
+            pending[position] = None
+            if data is None or data.empty:
+                continue
+            start = time.perf_counter()
+            try:
+                results.append((ticker, analyzer(ticker, data), None, time.perf_counter() - start))
+            except Exception as e:
+                results.append((ticker, None, f"{type(e).__name__}: {e}", time.perf_counter() - start))
+    return results
+
+
+def run_scan(analyzer, tickers, index="SP500", interval='1d', columns=None, max_workers=None, chunk_size=25,
+             prefetch=2, base_path=None, verbose=True, where=None):
+    """
+    Esegue un'analisi per ticker su tutto l'universo, distribuendo gruppi di chunk_size ticker su un
+    pool di processi; dentro ogni processo la lettura dei dati è anticipata da un thread.
+    # Esempio d'uso:
+    # def analyze(ticker, data):
+    #     result, image = TradingAnalyzer(data, max_price=50).check_price_range()
+    #     return {'details': result['details'], 'image': image} if result else None
+    # results = run_scan(analyze, tickers_list, columns=['Open', 'High', 'Low', 'Close'], max_workers=4)
+    :param analyzer: Funzione analyzer(ticker, DataFrame) definita a livello di modulo (deve poter essere
+                     importata da un altro processo); restituisce il risultato o None se il ticker va scartato.
+    :param tickers: Lista dei ticker.
+    :param index: Nome dell'indice ("SP500" o "Russel").
+    :param interval: '1d', '1wk' o '1mo'.
+    :param columns: Colonne da leggere (default tutte).
+    :param max_workers: Numero di processi (default os.cpu_count()); con 1 l'analisi gira nel processo corrente
+                        e usa la cache del repository condiviso, come conviene ai chiamanti interattivi (bot).
+    :param chunk_size: Numero di ticker assegnati a un processo alla volta.
+    :param prefetch: Numero di DataFrame letti in anticipo.
+    :param base_path: Cartella radice dei dati (default Trading/Data del progetto).
+    :param verbose: Se True stampa i ticker trovati, gli errori e un riepilogo.
+    :param where: Filtri sull'ultima barra applicati con la tabella di snapshot prima di leggere gli storici,
+                  ad esempio {'max_price': 50, 'min_volume': 1e6} (vedi SnapshotTable.select).
+    :return: Lista di tuple (ticker, risultato) nell'ordine di tickers, solo per i risultati non vuoti.
+    """
+    tickers = list(tickers)
+    if where:
+        repository = get_repository() if base_path is None else DataRepository(base_path=base_path)
+        selected = repository.snapshot(index, interval).select(tickers, **where)
+        if verbose:
+            print(f"Snapshot filter {where}: {len(selected)} of {len(tickers)} stocks to load")
+        tickers = selected
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), max(1, chunk_size))]
+    options = dict(index=index, interval=interval, columns=columns, prefetch=prefetch, base_path=base_path)
+
+    start = time.perf_counter()
+    rows = []
+    if max_workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            rows.extend(_scan_chunk(analyzer, chunk, **options))
+    else:
+        # Processi avviati con spawn: il fork di un processo con più thread (il bot Telegram) può
+        # copiare lock già acquisiti e bloccare i processi figli
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(_scan_chunk, analyzer, chunk, **options) for chunk in chunks]
+            for future in as_completed(futures):
+                rows.extend(future.result())
+
+    order = {ticker: position for position, ticker in enumerate(tickers)}
+    rows.sort(key=lambda row: order[row[0]])
+    results = []
+    errors = 0
+    for ticker, result, error, _ in rows:
+        if error is not None:
+            errors += 1
+            if verbose:
+                print(f"Error on stock {ticker}: {error}")
+        elif result is not None and result is not False:
+            results.append((ticker, result))
+            if verbose:
+                print(f'stock = {ticker} -- FOUND ')
+    if verbose:
+        print(f"Scanned {len(rows)} of {len(tickers)} stocks in {time.perf_counter() - start:.2f}s "
+              f"with {max_workers} workers: {len(results)} found, {errors} errors")
+    return results
+
+
+def clear_scan_images(results, key='image'):
+    """
+    Cancella i grafici temporanei creati dagli analyzer nei processi del pool.
+    :param results: Lista di tuple (ticker, risultato) restituita da run_scan, con il percorso in risultato[key].
+    """
+    for _, result in results:
+        image = result.get(key) if isinstance(result, dict) else None
+        if image and os.path.exists(image):
+            os.remove(image)
@@ -1,10 +1,12 @@
 from Reports.report_builder import ReportGenerator
 import json
-import pandas as pd
+from Trading.methodology.data_store.repository import get_repository
+from Trading.methodology.lateral_movement.search_lateral_mov import scan_lateral_movement
 from Trading.methodology.lateral_movement.search_type_mov import TrendMovementAnalyzer
+from Trading.methodology.scan_engine.scan_engine import clear_scan_images
 
 
-def find_lateral_mov():
+def find_lateral_mov(max_price=50):
     report = ReportGenerator()
     report.add_title(title="Report blocked stock")
 
@@ -15,17 +17,18 @@ def find_lateral_mov():
         tickers = json.load(file)
         tickers_list = list(tickers.keys())
 
-    for item in tickers_list:
-        data = pd.read_csv(f"/home/dp/PycharmProjects/Portfolio_management/Portfolio_management/Trading/Data/Daily/{item}_historical_data.csv")
-        enhanced_strategy = TrendMovementAnalyzer(data, max_price=50)
-        result, image = enhanced_strategy.is_lateral_movement_percent()
-        if result:
-            print(f'stock = {item} -- FOUND ')
-            report.add_content(f'stock = {item} ')
-            report.add_commented_image(df=data, image_path=image)
-        print(f"checked stock {item}")
+    # Tutti i ticker analizzati insieme sul panel dell'universo, grafici solo per quelli trovati
+    panel = get_repository().panel("SP500")
+    found = scan_lateral_movement(panel, tickers_list, method='Percent', max_price=max_price)
+    results = []
+    for item, row in found.iterrows():
+        image = TrendMovementAnalyzer(panel.frame(item).dropna(subset=['Close'])).create_tmp_image()
+        results.append((item, {'image': image}))
+        report.add_content(f'stock = {item} (support = {row["Support"]:.2f}, resistance = {row["Resistance"]:.2f}, '
+                           f'bars = {int(row["Streak"])})')
+        report.add_commented_image(df=None, image_path=image)
     file_report = report.save_report(filename="Report_stock_in_lateral_movement")
-    enhanced_strategy.clear_img_temp_files()
+    clear_scan_images(results)
     return file_report
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
 import pandas as pd
+from Trading.methodology.data_store.repository import get_repository
 
 
 def scan_stocks(stock_data, min_price, max_price, min_volume, max_volume):
@@ -21,6 +22,15 @@ def scan_stocks(stock_data, min_price, max_price, min_volume, max_volume):
 
     return filtered_data
 
+
+def scan_universe(min_price, max_price, min_volume, max_volume, index="SP500", interval='1d'):
+    """
+    Applica scan_stocks alla tabella di snapshot della partizione (colonne 'Price' e 'AverageVolume'),
+    senza leggere gli storici dei ticker.
+    :return: DataFrame delle azioni filtrate, con indice 'Ticker'.
+    """
+    return scan_stocks(get_repository().snapshot(index, interval).frame(), min_price, max_price, min_volume, max_volume)
+
 # Esempio di utilizzo
 # Supponiamo che stock_data sia un DataFrame con colonne 'Price' e 'AverageVolume'
 # stock_data = pd.read_csv('path_to_your_stock_data.csv')
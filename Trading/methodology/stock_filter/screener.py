@@ -0,0 +1,408 @@
+import ast
+import json
+import operator
+import numpy as np
+import pandas as pd
+from Trading.methodology.Indicators import indicators
+from Trading.methodology.data_store.repository import get_repository
+
+SCREENS_FILE = "json_files/screens.json"
+
+# Campi del panel utilizzabili come nomi nelle espressioni
+FIELDS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+# nome: (costo relativo, parametri di default, calcolo di base, uscita del calcolo di base).
+# Funzioni con lo stesso calcolo di base e gli stessi parametri (ad esempio adx, plus_di e minus_di)
+# condividono un unico calcolo.
+FUNCTIONS = {
+    'sma': (2, (20,), 'sma', 0),
+    'ema': (2, (20,), 'ema', 0),
+    'std': (2, (20,), 'std', 0),
+    'highest': (2, (20,), 'highest', 0),
+    'lowest': (2, (20,), 'lowest', 0),
+    'avg_volume': (2, (20,), 'avg_volume', 0),
+    'change': (1, (1,), 'change', 0),
+    'bb_upper': (3, (20, 2), 'bollinger', 1),
+    'bb_lower': (3, (20, 2), 'bollinger', 2),
+    'rsi': (4, (14,), 'rsi', 0),
+    'atr': (4, (14,), 'atr', 0),
+    'macd': (4, (12, 26, 9), 'macd', 0),
+    'macd_signal': (4, (12, 26, 9), 'macd', 1),
+    'adx': (8, (14,), 'adx', 0),
+    'plus_di': (8, (14,), 'adx', 1),
+    'minus_di': (8, (14,), 'adx', 2),
+}
+
+# Calcoli di base mantenuti anche dallo stato incrementale degli indicatori (DEFAULT_INDICATORS di
+# streaming.py) con gli stessi valori: (calcolo di base, parametri) -> (nome, scala di ogni uscita).
+# Gli indicatori direzionali dello stato sono frazioni, quelli dello screener percentuali.
+STATE_INDICATORS = {
+    ('sma', (20,)): ('SMA_20', (1,)),
+    ('sma', (50,)): ('SMA_50', (1,)),
+    ('sma', (200,)): ('SMA_200', (1,)),
+    ('ema', (20,)): ('EMA_20', (1,)),
+    ('rsi', (14,)): ('RSI_14', (1,)),
+    ('macd', (12, 26, 9)): ('MACD', (1, 1)),
+    ('bollinger', (20, 2)): ('Bollinger_20', (1, 1, 1)),
+    ('adx', (14,)): ('ADX_14', (1, 100, 100)),
+}
+
+_BINARY = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_COMPARE = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+            ast.Eq: operator.eq, ast.NotEq: operator.ne}
+
+
+def _base_indicator(base, args, field):
+    """
+    Calcolo di base di una funzione sulle righe selezionate del panel.
+    :param field: Funzione che restituisce la matrice (ticker x date) di un campo per le righe.
+    :return: Tupla di matrici (ticker x date), una per ogni uscita.
+    """
+    if base == 'sma':
+        return indicators.sma(field('Close'), args[0]),
+    if base == 'ema':
+        return indicators.ema(field('Close'), args[0]),
+    if base == 'std':
+        return indicators.rolling_std(field('Close'), args[0]),
+    if base == 'highest':
+        return indicators.rolling_max(field('Close'), args[0]),
+    if base == 'lowest':
+        return indicators.rolling_min(field('Close'), args[0]),
+    if base == 'avg_volume':
+        return indicators.sma(field('Volume'), args[0]),
+    if base == 'change':
+        close = field('Close')
+        previous = np.full(close.shape, np.nan)
+        previous[:, args[0]:] = close[:, :close.shape[1] - args[0]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return close / previous - 1,
+    if base == 'bollinger':
+        return indicators.bollinger_bands(field('Close'), args[0], args[1])
+    if base == 'rsi':
+        return indicators.rsi(field('Close'), args[0]),
+    if base == 'atr':
+        return indicators.atr(field('High'), field('Low'), field('Close'), args[0]),
+    if base == 'macd':
+        return indicators.macd(field('Close'), *args)
+    if base == 'adx':
+        # ADX classico di Wilder, con valori confrontabili con le soglie abituali (ad esempio < 25)
+        adx, plus_di, minus_di = indicators.adx(field('High'), field('Low'), field('Close'), args[0], method='wilder')
+        return adx, plus_di * 100, minus_di * 100
+    raise ValueError(f"Unknown indicator '{base}'")
+
+
+def _term(node):
+    """
+    Forma canonica di un nome o di una chiamata: (etichetta, calcolo di base, parametri, uscita, costo).
+    """
+    if isinstance(node, ast.Name):
+        if node.id not in FIELDS:
+            raise ValueError(f"Unknown field '{node.id}', expected one of {sorted(FIELDS)}")
+        return node.id, 'field', (FIELDS[node.id],), 0, 0
+    if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+        raise ValueError(f"Unknown function '{ast.unparse(node.func)}', expected one of {sorted(FUNCTIONS)}")
+    if node.keywords:
+        raise ValueError(f"Keyword arguments are not supported: '{ast.unparse(node)}'")
+    name = node.func.id
+    cost, defaults, base, output = FUNCTIONS[name]
+    if len(node.args) > len(defaults):
+        raise ValueError(f"Too many arguments for '{name}': at most {len(defaults)}")
+    args = []
+    for arg in node.args:
+        if not isinstance(arg, ast.Constant) or isinstance(arg.value, bool) or not isinstance(arg.value, (int, float)):
+            raise ValueError(f"Arguments of '{name}' must be numbers: '{ast.unparse(node)}'")
+        if arg.value <= 0:
+            raise ValueError(f"Arguments of '{name}' must be positive: '{ast.unparse(node)}'")
+        args.append(arg.value)
+    args = tuple(args) + defaults[len(args):]
+    label = f"{name}({', '.join(str(arg) for arg in args)})"
+    return label, base, args, output, cost
+
+
+def _cost(node):
+    # Costo stimato di un nodo: somma dei costi dei termini che contiene
+    if isinstance(node, (ast.Name, ast.Call)):
+        return _term(node)[4]
+    return sum(_cost(child) for child in ast.iter_child_nodes(node))
+
+
+def _terms(node):
+    # Nomi e chiamate dell'espressione (senza scendere negli argomenti delle chiamate)
+    if isinstance(node, (ast.Name, ast.Call)):
+        return [node]
+    return [term for child in ast.iter_child_nodes(node) for term in _terms(child)]
+
+
+def _validate(node):
+    """
+    Verifica che l'espressione usi solo la sintassi ammessa e riordina gli operandi di and/or
+    dal più economico al più costoso.
+    """
+    if isinstance(node, ast.BoolOp):
+        for value in node.values:
+            _validate(value)
+        node.values.sort(key=_cost)
+    elif isinstance(node, ast.Compare):
+        if not all(type(op) in _COMPARE for op in node.ops):
+            raise ValueError(f"Unsupported comparison in '{ast.unparse(node)}'")
+        for child in [node.left] + node.comparators:
+            _validate(child)
+    elif isinstance(node, ast.BinOp):
+        if type(node.op) not in _BINARY:
+            raise ValueError(f"Unsupported operator in '{ast.unparse(node)}'")
+        _validate(node.left)
+        _validate(node.right)
+    elif isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, (ast.Not, ast.USub, ast.UAdd)):
+            raise ValueError(f"Unsupported operator in '{ast.unparse(node)}'")
+        _validate(node.operand)
+    elif isinstance(node, (ast.Name, ast.Call)):
+        _term(node)
+    elif not (isinstance(node, ast.Constant) and isinstance(node.value, (int, float))
+              and not isinstance(node.value, bool)):
+        raise ValueError(f"Unsupported expression '{ast.unparse(node)}'")
+
+
+class Screen:
+    """
+    Screen compilato da un'espressione, ad esempio "close < 50 and sma(20) > sma(50) and adx(14) < 25".
+    Sono ammessi: i campi open, high, low, close, volume; le funzioni di FUNCTIONS con parametri numerici
+    (valutate sull'ultima barra di ogni ticker); numeri; + - * /; confronti anche concatenati; and, or, not.
+    Gli operandi di and/or vengono valutati dal più economico al più costoso e ognuno solo sui ticker
+    ancora in gioco, così gli indicatori costosi vengono calcolati sui soli superstiti dei filtri semplici.
+    # Esempio d'uso:
+    # screen = Screen("close < 50 and sma(20) > sma(50) and adx(14) < 25")
+    # result = screen.run(get_repository().panel("SP500"))
+    """
+    def __init__(self, expression, name=None):
+        """
+        :param expression: Testo dell'espressione.
+        :param name: Nome dello screen, usato nei report.
+        """
+        self.expression = expression
+        self.name = name or expression
+        try:
+            self.tree = ast.parse(expression.strip(), mode='eval').body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid screen expression '{expression}': {e.msg}") from None
+        _validate(self.tree)
+        # Termini nell'ordine in cui compaiono nel testo, per le colonne del risultato
+        terms = sorted(_terms(self.tree), key=lambda node: node.col_offset)
+        self._nodes = {}
+        for node in terms:
+            self._nodes.setdefault(_term(node)[0], node)
+        self.terms = list(self._nodes)
+
+    def __repr__(self):
+        return f"Screen({self.expression!r})"
+
+    def run(self, panel, tickers=None, states=None):
+        """
+        :param panel: UniversePanel su cui valutare lo screen.
+        :param tickers: Ticker da considerare (default tutti quelli del panel).
+        :param states: IndicatorStateStore della partizione (opzionale, vedi Screener).
+        :return: DataFrame con indice 'Ticker' e una colonna per termine, con i soli ticker che passano.
+        """
+        return Screener(panel, tickers, states).run(self)
+
+
+class Screener:
+    """
+    Valutatore di screen su un panel. I termini e le sotto-espressioni aritmetiche già calcolati
+    vengono riutilizzati, anche tra screen diversi valutati dallo stesso oggetto, e per ognuno si
+    calcolano solo i ticker mancanti.
+    # Esempio d'uso:
+    # screener = Screener(get_repository().panel("SP500"))
+    # for name, screen in load_screens().items():
+    #     print(name, screener.run(screen).index.tolist())
+    """
+    def __init__(self, panel, tickers=None, states=None):
+        """
+        :param panel: UniversePanel.
+        :param tickers: Ticker da considerare (default tutti quelli del panel); quelli assenti vengono ignorati.
+        :param states: IndicatorStateStore della stessa partizione: per gli indicatori di STATE_INDICATORS
+                       si usa il valore mantenuto dal downloader quando è allineato all'ultima barra del
+                       ticker nel panel, senza ricalcolarlo dallo storico.
+        """
+        self.panel = panel
+        self.states = states
+        if tickers is None:
+            self.rows = np.arange(len(panel.tickers))
+        else:
+            self.rows = np.array([panel.ticker_index[ticker] for ticker in tickers if ticker in panel.ticker_index],
+                                 dtype=np.int64)
+        self.tickers = [panel.tickers[row] for row in self.rows]
+        # Ultima barra valida di ogni ticker: gli indicatori vengono letti lì
+        close = np.asarray(panel.field('Close'))[self.rows]
+        self.last = np.where(~np.isnan(close), np.arange(close.shape[1]), -1).max(axis=1) if close.size \
+            else np.full(len(self.rows), -1)
+        # chiave: (righe già calcolate, valori)
+        self._cache = {}
+        # Numero di ticker per cui è stato eseguito ogni calcolo di base
+        self.computed = {}
+
+    def run(self, screen):
+        """
+        :param screen: Screen o testo dell'espressione.
+        :return: DataFrame con indice 'Ticker' e una colonna per termine, con i soli ticker che passano.
+        """
+        if isinstance(screen, str):
+            screen = Screen(screen)
+        passed = np.flatnonzero(self.mask(screen))
+        columns = {label: self._value(screen._nodes[label], passed) for label in screen.terms}
+        return pd.DataFrame(columns, index=pd.Index([self.tickers[position] for position in passed], name='Ticker'))
+
+    def mask(self, screen):
+        """
+        :return: Array booleano, allineato a self.tickers, dei ticker che passano lo screen.
+        """
+        if isinstance(screen, str):
+            screen = Screen(screen)
+        result = self._evaluate(screen.tree, np.arange(len(self.rows)))
+        if not isinstance(result, np.ndarray) or result.dtype != bool:
+            raise ValueError(f"Screen '{screen.expression}' is not a condition")
+        return result
+
+    def _cached(self, key, active, compute, outputs=1):
+        # Restituisce i valori di una chiave per le posizioni active, calcolando solo quelle mancanti
+        entry = self._cache.get(key)
+        if entry is None:
+            entry = (np.zeros(len(self.rows), dtype=bool), [np.full(len(self.rows), np.nan) for _ in range(outputs)])
+            self._cache[key] = entry
+        done, values = entry
+        missing = active[~done[active]]
+        if len(missing):
+            for target, computed in zip(values, compute(missing)):
+                target[missing] = computed
+            done[missing] = True
+        return [value[active] for value in values]
+
+    def _last_values(self, matrix, positions):
+        last = self.last[positions]
+        values = matrix[np.arange(len(positions)), np.maximum(last, 0)]
+        return np.where(last >= 0, values, np.nan)
+
+    def _value(self, node, active):
+        label, base, args, output, _ = _term(node)
+        if base == 'field':
+            field = np.asarray(self.panel.field(args[0]))
+            return self._cached(label, active, lambda missing: [self._last_values(field[self.rows[missing]], missing)])[0]
+
+        outputs = 1 + max(index for _, _, name, index in FUNCTIONS.values() if name == base)
+
+        def compute(missing):
+            found, values = self._state_values(base, args, missing, outputs)
+            pending = missing[~found]
+            if len(pending):
+                rows = self.rows[pending]
+                self.computed[(base, args)] = self.computed.get((base, args), 0) + len(pending)
+                matrices = _base_indicator(base, args, lambda name: np.asarray(self.panel.field(name))[rows])
+                for target, matrix in zip(values, matrices):
+                    target[~found] = self._last_values(matrix, pending)
+            return values
+
+        return self._cached((base, args), active, compute, outputs)[output]
+
+    def _state_values(self, base, args, positions, outputs):
+        """
+        Valori dello stato incrementale per i ticker il cui stato è aggiornato all'ultima barra del panel.
+        :return: Tupla (array booleano dei ticker trovati, lista di array dei valori, uno per uscita).
+        """
+        found = np.zeros(len(positions), dtype=bool)
+        values = [np.full(len(positions), np.nan) for _ in range(outputs)]
+        if self.states is None or (base, args) not in STATE_INDICATORS:
+            return found, values
+        name, scales = STATE_INDICATORS[(base, args)]
+        for i, position in enumerate(positions):
+            last = self.last[position]
+            state = self.states.get(self.tickers[position]) if last >= 0 else None
+            if state is None or state.last_date != self.panel.dates[last].strftime('%Y-%m-%d'):
+                continue
+            value = state.values()[name]
+            items = value if isinstance(value, tuple) else (value,)
+            if len(items) != len(scales):
+                continue
+            for target, item, scale in zip(values, items, scales):
+                target[i] = item * scale
+            found[i] = True
+        return found, values
+
+    def _evaluate(self, node, active):
+        if isinstance(node, ast.Constant):
+            return float(node.value)
+        if isinstance(node, (ast.Name, ast.Call)):
+            return self._value(node, active)
+        if isinstance(node, ast.BinOp):
+            def compute(missing):
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    return [np.broadcast_to(_BINARY[type(node.op)](self._evaluate(node.left, missing),
+                                                                   self._evaluate(node.right, missing)),
+                                            (len(missing),))]
+            return self._cached(ast.dump(node), active, compute)[0]
+        if isinstance(node, ast.UnaryOp):
+            operand = self._evaluate(node.operand, active)
+            if isinstance(node.op, ast.Not):
+                return ~np.asarray(operand, dtype=bool)
+            return -operand if isinstance(node.op, ast.USub) else operand
+        if isinstance(node, ast.Compare):
+            result = np.ones(len(active), dtype=bool)
+            left = self._evaluate(node.left, active)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self._evaluate(comparator, active)
+                with np.errstate(invalid='ignore'):
+                    result &= _COMPARE[type(op)](left, right)
+                left = right
+            return result
+        # and/or: ogni operando viene valutato solo sui ticker ancora indecisi
+        is_and = isinstance(node.op, ast.And)
+        result = np.full(len(active), is_and)
+        for value in node.values:
+            pending = result if is_and else ~result
+            if not pending.any():
+                break
+            result[pending] = np.asarray(self._evaluate(value, active[pending]), dtype=bool)
+        return result
+
+
+def load_screens(path=SCREENS_FILE):
+    """
+    Screen salvati in un file JSON {nome: {"expression": ..., "index": ..., "description": ...}}.
+    Le definizioni non valide vengono segnalate e saltate, senza escludere le altre.
+    :return: Dizionario {nome: Screen}, con gli attributi index e description.
+    """
+    with open(path, 'r') as file:
+        definitions = json.load(file)
+    screens = {}
+    for name, definition in definitions.items():
+        try:
+            screen = Screen(definition['expression'], name=name)
+            screen.index = definition.get('index', "SP500")
+            screen.description = definition.get('description', "")
+        except Exception as e:
+            print(f"Invalid screen {name}: {e}")
+            continue
+        screens[name] = screen
+    return screens
+
+
+def run_screen(expression, index="SP500", interval='1d', tickers=None):
+    """
+    Valuta uno screen sul panel della partizione.
+    :param expression: Screen o testo dell'espressione.
+    :return: DataFrame con indice 'Ticker' e una colonna per termine.
+    """
+    screen = expression if isinstance(expression, Screen) else Screen(expression)
+    repository = get_repository()
+    return screen.run(repository.panel(index, interval), tickers, repository.indicator_states(index, interval))
+
+
+def run_saved_screen(name, path=SCREENS_FILE, interval='1d'):
+    """
+    Valuta uno screen salvato sull'indice indicato nella sua definizione.
+    :return: Tupla (Screen, DataFrame del risultato).
+    """
+    screens = load_screens(path)
+    if name not in screens:
+        raise ValueError(f"Unknown screen '{name}', expected one of {sorted(screens)}")
+    screen = screens[name]
+    return screen, run_screen(screen, index=screen.index, interval=interval)
@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+import pandas as pd
+from Trading.methodology.data_store.price_store import read_price_csv, CSV_SUFFIX
+
+
+def measure(label, loader, files):
+    start = time.perf_counter()
+    frames = [loader(path) for path in files]
+    elapsed = time.perf_counter() - start
+    memory = sum(int(df.memory_usage(deep=True, index=True).sum()) for df in frames)
+    print(f"{label:<40} {elapsed:7.2f}s {memory / 1024 / 1024:8.1f} MB")
+    return elapsed, memory
+
+
+def benchmark_csv_ingestion(folder):
+    """
+    Confronta tempo di caricamento e memoria occupata leggendo tutti i CSV di una cartella
+    con pd.read_csv senza schema (come facevano gli scanner) e con read_price_csv.
+    :param folder: Cartella con i file *_historical_data.csv.
+    """
+    files = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(CSV_SUFFIX))
+    print(f"{len(files)} files in {folder}")
+    return {
+        "read_csv": measure("pd.read_csv (inferred dtypes)", pd.read_csv, files),
+        "read_csv_dates": measure("pd.read_csv + parse_dates",
+                                  lambda path: pd.read_csv(path, index_col='Date', parse_dates=['Date']), files),
+        "typed": measure("read_price_csv", read_price_csv, files),
+        "compact": measure("read_price_csv compact", lambda path: read_price_csv(path, compact=True), files),
+        "pruned": measure("read_price_csv compact, Close only",
+                          lambda path: read_price_csv(path, columns=['Close'], compact=True), files),
+    }
+
+
+if __name__ == "__main__":
+    current_path = os.path.dirname(os.path.abspath(__file__))
+    default_folder = os.path.join(current_path, "..", "Data", "Russel", "Daily")
+    benchmark_csv_ingestion(sys.argv[1] if len(sys.argv) > 1 else default_folder)
@@ -1,11 +1,15 @@
 import json
 import os
-from Trading.methodology.SuppRes.SR_construction import StockAnalysis
-from Trading.methodology.SuppRes.SR_break_advisor import StockBreakAnalyzer
+from functools import partial
+from Trading.methodology.SuppRes.SR_rebuild import rebuild_support_resistance
+from Trading.methodology.SuppRes.level_index import get_level_index, recent_closes
+from Trading.methodology.data_store.repository import get_repository
 from Reports.report_builder import ReportGenerator
+from Trading.methodology.SuppRes.SR_break_advisor import chart_level
+from Trading.methodology.scan_engine.scan_engine import run_scan, clear_scan_images
 
 
-def create_support_resistance():
+def create_support_resistance(timeframes=None):
     current_path = os.path.dirname(os.path.abspath(__file__))
     with open(os.path.join(current_path, "json_files/SP500-stock.json"), 'r') as file:
         tickers = json.load(file)
@@ -13,45 +17,45 @@ def create_support_resistance():
 # Lista dei ticker
     tickers_list = list(tickers.keys())
 
-    for item in tickers_list:
-        stock_analysis = StockAnalysis(f"{item}")
-        stock_analysis.update_pivot_data()
-
-def breaker_analyzer(max_price= None):
+    # Calcolo in parallelo dei soli ticker con dati cambiati; l'indice dei livelli viene ricostruito alla fine
+    rebuild_support_resistance(tickers_list, timeframes=timeframes)
+
+def _report_levels(report, hits, action, index="SP500", max_workers=None):
+    # Come nell'analisi per singolo ticker, il grafico e il commento riguardano l'ultimo livello trovato
+    last_levels = hits.groupby('Ticker', sort=False).last()
+    levels = {ticker: (row['Level'], row['Type'], row['Weight']) for ticker, row in last_levels.iterrows()}
+    results = run_scan(partial(chart_level, levels=levels, action=action), list(levels), index=index,
+                       columns=['Open', 'High', 'Low', 'Close'], max_workers=max_workers)
+    for ticker, result in results:
+        report.add_content(f"stock = {ticker}")
+        report.add_commented_image(None, comment= result['content'], image_path= result['image'])
+    return results
+
+def breaker_analyzer(max_price= None, index="SP500", sessions=2, max_workers=None):
     report= ReportGenerator()
-    current_path = os.path.dirname(os.path.abspath(__file__))
-    with open(os.path.join(current_path, "json_files/SP500-stock.json"), 'r') as file:
-        tickers = json.load(file)
-    tickers_list = list(tickers.keys())
     report.add_title(title="Resistence and Support Breaks")
 
-    for item in tickers_list:
-        stock_analysis = StockBreakAnalyzer(f"{item}", max_price= max_price)
-        content, image, df = stock_analysis.alert_break_level()
-        if content and image  is not None:
-            report.add_content(f"stock = {item}")
-            report.add_commented_image(df, comment= content, image_path= image)
-    
+    # Un solo join tra l'indice dei livelli e le ultime chiusure di tutto l'universo
+    panel = get_repository().panel(index)
+    hits = get_level_index().crossed(panel.tickers, panel.field('Close'), sessions=sessions, max_price=max_price)
+    print(f"{hits['Ticker'].nunique()} stocks with broken levels")
+    results = _report_levels(report, hits, "break", index, max_workers)
+
     report.save_report(filename="Report_RS_break")
-    stock_analysis.clear_img_temp_files()
+    clear_scan_images(results)
 
-def near_breaker_analyzer(max_price= None):
+def near_breaker_analyzer(max_price= None, index="SP500", threshold=0.02, max_workers=None):
     report= ReportGenerator()
-    current_path = os.path.dirname(os.path.abspath(__file__))
-    with open(os.path.join(current_path, "json_files/SP500-stock.json"), 'r') as file:
-        tickers = json.load(file)
-    tickers_list = list(tickers.keys())
     report.add_title(title="Resistence and Support near breaks analisys")
 
-    for item in tickers_list:
-        stock_analysis = StockBreakAnalyzer(f"{item}", max_price= max_price)
-        content, image, df =  stock_analysis.alert_near_levels()
-        if content and image  is not None:
-            report.add_content(f"stock = {item}")
-            report.add_commented_image(df, comment= content, image_path= image)
-    
+    panel = get_repository().panel(index)
+    last_prices, _, _ = recent_closes(panel.field('Close'), sessions=1)
+    hits = get_level_index().near(panel.tickers, last_prices, threshold=threshold, max_price=max_price)
+    print(f"{hits['Ticker'].nunique()} stocks near a level")
+    results = _report_levels(report, hits, "near", index, max_workers)
+
     report.save_report(filename="Report_RS_near_break")
-    stock_analysis.clear_img_temp_files()
+    clear_scan_images(results)
 
 if __name__ == "__main__":
     near_breaker_analyzer(max_price= 50)
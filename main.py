@@ -3,6 +3,7 @@ import time, json
 import threading
 from TelegramBot.bot_handler import CommandBot
 from Trading.methodology.download_data.download_data_yahoo import StockDataDownloader
+from Trading.methodology.data_store.resample import build_resampled
 
 source_directory ="/home/dp/PycharmProjects/Portfolio_management/Portfolio_management"
 should_continue = True
@@ -37,6 +38,7 @@ def download_data_daily():
     # Utilizzo della classe StockDataDownloader
     downloader = StockDataDownloader(tickers_list, index = "SP500" )
     downloader.download_data()
+    build_resampled(index="SP500", intervals=('1wk', '1mo'))
     with open(f"{source_directory}/json_files/russell2000.json", 'r') as file:
         tickers = json.load(file)
 
@@ -46,23 +48,13 @@ def download_data_daily():
     # Utilizzo della classe StockDataDownloader
     downloader = StockDataDownloader(tickers_list, index = "Russel")
     downloader.download_data()
+    build_resampled(index="Russel", intervals=('1wk', '1mo'))
     stop_downloading()
 
 def download_data_weekly():
-    with open( f"{source_directory}/json_files/SP500-stock.json", 'r') as file:
-        tickers = json.load(file)
-    # Lista dei ticker
-    tickers_list = list(tickers.keys())
-    # Utilizzo della classe StockDataDownloader
-    downloader = StockDataDownloader(tickers_list, interval='1wk', index = "SP500")
-    downloader.download_data()
-    with open( f"{source_directory}/json_files/russell2000.json", 'r') as file:
-        tickers = json.load(file)
-    # Lista dei ticker
-    tickers_list = list(tickers.keys())
-    # Utilizzo della classe StockDataDownloader
-    downloader = StockDataDownloader(tickers_list, interval='1wk', index = "Russel")
-    downloader.download_data()
+    # Le barre settimanali si ricavano dai dati giornalieri già scaricati, senza un secondo download
+    build_resampled(index="SP500", intervals=('1wk',))
+    build_resampled(index="Russel", intervals=('1wk',))
     stop_downloading()
 
 def stop_downloading():
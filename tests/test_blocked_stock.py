@@ -0,0 +1,80 @@
+from Trading.methodology.blocked_stock.blocked_stock import blocked_counts, blocked_result, scan_blocked_stocks, grid_levels
+from Trading.methodology.data_store.universe_panel import UniversePanel
+import numpy as np
+import pandas as pd
+
+
+def _loop_check_price_range(dataset, max_price=None, period=60):
+    # Ciclo originale di TradingAnalyzer.check_price_range, senza il grafico
+    if len(dataset) < period:
+        return False
+    last_price = dataset["Close"].iloc[-1]
+    last_price = last_price if max_price is None or last_price <= max_price else None
+    resistance = int(last_price) + 1 if last_price and not pd.isna(last_price) else None
+    support = int(last_price) if last_price and not pd.isna(last_price) else None
+    below_resistance_count = touch_resistance_count = above_support_count = touch_support_count = 0
+    for index in range(-period, 0):
+        row = dataset.iloc[index]
+        open_price = row['Open']
+        close_price = row['Close']
+        if max_price is not None and (pd.isna(open_price) or pd.isna(close_price)):
+            continue
+        if max_price is not None and (open_price > max_price or close_price > max_price):
+            continue
+        if resistance is not None:
+            if open_price < resistance and close_price < resistance:
+                below_resistance_count += 1
+                if resistance * 0.99 <= close_price <= resistance or resistance * 0.99 <= open_price <= resistance:
+                    touch_resistance_count += 1
+        if support is not None:
+            if open_price > support and close_price > support:
+                above_support_count += 1
+                if support <= close_price <= support * 1.01 or support <= open_price <= support * 1.01:
+                    touch_support_count += 1
+    if below_resistance_count > 45 and touch_resistance_count > 3:
+        return {"status": True, "details": {"resistence": resistance, "below_resistance_count": below_resistance_count,
+                                            "touch_resistance_count": touch_resistance_count}}
+    if above_support_count > 45 and touch_support_count > 3:
+        return {"status": True, "details": {"support": support, "above_support_count": above_support_count,
+                                            "touch_support_count": touch_support_count}}
+    return False
+
+
+def _synthetic_panel(tickers=40, dates=90, seed=3):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(5, 60, tickers)[:, None] + rng.uniform(0.05, 0.95, tickers)[:, None]
+    close = base + rng.normal(0, 0.15, (tickers, dates)).cumsum(axis=1) * 0.2
+    open_prices = close + rng.normal(0, 0.1, (tickers, dates))
+    close[3, 40:45] = np.nan
+    open_prices[3, 40:45] = np.nan
+    close[5, 70] = np.nan
+    close[7, :50] = open_prices[7, :50] = np.nan
+    values = np.stack([open_prices, open_prices + 0.2, open_prices - 0.2, close, np.ones_like(close)])
+    return UniversePanel(values, [f"T{i}" for i in range(tickers)], pd.bdate_range('2024-01-01', periods=dates))
+
+
+def test_universe_scan_matches_row_loop():
+    panel = _synthetic_panel()
+    for max_price in (None, 30):
+        scan = scan_blocked_stocks(panel, max_price=max_price)
+        assert "T7" not in scan.index
+        assert scan["status"].any() and not scan["status"].all()
+        for ticker in panel.tickers:
+            expected = _loop_check_price_range(panel.frame(ticker), max_price=max_price)
+            if ticker not in scan.index:
+                assert expected is False
+                continue
+            assert blocked_result(scan.loc[ticker]) == expected
+
+
+def test_level_grid():
+    support, resistance = grid_levels(np.array([12.0, 12.7, 0.3, np.nan]), step=0.5)
+    assert support[:3].tolist() == [12.0, 12.5, 0.0] and resistance[:3].tolist() == [12.5, 13.0, 0.5]
+    assert grid_levels(np.array([0.3]), step=0.1)[0][0] == 0.3
+    support, resistance = grid_levels(np.array([7.0, 12.0, 30.0, 1.0]), grid=[5, 10, 25, 50])
+    assert support[:3].tolist() == [5, 10, 25] and resistance[:3].tolist() == [10, 25, 50]
+    assert np.isnan(support[3])
+
+    counts = blocked_counts(np.full((1, 60), 12.4), np.full((1, 60), 12.45), step=0.5)
+    assert blocked_result({name: values[0] for name, values in counts.items()}) == \
+        {"status": True, "details": {"resistence": 12.5, "below_resistance_count": 60, "touch_resistance_count": 60}}
@@ -0,0 +1,150 @@
+from Trading.methodology.download_data.download_data_yahoo import StockDataDownloader
+from Trading.methodology.download_data.providers import LocalFakeProvider, split_multi_ticker
+import os
+import pandas as pd
+
+
+def test_batched_download_writes_one_file_per_ticker(tmp_path):
+    tickers = [f"T{i}" for i in range(10)]
+    provider = LocalFakeProvider(missing={"T3"})
+    downloader = StockDataDownloader(tickers, provider=provider, batch_size=3, max_workers=2, base_path=str(tmp_path))
+    downloader.download_data()
+
+    assert provider.requests == 4
+    assert "T3" not in downloader.tickers
+    assert downloader.store.tickers() == sorted(t for t in tickers if t != "T3")
+    df = downloader.store.read("T5")
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+    assert df['Volume'].dtype == 'int64'
+    assert isinstance(df.index, pd.DatetimeIndex)
+
+
+def test_split_multi_ticker_handles_both_column_layouts():
+    provider = LocalFakeProvider()
+    frames = {t: provider.bars(t, '2024-01-01', '2024-02-01') for t in ("AAA", "BBB")}
+    by_ticker = pd.concat(frames, axis=1)
+    by_field = by_ticker.swaplevel(axis=1)
+
+    for data in (by_ticker, by_field):
+        split = split_multi_ticker(data, ["AAA", "BBB", "CCC"])
+        assert sorted(split) == ["AAA", "BBB"]
+        pd.testing.assert_frame_equal(split["AAA"], frames["AAA"], check_names=False)
+
+
+def test_update_data_advances_indicator_state_with_new_bars_only(tmp_path):
+    from Trading.methodology.Indicators import indicators
+    from Trading.methodology.Indicators.streaming import IndicatorStateStore
+
+    tickers = ["AAA", "BBB"]
+    provider = LocalFakeProvider()
+    downloader = StockDataDownloader(list(tickers), provider=provider, base_path=str(tmp_path))
+    downloader.download_data()
+    # Storico accorciato di qualche giorno, come se l'ultimo aggiornamento fosse di una settimana fa
+    for ticker in tickers:
+        downloader.store.write(ticker, downloader.store.read(ticker).iloc[:-5])
+        downloader.indicator_states.rebuild(ticker)
+    downloader.store.save_watermarks()
+    downloader.indicator_states.save()
+
+    downloader = StockDataDownloader(list(tickers), provider=provider, base_path=str(tmp_path))
+    downloader.update_data()
+
+    states = IndicatorStateStore(downloader.store)
+    df = downloader.store.read("AAA")
+    values = states.values("AAA")
+    assert states.get("AAA").last_date == df.index[-1].strftime('%Y-%m-%d')
+    assert abs(values['SMA_50'] - indicators.sma(df['Close'], 50)[-1]) < 1e-9
+    assert abs(values['RSI_14'] - indicators.rsi(df['Close'], 14)[-1]) < 1e-9
+    assert abs(values['ADX_14'][0] - indicators.adx(df['High'], df['Low'], df['Close'], 14, 'wilder')[0][-1]) < 1e-9
+
+
+def test_snapshot_table_follows_downloads_and_filters_scans(tmp_path):
+    from Trading.methodology.data_store.snapshot import SnapshotTable, last_bar_summary
+    from Trading.methodology.scan_engine.scan_engine import run_scan
+
+    tickers = ["AAA", "BBB", "CCC"]
+    provider = LocalFakeProvider()
+    downloader = StockDataDownloader(list(tickers), provider=provider, base_path=str(tmp_path))
+    downloader.download_data()
+    for ticker in tickers:
+        downloader.store.write(ticker, downloader.store.read(ticker).iloc[:-5])
+        downloader.snapshot.refresh(ticker)
+    downloader.store.save_watermarks()
+    downloader.snapshot.save()
+
+    downloader = StockDataDownloader(list(tickers), provider=provider, base_path=str(tmp_path))
+    downloader.update_data()
+
+    snapshot = SnapshotTable(downloader.store)
+    table = snapshot.frame()
+    for ticker in tickers:
+        assert table.loc[ticker].to_dict() == last_bar_summary(downloader.store.read(ticker))
+    cheapest = table['Price'].idxmin()
+    assert snapshot.select(tickers + ["NEW"], max_price=table['Price'].min()) == [cheapest, "NEW"]
+
+    results = run_scan(_last_close, tickers, columns=['Close'], max_workers=1, base_path=str(tmp_path),
+                       where={'max_price': table['Price'].min()})
+    assert [ticker for ticker, _ in results] == [cheapest]
+
+
+def _last_close(ticker, data):
+    return data['Close'].iloc[-1]
+
+
+def test_full_download_builds_indicator_state_without_reading_back(tmp_path, monkeypatch):
+    from Trading.methodology.data_store.price_store import PriceStore
+    from Trading.methodology.data_store.snapshot import SnapshotTable
+    from Trading.methodology.Indicators.streaming import IndicatorStateStore, TickerIndicators
+
+    tickers = ["AAA", "BBB", "CCC"]
+    downloader = StockDataDownloader(list(tickers), provider=LocalFakeProvider(), batch_size=2,
+                                     base_path=str(tmp_path))
+    monkeypatch.setattr(PriceStore, "read", lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError()))
+    downloader.download_data()
+    monkeypatch.undo()
+
+    # Stato e snapshot sono pubblicati con i dati, un file di stato per ticker
+    states = IndicatorStateStore(downloader.store)
+    assert sorted(os.listdir(states.path)) == [f"{ticker}.json" for ticker in tickers]
+    assert sorted(SnapshotTable(downloader.store).frame().index) == tickers
+    for ticker in tickers:
+        expected = TickerIndicators()
+        expected.feed(downloader.store.read(ticker))
+        assert states.values(ticker) == expected.values()
+
+    # Solo i ticker modificati vengono riscritti
+    states.rebuild("BBB")
+    os.remove(os.path.join(states.path, "AAA.json"))
+    states.save()
+    assert sorted(os.listdir(states.path)) == ["BBB.json", "CCC.json"]
+
+
+def test_long_lived_snapshot_and_state_follow_published_snapshots(tmp_path):
+    from Trading.methodology.data_store.price_store import PriceStore
+    from Trading.methodology.data_store.snapshot import SnapshotTable, last_bar_summary
+    from Trading.methodology.Indicators.streaming import IndicatorStateStore
+
+    store = PriceStore(base_path=str(tmp_path))
+    df = LocalFakeProvider().bars("AAA", '2023-01-01', '2024-01-01')
+    store.write("AAA", df.iloc[:-5])
+    store.save_watermarks()
+    snapshot, states = SnapshotTable(store), IndicatorStateStore(store)
+    snapshot.refresh("AAA")
+    snapshot.save()
+    states.rebuild("AAA")
+    states.save()
+    old_path = snapshot.path
+
+    staging = store.staging()
+    staging.write("AAA", df)
+    staging.save_watermarks()
+    store.publish(staging, keep=1)
+    assert snapshot.path != old_path and not os.path.exists(old_path)
+    # Lo snapshot nuovo non ha ancora tabella né stati: niente righe lette dalla cache vecchia
+    assert snapshot.frame().empty and states.get("AAA") is None
+    snapshot.refresh("AAA")
+    snapshot.save()
+    states.rebuild("AAA")
+    states.save()
+    assert SnapshotTable(store).frame().loc["AAA"].to_dict() == last_bar_summary(df)
+    assert IndicatorStateStore(store).get("AAA").last_date == df.index[-1].strftime('%Y-%m-%d')
@@ -0,0 +1,90 @@
+from Trading.methodology.Indicators import indicators
+from Trading.methodology.download_data.providers import LocalFakeProvider
+import numpy as np
+import pandas as pd
+
+
+def _bars(ticker="AAPL"):
+    return LocalFakeProvider().bars(ticker, '2018-01-01', '2024-01-01')
+
+
+def _assert_same(actual, expected):
+    np.testing.assert_allclose(actual, np.asarray(expected, dtype=float), rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_indicators_match_previous_pandas_formulas():
+    df = _bars()
+    close = df['Close'].copy()
+    close.iloc[[0, 1, 300]] = np.nan
+
+    for series in (df['Close'], close):
+        _assert_same(indicators.sma(series, 20), series.rolling(window=20).mean())
+        _assert_same(indicators.sma(series, 50, min_periods=1), series.rolling(window=50, min_periods=1).mean())
+        _assert_same(indicators.ema(series, 12), series.ewm(span=12, adjust=False).mean())
+
+    delta = df['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    _assert_same(indicators.rsi(df['Close'], 14), 100 - (100 / (1 + gain / loss)))
+
+    ema_short = df['Close'].ewm(span=12, adjust=False).mean()
+    ema_long = df['Close'].ewm(span=26, adjust=False).mean()
+    macd_line, signal_line = indicators.macd(df['Close'])
+    _assert_same(macd_line, ema_short - ema_long)
+    _assert_same(signal_line, (ema_short - ema_long).ewm(span=9, adjust=False).mean())
+
+    ranges = pd.concat([df['High'] - df['Low'], (df['High'] - df['Close'].shift()).abs(),
+                        (df['Low'] - df['Close'].shift()).abs()], axis=1)
+    _assert_same(indicators.atr(df['High'], df['Low'], df['Close'], 20), ranges.max(axis=1).rolling(window=20).mean())
+
+    middle, upper, lower = indicators.bollinger_bands(df['Close'], 20, 2)
+    rstd = df['Close'].rolling(window=20).std()
+    _assert_same(upper, middle + 2 * rstd)
+    _assert_same(lower, df['Close'].rolling(window=20).mean() - 2 * rstd)
+
+
+def test_universe_array_matches_single_series():
+    frames = [_bars(ticker) for ticker in ("AAA", "BBB", "CCC")]
+    universe = np.vstack([df['Close'].to_numpy() for df in frames])
+
+    for function in (lambda x: indicators.sma(x, 20), lambda x: indicators.ema(x, 26),
+                     lambda x: indicators.rsi(x, 14), lambda x: indicators.rolling_std(x, 20)):
+        result = function(universe)
+        assert result.shape == universe.shape
+        for row, df in enumerate(frames):
+            _assert_same(result[row], function(df['Close']))
+
+
+def _apply_adx(df, window):
+    # Calcolo originale di TrendMovementAnalyzer.calculate_ADX
+    data = df.copy()
+    data['+DM'] = data['High'].diff()
+    data['-DM'] = data['Low'].diff()
+    data['+DM'] = data.apply(lambda row: row['+DM'] if row['+DM'] > row['-DM'] and row['+DM'] > 0 else 0, axis=1)
+    data['-DM'] = data.apply(lambda row: -row['-DM'] if row['-DM'] > row['+DM'] and row['-DM'] > 0 else 0, axis=1)
+    data['Prev_Close'] = data['Close'].shift()
+    data['TR'] = data.apply(lambda row: max(abs(row['High'] - row['Low']), abs(row['High'] - row['Prev_Close']),
+                                            abs(row['Low'] - row['Prev_Close'])), axis=1)
+    plus_dmi = data['+DM'].rolling(window=window).mean() / data['TR'].rolling(window=window).mean()
+    minus_dmi = data['-DM'].rolling(window=window).mean() / data['TR'].rolling(window=window).mean()
+    dx = (abs(plus_dmi - minus_dmi) / (plus_dmi + minus_dmi)) * 100
+    return dx.rolling(window=window).mean(), plus_dmi, minus_dmi
+
+
+def test_adx_rolling_matches_row_wise_calculation():
+    df = _bars()
+    for window in (14, 40):
+        expected = _apply_adx(df, window)
+        for actual, reference in zip(indicators.adx(df['High'], df['Low'], df['Close'], window), expected):
+            _assert_same(actual, reference)
+
+
+def test_adx_wilder_on_universe():
+    frames = [_bars(ticker) for ticker in ("AAA", "BBB")]
+    high, low, close = (np.vstack([df[column].to_numpy() for df in frames]) for column in ('High', 'Low', 'Close'))
+    adx_values, plus_di, minus_di = indicators.adx(high, low, close, 14, method='wilder')
+
+    assert np.isnan(adx_values[:, :26]).all() and not np.isnan(adx_values[:, 27:]).any()
+    assert ((adx_values[:, 27:] >= 0) & (adx_values[:, 27:] <= 100)).all()
+    single, _, _ = indicators.adx(frames[1]['High'], frames[1]['Low'], frames[1]['Close'], 14, method='wilder')
+    _assert_same(adx_values[1], single)
@@ -0,0 +1,117 @@
+from Trading.methodology.lateral_movement.peaks import find_peaks_batch, current_streak
+from Trading.methodology.lateral_movement.search_lateral_mov import (analyze_stock_for_lateral_movement,
+                                                                     analyze_universe_for_lateral_movement)
+from Trading.methodology.download_data.providers import LocalFakeProvider
+from scipy.signal import find_peaks
+import numpy as np
+
+
+def test_batch_peaks_match_scipy_with_plateaus_and_windows():
+    rng = np.random.default_rng(1)
+    # Prezzi arrotondati: molti plateau di valori uguali
+    values = np.round(rng.normal(0, 1, (3, 5, 200)).cumsum(axis=-1), 0)
+    starts = rng.integers(0, 150, (3, 5))
+    peaks = find_peaks_batch(values, starts)
+    for i in range(3):
+        for j in range(5):
+            expected, _ = find_peaks(values[i, j, starts[i, j]:])
+            assert np.flatnonzero(peaks[i, j]).tolist() == (expected + starts[i, j]).tolist()
+
+    assert current_streak(np.array([[True, False, True, True], [False] * 4, [True] * 4])).tolist() == [2, 0, 4]
+
+
+def test_universe_lateral_analysis_matches_single_stock():
+    provider = LocalFakeProvider()
+    frames = [provider.bars(ticker, '2022-01-01', '2024-01-01') for ticker in ("AAA", "BBB", "CCC", "DDD")]
+    ohlc = np.stack([np.vstack([df[column].to_numpy() for df in frames]) for column in ('Open', 'High', 'Low', 'Close')])
+
+    for method, kwargs in (('ADX', {}), ('Percent', {'threshold': 0.05}), ('Bollinger', {'threshold_percentage': 0.2})):
+        universe = analyze_universe_for_lateral_movement(ohlc, method, **kwargs)
+        for row, df in enumerate(frames):
+            is_lateral, max_streak, support_line, resistance_line = analyze_stock_for_lateral_movement(df, method, **kwargs)
+            assert bool(universe[0][row]) == bool(is_lateral)
+            if is_lateral:
+                assert universe[1][row] == int(max_streak.iloc[-1])
+                np.testing.assert_equal([universe[2][row], universe[3][row]], [support_line, resistance_line])
+
+
+def test_panel_scan_with_gaps_matches_single_stock(tmp_path):
+    from Trading.methodology.data_store.price_store import PriceStore
+    from Trading.methodology.data_store.universe_panel import UniversePanel
+    from Trading.methodology.lateral_movement.search_lateral_mov import scan_lateral_movement
+
+    provider = LocalFakeProvider()
+    rng = np.random.default_rng(3)
+    store = PriceStore(base_path=str(tmp_path))
+    frames = {}
+    for i in range(30):
+        # Ticker quotati da date diverse, con sedute mancanti e qualche barra incompleta
+        df = provider.bars(f"T{i}", '2022-01-01', '2024-01-01').iloc[rng.integers(0, 200):]
+        df = df.drop(df.index[rng.choice(len(df), 5, replace=False)])
+        if i % 3 == 0:
+            df.iloc[rng.integers(0, len(df) - 1), 1] = np.nan
+        store.write(f"T{i}", df)
+        frames[f"T{i}"] = store.read(f"T{i}")
+    store.save_watermarks()
+    panel = UniversePanel.build(store)
+
+    for method, kwargs in (('ADX', {}), ('Percent', {'threshold': 0.05}), ('Bollinger', {'threshold_percentage': 0.2})):
+        found = scan_lateral_movement(panel, method=method, **kwargs)
+        expected = {}
+        for ticker in panel.tickers:
+            df = frames[ticker]
+            is_lateral, max_streak, support_line, resistance_line = analyze_stock_for_lateral_movement(df, method, **kwargs)
+            if is_lateral:
+                expected[ticker] = [int(max_streak.iloc[-1]), support_line, resistance_line]
+        assert found.index.tolist() == list(expected)
+        np.testing.assert_allclose(found.to_numpy(), np.array(list(expected.values())).reshape(-1, 3))
+
+    close = {ticker: df['Close'].iloc[-1] for ticker, df in frames.items()}
+    cheap = scan_lateral_movement(panel, method='Percent', max_price=np.median(list(close.values())), threshold=0.05)
+    assert all(close[ticker] <= np.median(list(close.values())) for ticker in cheap.index)
+
+
+def test_rolling_linear_fit_matches_polyfit():
+    from Trading.methodology.lateral_movement.trendlines import rolling_linear_fit, scan_channels
+    rng = np.random.default_rng(2)
+    close = 100 + rng.normal(0, 1, (3, 300)).cumsum(axis=-1)
+    close[1, 150] = np.nan
+    window = 30
+    slope, intercept, residual = rolling_linear_fit(close, window)
+    x = np.arange(window)
+    for row, end in ((0, 29), (0, 299), (2, 200), (1, 149), (1, 200)):
+        y = close[row, end - window + 1:end + 1]
+        expected_slope, expected_intercept = np.polyfit(x, y, 1)
+        np.testing.assert_allclose([slope[row, end], intercept[row, end]], [expected_slope, expected_intercept], rtol=1e-8)
+        rss = ((y - (expected_slope * x + expected_intercept)) ** 2).sum()
+        np.testing.assert_allclose(residual[row, end], np.sqrt(rss / (window - 2)), rtol=1e-6)
+    assert np.isnan(slope[0, :29]).all() and np.isnan(slope[1, 150:179]).all()
+
+    trend = np.vstack([100 + 0.5 * np.arange(300), 100 - 0.2 * np.arange(300), np.full(300, 50.0)])
+    channels = scan_channels(trend, ["UP", "DOWN", "FLAT"], window=60)
+    assert dict(zip(channels['Ticker'], channels['Channel'])) == {"UP": "rising", "DOWN": "falling", "FLAT": "flat"}
+
+
+def test_panel_channels_match_single_stock_fit_with_gaps(tmp_path):
+    from Trading.methodology.data_store.price_store import PriceStore
+    from Trading.methodology.data_store.universe_panel import UniversePanel
+    from Trading.methodology.lateral_movement.trendlines import scan_channels, scan_panel_channels
+
+    provider = LocalFakeProvider()
+    store = PriceStore(base_path=str(tmp_path))
+    closes = {}
+    for i in range(6):
+        # Ticker fermi a date diverse e con sedute mancanti
+        df = provider.bars(f"T{i}", '2023-01-01', '2024-01-01').iloc[:-i * 3 or None]
+        df = df.drop(df.index[[10 * i + 5, 100]])
+        store.write(f"T{i}", df)
+        closes[f"T{i}"] = df['Close'].to_numpy()[-60:]
+    store.save_watermarks()
+    panel = UniversePanel.build(store)
+
+    channels = scan_panel_channels(panel, max_width=1.0)
+    expected = scan_channels(np.vstack(list(closes.values())), list(closes), max_width=1.0)
+    assert channels['Ticker'].tolist() == expected['Ticker'].tolist() == list(closes)
+    np.testing.assert_allclose(channels[['Slope', 'Support', 'Resistance']], expected[['Slope', 'Support', 'Resistance']])
+    cheap = scan_panel_channels(panel, max_price=float(np.median([close[-1] for close in closes.values()])), max_width=1.0)
+    assert 0 < len(cheap) < len(closes) and (cheap['Close'] == [closes[t][-1] for t in cheap['Ticker']]).all()
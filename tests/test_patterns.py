@@ -0,0 +1,130 @@
+import json
+from Trading.methodology.patterns.inversion_complex_pattern import InversionPatterns
+from Trading.methodology.patterns.pattern_engine import pivots
+from Trading.methodology.patterns.pattern_scanner import PatternScanner
+from Trading.methodology.data_store.price_store import PriceStore
+from Trading.methodology.download_data.providers import LocalFakeProvider
+import numpy as np
+import pandas as pd
+
+
+def _loop_pairs(finder, valid, min_distance, threshold_percentage):
+    # Ricerca originale su tutte le coppie (i, j)
+    return [(i, j) for i in range(1, len(finder.data) - min_distance - 1)
+            for j in range(i + min_distance, len(finder.data) - 1)
+            if valid(i, j, threshold_percentage)]
+
+
+def _random_ohlc(length, seed, rounding=None):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.cumprod(1 + rng.normal(0, 0.015, length))
+    high = close * (1 + rng.uniform(0, 0.01, length))
+    low = close * (1 - rng.uniform(0, 0.01, length))
+    if rounding is not None:
+        # Prezzi arrotondati: molti valori uguali e plateau
+        high, low = np.round(high, rounding), np.round(low, rounding)
+    return pd.DataFrame({'Open': close, 'High': high, 'Low': low, 'Close': close},
+                        index=pd.bdate_range('2023-01-02', periods=length))
+
+
+def test_double_top_bottom_match_pair_search():
+    for seed, rounding, min_distance, threshold in [(0, None, 5, 3), (1, 0, 5, 3), (2, 0, 1, 5), (3, None, 10, 1)]:
+        finder = InversionPatterns(_random_ohlc(100, seed, rounding))
+        assert finder.find_double_top(min_distance, threshold) == \
+            _loop_pairs(finder, finder.is_valid_double_top, min_distance, threshold)
+        assert finder.find_double_bottom(min_distance, threshold) == \
+            _loop_pairs(finder, finder.is_valid_double_bottom, min_distance, threshold)
+
+    flat = pd.DataFrame({'High': np.ones(30), 'Low': np.ones(30)})
+    finder = InversionPatterns(flat)
+    assert finder.find_double_top() == _loop_pairs(finder, finder.is_valid_double_top, 5, 3)
+
+
+def _shape(points):
+    # Serie lineare a tratti, 10 barre per tratto
+    return np.interp(np.linspace(0, len(points) - 1, 10 * (len(points) - 1) + 1), np.arange(len(points)), points)
+
+
+def test_head_and_shoulders_and_triple_patterns():
+    high = _shape([10, 12, 15, 12, 10, 13, 20, 13, 10, 12, 15.2, 12, 10])
+    finder = InversionPatterns(pd.DataFrame({'High': high, 'Low': high - 1}))
+    assert finder.find_head_and_shoulders(order=5) == [(20, 60, 100)]
+    assert finder.find_triple_top(order=5) == []
+
+    low = _shape([20, 18, 15, 18, 20, 18, 15.1, 18, 20, 17, 15.2, 18, 20])
+    finder = InversionPatterns(pd.DataFrame({'High': low + 1, 'Low': low}))
+    assert finder.find_triple_bottom(order=5) == [(20, 60, 100)]
+    assert finder.find_inverse_head_and_shoulders(order=5) == []
+    assert pivots(np.ones(20), order=3).tolist() == [3]
+
+
+def test_pattern_scanner_reports_only_new_patterns(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    provider = LocalFakeProvider()
+    tickers = [f"T{i}" for i in range(4)]
+    history = {ticker: provider.bars(ticker, '2022-01-01', '2024-01-01') for ticker in tickers}
+    for ticker in tickers:
+        store.write(ticker, history[ticker].iloc[:-30])
+    store.save_watermarks()
+
+    scanner = PatternScanner(base_path=str(tmp_path), keep_days=None)
+    first = scanner.scan(max_workers=1)
+    for ticker in tickers:
+        store.write(ticker, history[ticker])
+    store.save_watermarks()
+    second = PatternScanner(base_path=str(tmp_path), keep_days=None).scan(max_workers=2)
+    assert len(first) and len(second)
+    assert (second['Completed'] > history['T0'].index[-31].strftime('%Y-%m-%d')).all()
+    # Nessuna nuova barra: nessun nuovo pattern
+    assert PatternScanner(base_path=str(tmp_path), keep_days=None).scan(max_workers=1).empty
+
+    full = PatternScanner(base_path=str(tmp_path), keep_days=None)
+    full.reset()
+    everything = full.scan(max_workers=1, save=False)
+    incremental = PatternScanner(base_path=str(tmp_path), keep_days=None).patterns()
+    key = ['Ticker', 'Completed', 'Pattern']
+    assert incremental.sort_values(key, kind='stable').astype(str).values.tolist() == \
+        everything.sort_values(key, kind='stable').astype(str).values.tolist()
+
+
+def test_pattern_state_survives_snapshot_publish(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    provider = LocalFakeProvider()
+    tickers = [f"T{i}" for i in range(3)]
+    history = {ticker: provider.bars(ticker, '2022-01-01', '2024-01-01') for ticker in tickers}
+    for ticker in tickers:
+        store.write(ticker, history[ticker].iloc[:-30])
+    store.save_watermarks()
+    scanner = PatternScanner(base_path=str(tmp_path), keep_days=None)
+    first = scanner.scan(max_workers=1)
+
+    # Refresh completo: nuovo snapshot con tutto lo storico
+    staging = store.staging()
+    for ticker in tickers:
+        staging.write(ticker, history[ticker])
+    store.publish(staging)
+    second = PatternScanner(base_path=str(tmp_path), keep_days=None).scan(max_workers=1)
+    assert len(first) and len(second)
+    assert (second['Completed'] > history['T0'].index[-31].strftime('%Y-%m-%d')).all()
+    assert PatternScanner(base_path=str(tmp_path), keep_days=None).patterns().shape[0] == len(first) + len(second)
+
+
+def test_pattern_history_is_kept_out_of_the_state_and_capped(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    provider = LocalFakeProvider()
+    for ticker in ("T0", "T1"):
+        store.write(ticker, provider.bars(ticker, '2020-01-01', '2024-01-01'))
+    store.save_watermarks()
+
+    found = PatternScanner(base_path=str(tmp_path), keep_days=None).scan(max_workers=1)
+    scanner = PatternScanner(base_path=str(tmp_path))
+    with open(scanner.path) as file:
+        assert set(json.load(file)) == {'processed'}
+    assert len(scanner.patterns()) == len(found)
+
+    scanner.reset()
+    scanner.scan(max_workers=1)
+    capped = PatternScanner(base_path=str(tmp_path)).patterns()
+    oldest = pd.Timestamp(found['Completed'].max()) - pd.Timedelta(days=365)
+    assert 0 < len(capped) < len(found)
+    assert (capped['Completed'] >= oldest.strftime('%Y-%m-%d')).all()
@@ -0,0 +1,174 @@
+from Trading.methodology.data_store import price_store
+from Trading.methodology.data_store.price_store import PriceStore, SNAPSHOT_DIR, migrate_csv_tree, read_price_csv
+from Trading.methodology.download_data.providers import LocalFakeProvider
+import os
+import pandas as pd
+import pytest
+
+
+def _bars(ticker, start='2023-01-01', end='2023-06-01'):
+    return LocalFakeProvider().bars(ticker, start, end)
+
+
+def _snapshots(tmp_path):
+    return sorted(os.listdir(tmp_path / "SP500" / SNAPSHOT_DIR))
+
+
+def test_publish_is_followed_by_long_lived_stores(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    store.write("AAA", _bars("AAA"))
+    store.save_watermarks()
+    reader = PriceStore(base_path=str(tmp_path))
+    assert reader.tickers() == ["AAA"]
+
+    for refresh in range(3):
+        staging = store.staging()
+        # Fino alla pubblicazione i lettori vedono i dati precedenti
+        staging.write("AAA", _bars("AAA", end='2023-07-01'))
+        staging.write(f"N{refresh}", _bars(f"N{refresh}"))
+        assert reader.tickers() == (["AAA"] if refresh == 0 else ["AAA", f"N{refresh - 1}"])
+        store.publish(staging)
+        # Il lettore creato prima del primo refresh segue lo snapshot corrente anche dopo la pulizia
+        assert reader.tickers() == ["AAA", f"N{refresh}"]
+        assert reader.read(f"N{refresh}").index[-1] == _bars(f"N{refresh}").index[-1]
+        assert reader.last_date("AAA") == _bars("AAA", end='2023-07-01').index[-1]
+
+    assert os.path.islink(store.partition_path)
+    assert len(_snapshots(tmp_path)) == 2
+    assert os.path.realpath(store.partition_path) == reader.data_path
+
+
+def test_failed_refresh_keeps_published_data(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    store.write("AAA", _bars("AAA"))
+    store.save_watermarks()
+    staging = store.staging()
+    staging.write("AAA", _bars("AAA", end='2023-02-01'))
+    store.discard(staging)
+    assert not os.path.exists(staging.data_path)
+    pd.testing.assert_frame_equal(store.read("AAA"), PriceStore(base_path=str(tmp_path)).read("AAA"))
+    assert store.read("AAA").index[-1] == _bars("AAA").index[-1]
+
+
+def test_partition_resolves_to_newest_snapshot_during_first_publish(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    store.write("AAA", _bars("AAA"))
+    store.save_watermarks()
+    staging = store.staging()
+    staging.write("BBB", _bars("BBB"))
+    store.publish(staging)
+    # Stato intermedio del primo publish: cartella reale già spostata, link non ancora creato
+    os.remove(store.partition_path)
+    assert PriceStore(base_path=str(tmp_path)).tickers() == ["BBB"]
+
+
+def _append_months(store, ticker, months):
+    full = _bars(ticker, end=f'2023-{6 + months:02d}-01')
+    for month in range(1, months + 1):
+        store.append(ticker, _bars(ticker, end=f'2023-{6 + month:02d}-01'))
+    return full
+
+
+def test_append_parts_are_seen_by_long_lived_readers(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    store.write("AAA", _bars("AAA"))
+    store.save_watermarks()
+    reader = PriceStore(base_path=str(tmp_path))
+    assert reader.read("AAA").index[-1] == _bars("AAA").index[-1]
+
+    full = _append_months(store, "AAA", 2)
+    # Finché i watermark non sono salvati le nuove parti non sono visibili
+    assert reader.read("AAA").index[-1] == _bars("AAA").index[-1]
+    store.save_watermarks()
+    pd.testing.assert_frame_equal(reader.read("AAA"), full, check_freq=False)
+    assert reader.last_date("AAA") == full.index[-1]
+    assert len(os.listdir(tmp_path / "SP500" / "Daily" / "_delta")) == 2
+
+
+def test_compaction_removes_parts_after_saving_watermarks(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "MAX_DELTA_PARTS", 2)
+    store = PriceStore(base_path=str(tmp_path))
+    store.write("AAA", _bars("AAA"))
+    store.save_watermarks()
+    full = _append_months(store, "AAA", 3)
+    delta_path = tmp_path / "SP500" / "Daily" / "_delta"
+    # La compattazione ha riscritto il file base, le parti restano fino al salvataggio
+    assert len(os.listdir(delta_path)) == 2
+    store.save_watermarks()
+    assert os.listdir(delta_path) == []
+    pd.testing.assert_frame_equal(PriceStore(base_path=str(tmp_path)).read("AAA"), full, check_freq=False)
+
+
+def test_recovery_after_crash_before_saving_watermarks(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "MAX_DELTA_PARTS", 2)
+    store = PriceStore(base_path=str(tmp_path))
+    store.write("AAA", _bars("AAA"))
+    _append_months(store, "AAA", 2)
+    store.save_watermarks()
+
+    # Compattazione interrotta prima di save_watermarks: l'indice su disco elenca ancora le parti
+    crashed = PriceStore(base_path=str(tmp_path))
+    full = _bars("AAA", end='2023-09-01')
+    crashed.append("AAA", full)
+    recovered = PriceStore(base_path=str(tmp_path))
+    pd.testing.assert_frame_equal(recovered.read("AAA"), full, check_freq=False)
+    assert recovered.last_date("AAA") == full.index[-1]
+
+    # Anche senza le parti (cancellate da una versione precedente) la lettura usa il solo file base
+    for name in os.listdir(tmp_path / "SP500" / "Daily" / "_delta"):
+        os.remove(tmp_path / "SP500" / "Daily" / "_delta" / name)
+    pd.testing.assert_frame_equal(PriceStore(base_path=str(tmp_path)).read("AAA"), full, check_freq=False)
+
+    # Un append interrotto lascia una parte non indicizzata, ignorata e poi sovrascritta
+    recovered.save_watermarks()
+    PriceStore(base_path=str(tmp_path)).append("AAA", _bars("AAA", end='2023-10-01'))
+    resumed = PriceStore(base_path=str(tmp_path))
+    pd.testing.assert_frame_equal(resumed.read("AAA"), full, check_freq=False)
+    resumed.append("AAA", _bars("AAA", end='2023-10-01'))
+    resumed.save_watermarks()
+    pd.testing.assert_frame_equal(PriceStore(base_path=str(tmp_path)).read("AAA"), _bars("AAA", end='2023-10-01'),
+                                  check_freq=False)
+
+
+def test_csv_with_missing_or_renamed_columns_falls_back(tmp_path):
+    path = tmp_path / "AAA_historical_data.csv"
+    path.write_text("date,open,High,Low,Close,Volume\n2023-01-03,1,2,0.5,1.6,\n2023-01-02,1,2,0.5,1.5,100\n")
+    df = read_price_csv(path)
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert df.index.name == 'Date' and df.index.is_monotonic_increasing
+    assert df['Volume'].tolist() == [100, 0] and df['Volume'].dtype == 'int64'
+    assert read_price_csv(path, columns=['Close'], compact=True)['Close'].dtype == 'float32'
+    with pytest.raises(KeyError):
+        read_price_csv(path, columns=['Adj Close'])
+
+
+def test_write_read_and_unmigrated_csv(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    bars = _bars("AAA")
+    store.write("AAA", bars)
+    pd.testing.assert_frame_equal(store.read("AAA"), bars, check_freq=False)
+    assert list(store.read("AAA", columns=['Close']).columns) == ['Close']
+    assert store.read("AAA", compact=True)['Close'].dtype == 'float32'
+
+    # Un ticker non ancora convertito viene letto dal CSV
+    _bars("BBB").to_csv(os.path.join(store.data_path, "BBB_historical_data.csv"))
+    assert store.tickers() == ["AAA", "BBB"]
+    pd.testing.assert_frame_equal(store.read("BBB"), _bars("BBB"), check_freq=False, check_index_type=False)
+    with pytest.raises(FileNotFoundError):
+        store.read("CCC")
+
+
+def test_migrate_csv_tree(tmp_path):
+    for index, ticker in (("SP500", "AAA"), ("Russel", "BBB")):
+        folder = tmp_path / index / "Daily"
+        folder.mkdir(parents=True)
+        _bars(ticker).to_csv(folder / f"{ticker}_historical_data.csv")
+    (tmp_path / "SP500" / "Daily" / "BAD_historical_data.csv").write_text("no,prices\n1,2\n")
+
+    assert migrate_csv_tree(base_path=str(tmp_path), remove_csv=True) == 2
+    assert sorted(os.listdir(tmp_path / "Russel" / "Daily")) == ["BBB.parquet", "_watermarks.json"]
+    # Il file non convertibile resta al suo posto
+    assert os.path.exists(tmp_path / "SP500" / "Daily" / "BAD_historical_data.csv")
+    store = PriceStore(index="Russel", base_path=str(tmp_path))
+    pd.testing.assert_frame_equal(store.read("BBB"), _bars("BBB"), check_freq=False, check_index_type=False)
+    assert store.last_date("BBB") == _bars("BBB").index[-1]
@@ -0,0 +1,49 @@
+from Trading.methodology.data_store.price_store import PriceStore
+from Trading.methodology.data_store.repository import DataRepository
+from Trading.methodology.download_data.providers import LocalFakeProvider
+import pandas as pd
+
+
+def _bars(ticker, end='2023-06-01'):
+    return LocalFakeProvider().bars(ticker, '2023-01-01', end)
+
+
+def _store(tmp_path, tickers=("AAA", "BBB", "CCC")):
+    store = PriceStore(base_path=str(tmp_path))
+    for ticker in tickers:
+        store.write(ticker, _bars(ticker))
+    store.save_watermarks()
+    return store
+
+
+def test_frame_cache_is_lru_bounded(tmp_path):
+    _store(tmp_path)
+    size = int(_bars("AAA").memory_usage(deep=True).sum())
+    repository = DataRepository(max_bytes=2 * size, base_path=str(tmp_path))
+    for ticker in ("AAA", "BBB", "AAA", "CCC"):
+        repository.frame(ticker)
+    assert (repository.hits, repository.misses) == (1, 3)
+    # BBB è il meno usato di recente ed è stato scartato per far posto a CCC
+    repository.frame("AAA")
+    repository.frame("BBB")
+    assert (repository.hits, repository.misses) == (2, 4)
+    assert repository._size <= repository.max_bytes
+
+
+def test_cache_is_invalidated_by_new_bars(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    repository = DataRepository(base_path=str(tmp_path))
+    assert repository.frame("AAA").index[-1] == _bars("AAA").index[-1]
+    panel = repository.panel()
+    # Le richieste ripetute non elencano i file della partizione
+    monkeypatch.setattr(PriceStore, "data_version", lambda self: (_ for _ in ()).throw(AssertionError()))
+    assert repository.panel() is panel
+    monkeypatch.undo()
+
+    store.append("AAA", _bars("AAA", end='2023-07-01'))
+    store.save_watermarks()
+    expected = _bars("AAA", end='2023-07-01')
+    pd.testing.assert_frame_equal(repository.frame("AAA"), expected, check_freq=False)
+    reloaded = repository.panel()
+    assert reloaded is not panel and reloaded.dates[-1] == expected.index[-1]
+    assert repository.panel() is reloaded
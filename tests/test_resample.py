@@ -0,0 +1,82 @@
+from Trading.methodology.data_store.price_store import PriceStore, STAGING_DIR
+from Trading.methodology.data_store.resample import build_resampled, resample_ohlcv
+from Trading.methodology.download_data.providers import LocalFakeProvider
+import os
+import pandas as pd
+
+
+def _bars(ticker, end):
+    return LocalFakeProvider().bars(ticker, '2023-01-01', end)
+
+
+def _expected(tmp_path, ticker, interval):
+    return resample_ohlcv(PriceStore(base_path=str(tmp_path)).read(ticker), interval)
+
+
+def test_incremental_resample_matches_full_rebuild(tmp_path, monkeypatch):
+    daily = PriceStore(base_path=str(tmp_path))
+    for ticker in ("AAA", "BBB"):
+        daily.write(ticker, _bars(ticker, '2023-06-07'))
+    daily.save_watermarks()
+    assert build_resampled(intervals=('1wk', '1mo'), base_path=str(tmp_path)) == 2
+
+    starts = []
+    original_read = PriceStore.read
+    monkeypatch.setattr(PriceStore, "read", lambda self, ticker, *args, **kwargs:
+                        starts.append((self.interval, ticker, kwargs.get('start'))) or
+                        original_read(self, ticker, *args, **kwargs))
+    # Nessuna barra nuova: nessun ticker viene letto
+    assert build_resampled(intervals=('1wk', '1mo'), base_path=str(tmp_path)) == 0
+    assert starts == []
+
+    # Fine della settimana parziale e due settimane nuove solo per AAA
+    daily.append("AAA", _bars("AAA", '2023-06-24'))
+    daily.save_watermarks()
+    assert build_resampled(intervals=('1wk', '1mo'), base_path=str(tmp_path)) == 1
+    # Le barre giornaliere vengono lette dall'inizio del mese salvato, le barre resample non vengono rilette
+    assert starts == [('1d', 'AAA', pd.Timestamp('2023-06-01'))]
+
+    for interval in ('1wk', '1mo'):
+        store = PriceStore(interval=interval, base_path=str(tmp_path))
+        for ticker in ("AAA", "BBB"):
+            pd.testing.assert_frame_equal(store.read(ticker), _expected(tmp_path, ticker, interval),
+                                          check_freq=False)
+    assert PriceStore(interval='1wk', base_path=str(tmp_path)).last_date("AAA") == pd.Timestamp('2023-06-19')
+
+
+def test_resample_publishes_snapshots_and_rebuilds_after_daily_refresh(tmp_path, monkeypatch):
+    from Trading.methodology.data_store import resample
+    import pytest
+
+    daily = PriceStore(base_path=str(tmp_path))
+    daily.write("AAA", _bars("AAA", '2023-06-07'))
+    daily.save_watermarks()
+    build_resampled(base_path=str(tmp_path))
+    reader = PriceStore(interval='1wk', base_path=str(tmp_path))
+    old_snapshot, old_bars = reader.data_path, reader.read("AAA")
+
+    daily.append("AAA", _bars("AAA", '2023-06-24'))
+    daily.save_watermarks()
+    build_resampled(base_path=str(tmp_path))
+    # Lo snapshot precedente non è stato modificato dall'aggiornamento incrementale
+    pd.testing.assert_frame_equal(PriceStore(interval='1wk', base_path=str(tmp_path), data_path=old_snapshot)
+                                  .read("AAA"), old_bars)
+    pd.testing.assert_frame_equal(reader.read("AAA"), _expected(tmp_path, "AAA", '1wk'), check_freq=False)
+
+    # Un errore durante la costruzione lascia pubblicati i dati precedenti
+    published = reader.read("AAA")
+    daily.append("AAA", _bars("AAA", '2023-07-08'))
+    daily.save_watermarks()
+    monkeypatch.setattr(resample, "resample_ohlcv", lambda *args: (_ for _ in ()).throw(RuntimeError("crash")))
+    with pytest.raises(RuntimeError):
+        build_resampled(base_path=str(tmp_path))
+    monkeypatch.undo()
+    pd.testing.assert_frame_equal(reader.read("AAA"), published)
+    assert os.listdir(tmp_path / "SP500" / STAGING_DIR) == []
+
+    # Refresh completo dei dati giornalieri con lo storico corretto (ad esempio uno split): ricostruzione completa
+    staging = daily.staging()
+    staging.write("AAA", _bars("AAA", '2023-07-08') * 2)
+    daily.publish(staging)
+    build_resampled(base_path=str(tmp_path))
+    pd.testing.assert_frame_equal(reader.read("AAA"), _expected(tmp_path, "AAA", '1wk'), check_freq=False)
@@ -0,0 +1,30 @@
+from Trading.methodology.data_store.price_store import PriceStore
+from Trading.methodology.download_data.providers import LocalFakeProvider
+from Trading.methodology.scan_engine.scan_engine import run_scan
+
+
+def _last_close_above(ticker, data, level=0):
+    if ticker == "T4":
+        raise ValueError("broken analyzer")
+    close = data['Close'].iloc[-1]
+    return {'close': close, 'bars': len(data)} if close > level else None
+
+
+def test_scan_engine_matches_serial_loop(tmp_path):
+    store = PriceStore(base_path=str(tmp_path))
+    provider = LocalFakeProvider()
+    tickers = [f"T{i}" for i in range(12)]
+    for ticker in tickers:
+        store.write(ticker, provider.bars(ticker, '2023-01-01', '2024-01-01'))
+    store.save_watermarks()
+    universe = tickers + ["MISSING"]
+
+    serial = run_scan(_last_close_above, universe, columns=['Close'], max_workers=1, chunk_size=5,
+                      base_path=str(tmp_path))
+    pooled = run_scan(_last_close_above, universe, columns=['Close'], max_workers=3, chunk_size=2, prefetch=1,
+                      base_path=str(tmp_path))
+
+    expected = [(ticker, {'close': store.read(ticker)['Close'].iloc[-1], 'bars': len(store.read(ticker))})
+                for ticker in tickers if ticker != "T4"]
+    assert serial == expected
+    assert pooled == expected
@@ -0,0 +1,93 @@
+from Trading.methodology.stock_filter.screener import Screen, Screener, load_screens
+from Trading.methodology.data_store.universe_panel import UniversePanel
+from Trading.methodology.Indicators import indicators
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _synthetic_panel(tickers=30, dates=120, seed=5):
+    rng = np.random.default_rng(seed)
+    close = rng.uniform(10, 90, (tickers, 1)) * np.cumprod(1 + rng.normal(0, 0.02, (tickers, dates)), axis=1)
+    high = close * (1 + rng.uniform(0, 0.02, close.shape))
+    low = close * (1 - rng.uniform(0, 0.02, close.shape))
+    volume = rng.uniform(1e5, 1e6, close.shape)
+    values = np.stack([close, high, low, close, volume])
+    # Ticker entrati nell'universo più tardi
+    values[:, :5, :30] = np.nan
+    return UniversePanel(values, [f"T{i}" for i in range(tickers)], pd.bdate_range('2024-01-01', periods=dates))
+
+
+def test_screen_matches_per_ticker_computation():
+    panel = _synthetic_panel()
+    result = Screen("close < 50 and sma(20) > sma(50) and adx(14) < 40").run(panel)
+
+    expected = []
+    for ticker in panel.tickers:
+        df = panel.frame(ticker)
+        sma_20 = df['Close'].rolling(20).mean().iloc[-1]
+        sma_50 = df['Close'].rolling(50).mean().iloc[-1]
+        adx = indicators.adx(df['High'], df['Low'], df['Close'], 14, method='wilder')[0][-1]
+        if df['Close'].iloc[-1] < 50 and sma_20 > sma_50 and adx < 40:
+            expected.append(ticker)
+    assert result.index.tolist() == expected
+    assert list(result.columns) == ['close', 'sma(20)', 'sma(50)', 'adx(14)']
+
+
+def test_cheap_predicates_first_and_shared_terms():
+    panel = _synthetic_panel()
+    screener = Screener(panel)
+    mask = screener.mask("adx(14) < 40 and close < 50 and plus_di(14) > minus_di(14)")
+    # adx, plus_di e minus_di condividono un solo calcolo, eseguito solo sui ticker sotto 50
+    cheap = int((screener.mask("close < 50")).sum())
+    assert screener.computed == {('adx', (14,)): cheap}
+    assert mask.sum() <= cheap
+
+    screener.mask("adx(14) > 10 or rsi() < 30")
+    assert screener.computed[('adx', (14,))] == len(panel.tickers)
+
+
+def test_invalid_expressions():
+    for expression in ["close < 50 and import_os()", "__import__('os')", "close.real > 1", "sma(x) > 1",
+                       "close ** 2 > 1", "sma(20"]:
+        with pytest.raises(ValueError):
+            Screen(expression)
+    with pytest.raises(ValueError):
+        Screen("sma(20) + 1").run(_synthetic_panel())
+
+
+def test_saved_screens_compile():
+    with open("json_files/screens.json") as file:
+        names = list(json.load(file))
+    screens = load_screens("json_files/screens.json")
+    assert list(screens) == names and all(screen.index for screen in screens.values())
+
+
+def test_invalid_saved_screens_are_skipped(tmp_path):
+    path = tmp_path / "screens.json"
+    path.write_text(json.dumps({"broken": {"expression": "sma(20"}, "missing": {"index": "SP500"},
+                                "not_a_dict": "close < 5", "cheap": {"expression": "close < 5"}}))
+    assert list(load_screens(path)) == ["cheap"]
+
+
+def test_indicator_state_replaces_computation_when_aligned(tmp_path):
+    from Trading.methodology.download_data.download_data_yahoo import StockDataDownloader
+    from Trading.methodology.download_data.providers import LocalFakeProvider
+    from Trading.methodology.Indicators.streaming import IndicatorStateStore
+
+    tickers = ["AAA", "BBB", "CCC", "DDD"]
+    downloader = StockDataDownloader(list(tickers), provider=LocalFakeProvider(), base_path=str(tmp_path))
+    downloader.download_data()
+    # Stato di DDD indietro di una barra: per DDD gli indicatori vengono ricalcolati dal panel
+    states = IndicatorStateStore(downloader.store)
+    states.rebuild("DDD", downloader.store.read("DDD").iloc[:-1])
+    panel = UniversePanel.load(base_path=str(tmp_path))
+
+    expression = "sma(50) > 0 and rsi(14) > 0 and adx(14) > 0 and plus_di(14) > 0 and bb_upper(20, 2) > sma(20)"
+    expected = Screen(expression).run(panel)
+    assert expected.index.tolist() == tickers
+    screener = Screener(panel, states=states)
+    pd.testing.assert_frame_equal(screener.run(expression), expected, rtol=1e-9)
+    assert screener.computed == {key: 1 for key in (('sma', (50,)), ('rsi', (14,)), ('adx', (14,)),
+                                                    ('bollinger', (20, 2)), ('sma', (20,)))}
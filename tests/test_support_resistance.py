@@ -0,0 +1,124 @@
+from Trading.methodology.SuppRes.pivots import find_pivots, cluster_levels, count_contacts
+from Trading.methodology.download_data.providers import LocalFakeProvider
+import numpy as np
+
+
+def _loop_pivots(close_prices, thresholds=(25, 50, 75), days=(7, 5, 3)):
+    # Implementazione originale di StockAnalysis._identify_pivots
+    pivots = []
+    for i in range(max(days), len(close_prices) - max(days)):
+        if close_prices.iloc[i] < thresholds[0]:
+            day_range = days[0]
+        elif close_prices.iloc[i] < thresholds[1]:
+            day_range = days[1]
+        elif close_prices.iloc[i] < thresholds[2]:
+            day_range = days[2]
+        else:
+            day_range = days[-1]
+        window = close_prices.iloc[i - day_range:i + day_range + 1]
+        if close_prices.iloc[i] == window.max() or close_prices.iloc[i] == window.min():
+            pivots.append((i, close_prices.iloc[i]))
+    return pivots
+
+
+def test_vectorized_pivots_match_loop():
+    provider = LocalFakeProvider()
+    for ticker in ("AAA", "BBB", "CCC", "DDD"):
+        close = provider.bars(ticker, '2019-01-01', '2024-01-01')['Close']
+        # Prezzi che attraversano tutte le fasce e valori ripetuti
+        close = close / close.mean() * 50
+        close.iloc[100:110] = close.iloc[100]
+        positions, values = find_pivots(close)
+        expected = _loop_pivots(close)
+        assert positions.tolist() == [i for i, _ in expected]
+        assert values.tolist() == [v for _, v in expected]
+
+    assert len(find_pivots(close.iloc[:14])[0]) == 0
+
+
+def _loop_groups(pivots, close_prices):
+    # Raggruppamento e conteggio originali di StockAnalysis._group_and_normalize_pivots
+    pivot_groups = {}
+    for pivot in pivots:
+        for key in pivot_groups.keys():
+            if abs(pivot - key) / key < 0.01:
+                pivot_groups[key].append(pivot)
+                break
+        else:
+            pivot_groups[pivot] = [pivot]
+    contact_freq = {k: sum(1 for price in close_prices if abs(price - k) / k < 0.01) for k in pivot_groups}
+    return pivot_groups, contact_freq
+
+
+def test_sorted_clustering_matches_first_match_grouping():
+    rng = np.random.default_rng(0)
+    close = np.round(50 * np.exp(np.cumsum(rng.normal(0, 0.02, 2500))), 2)
+    pivots = close[find_pivots(close)[0]]
+
+    labels, keys = cluster_levels(pivots)
+    groups, contacts = _loop_groups(pivots.tolist(), close.tolist())
+    assert keys == list(groups)
+    assert [pivots[labels == group].tolist() for group in range(len(keys))] == list(groups.values())
+    assert count_contacts(close, keys).tolist() == list(contacts.values())
+
+
+def test_level_index_near_and_crossed():
+    from Trading.methodology.SuppRes.level_index import LevelIndex, recent_closes
+    index = LevelIndex(["BBB", "AAA", "AAA", "CCC"], [20.0, 12.0, 10.0, 5.0], [1, 3, 2, 4])
+    assert index.levels_for("AAA") == {10.0: 2.0, 12.0: 3.0}
+
+    closes = np.array([[9.0, 11.0, np.nan], [25.0, 20.1, 20.2], [np.nan, np.nan, np.nan]])
+    last, highest, lowest = recent_closes(closes, 2)
+    assert last[:2].tolist() == [11.0, 20.2] and highest[0] == 11.0 and lowest[0] == 9.0
+    assert np.isnan(last[2])
+
+    crossed = index.crossed(["AAA", "BBB", "CCC"], closes, sessions=2)
+    assert crossed[['Ticker', 'Level', 'Type']].values.tolist() == [["AAA", 10.0, "Support"]]
+
+    near = index.near(["AAA", "BBB"], last, threshold=0.02)
+    assert near[['Ticker', 'Level', 'Type']].values.tolist() == [["BBB", 20.0, "Support"]]
+    assert index.near(["AAA", "BBB"], last, threshold=0.02, max_price=15).empty
+
+
+def test_rebuild_skips_unchanged_tickers(tmp_path):
+    from Trading.methodology.data_store.price_store import PriceStore
+    from Trading.methodology.SuppRes.SR_rebuild import rebuild_support_resistance
+    from Trading.methodology.SuppRes.level_index import LevelIndex
+
+    store = PriceStore(base_path=str(tmp_path / "Data"))
+    provider = LocalFakeProvider()
+    for ticker in ("AAA", "BBB", "CCC"):
+        store.write(ticker, provider.bars(ticker, '2019-01-01', '2024-01-01'))
+    store.save_watermarks()
+    directory = str(tmp_path / "SuppResist")
+
+    first = rebuild_support_resistance(base_path=str(tmp_path / "Data"), directory=directory, max_workers=2)
+    assert sorted(status for _, status, _ in first) == ["updated"] * 3
+    assert sorted(LevelIndex.load(directory).names) == ["AAA", "BBB", "CCC"]
+
+    store.append("BBB", provider.bars("BBB", '2024-01-01', '2024-02-01'))
+    store.save_watermarks()
+    second = dict((ticker, status) for ticker, status, _ in
+                  rebuild_support_resistance(base_path=str(tmp_path / "Data"), directory=directory, max_workers=2))
+    assert second["AAA"] == "skipped" and second["CCC"] == "skipped"
+    assert second["BBB"] in ("updated", "unchanged")
+
+
+def test_multi_timeframe_levels_are_merged(tmp_path):
+    from Trading.methodology.data_store.price_store import PriceStore
+    from Trading.methodology.data_store.resample import resample_ohlcv
+    from Trading.methodology.SuppRes.SR_construction import StockAnalysis
+
+    PriceStore(base_path=str(tmp_path)).write("AAA", LocalFakeProvider().bars("AAA", '2014-01-01', '2024-01-01'))
+    analysis = StockAnalysis("AAA", base_path=str(tmp_path), directory=str(tmp_path / "SR"), timeframes=('1d', '1wk', '1mo'))
+    merged = analysis.calculate_multi_timeframe(analysis.timeframes)
+
+    candidates = set()
+    for timeframe in ('1d', '1wk', '1mo'):
+        bars = analysis.data if timeframe == '1d' else resample_ohlcv(analysis.data, timeframe)
+        candidates.update(analysis.calculate_support_resistance(bars) or {})
+    levels = sorted(merged)
+    assert merged and set(merged) <= candidates
+    assert max(merged.values()) == 10
+    assert all(abs(b - a) / a >= 0.01 for a, b in zip(levels, levels[1:]))
+    assert dict(analysis.get_support_resistance_levels()).keys() >= merged.keys()
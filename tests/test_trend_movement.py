@@ -0,0 +1,88 @@
+from Trading.methodology.lateral_movement.search_type_mov import TrendMovementAnalyzer
+from Trading.methodology.Indicators.feature_frame import FeatureFrame
+from Trading.methodology.download_data.providers import LocalFakeProvider
+import numpy as np
+import pandas as pd
+
+
+def _data(ticker="AAA"):
+    return LocalFakeProvider().bars(ticker, '2023-01-01', '2024-01-01')[['Open', 'High', 'Low', 'Close']]
+
+
+def _baseline_streak(condition):
+    return condition.iloc[-1], condition.cumsum() - condition.cumsum().where(~condition).ffill().fillna(0).max()
+
+
+def _baseline_adx(data, window=14):
+    # Calcolo originale di TrendMovementAnalyzer.calculate_ADX, riga per riga
+    df = data.copy()
+    df['+DM'] = df['High'].diff()
+    df['-DM'] = df['Low'].diff()
+    df['+DM'] = df.apply(lambda row: row['+DM'] if row['+DM'] > row['-DM'] and row['+DM'] > 0 else 0, axis=1)
+    df['-DM'] = df.apply(lambda row: -row['-DM'] if row['-DM'] > row['+DM'] and row['-DM'] > 0 else 0, axis=1)
+    df['Prev_Close'] = df['Close'].shift()
+    df['TR'] = df.apply(lambda row: max(abs(row['High'] - row['Low']), abs(row['High'] - row['Prev_Close']),
+                                        abs(row['Low'] - row['Prev_Close'])), axis=1)
+    plus_dmi = df['+DM'].rolling(window=window).mean() / df['TR'].rolling(window=window).mean()
+    minus_dmi = df['-DM'].rolling(window=window).mean() / df['TR'].rolling(window=window).mean()
+    dx = (abs(plus_dmi - minus_dmi) / (plus_dmi + minus_dmi)) * 100
+    return dx.rolling(window=window).mean(), plus_dmi, minus_dmi
+
+
+def test_rewritten_methods_match_baseline_formulas():
+    for ticker in ("AAA", "BBB"):
+        data = _data(ticker)
+        analyzer = TrendMovementAnalyzer(data)
+        close = data['Close']
+
+        for window in (20, 40):
+            moving_average = close.rolling(window=window).mean()
+            assert analyzer.is_upward_trend_SMA(window=window) == ((close > moving_average).iloc[-20:].mean() >= 0.5)
+            assert analyzer.is_downward_trend_SMA(window=window) == ((close < moving_average).iloc[-20:].mean() >= 0.5)
+
+        delta = close.diff()
+        rs = delta.where(delta > 0, 0).rolling(14).mean() / (-delta.where(delta < 0, 0)).rolling(14).mean()
+        rsi = 100 - (100 / (1 + rs))
+        pd.testing.assert_series_equal(analyzer._calculate_RSI(), rsi, check_names=False)
+        pd.testing.assert_series_equal(analyzer.is_upward_trend_using_RSI(), rsi > 50, check_names=False)
+
+        macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        signal = macd.ewm(span=9, adjust=False).mean()
+        assert analyzer.is_upward_trend_using_MACD() == (macd.iloc[-1] > signal.iloc[-1])
+        assert analyzer.is_downward_trend_using_MACD() == (macd.iloc[-1] < signal.iloc[-1])
+
+        sma, std = close.rolling(20).mean(), close.rolling(20).std()
+        narrow_band = ((sma + 2 * std) - (sma - 2 * std)) / sma < 0.1
+        _assert_streak(analyzer.is_lateral_movement_bollinger_bands(threshold_percentage=0.1),
+                       _baseline_streak(narrow_band))
+
+        adx, plus_dmi, minus_dmi = _baseline_adx(data)
+        for computed, expected in zip(analyzer.calculate_ADX(), (adx, plus_dmi, minus_dmi)):
+            np.testing.assert_allclose(computed, expected.to_numpy(), rtol=1e-9, equal_nan=True)
+        _assert_streak(analyzer.is_lateral_movement_ADX(adx_threshold=25), _baseline_streak(adx < 25))
+
+        cum_change = close.pct_change().rolling(window=10).sum().abs()
+        _assert_streak(analyzer.is_lateral_movement_percent(last_periods=10, threshold=0.05),
+                       _baseline_streak(cum_change < 0.05))
+
+
+def _assert_streak(result, expected):
+    assert result[0] == expected[0]
+    pd.testing.assert_series_equal(result[1], expected[1], check_names=False, check_dtype=False)
+
+
+def test_shared_indicator_is_computed_once():
+    analyzer = TrendMovementAnalyzer(_data())
+    analyzer.evaluate_trend_and_laterality(periods=[40], lateral_check_method="percent")
+    # Close, SMA(40) condivisa dai due trend, variazioni percentuali e loro somma mobile
+    assert analyzer.features.computed == 4
+    analyzer.is_upward_trend_SMA(window=40)
+    analyzer.is_downward_trend_SMA(window=40)
+    assert analyzer.features.computed == 4
+
+    features = FeatureFrame(_data())
+    features.adx(14)
+    features.adx(14)
+    features.adx(14, method='wilder')
+    # High, Low, Close e due ADX (uno per metodo)
+    assert features.computed == 5
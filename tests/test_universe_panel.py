@@ -0,0 +1,46 @@
+from Trading.methodology.data_store.price_store import PriceStore
+from Trading.methodology.data_store.universe_panel import UniversePanel
+from Trading.methodology.download_data.providers import LocalFakeProvider
+import json
+import numpy as np
+import pytest
+
+
+def _store(tmp_path, tickers):
+    store = PriceStore(base_path=str(tmp_path))
+    provider = LocalFakeProvider()
+    for ticker in tickers:
+        store.write(ticker, provider.bars(ticker, '2023-01-01', '2023-06-01'))
+    store.save_watermarks()
+    return store
+
+
+def test_rebuild_never_mixes_metadata_and_values(tmp_path):
+    store = _store(tmp_path, ["AAA", "BBB", "CCC"])
+    first = UniversePanel.build(store)
+    assert first.shape == first.values.shape == (5, 3, len(first.dates))
+
+    second = UniversePanel.build(store, tickers=["AAA", "CCC"])
+    # Il panel già mappato resta leggibile, quello riaperto è coerente con i nuovi metadati
+    assert first.values.shape[1] == 3
+    reopened = UniversePanel.open(store)
+    assert reopened.tickers == ["AAA", "CCC"] == second.tickers
+    assert reopened.shape[1] == len(reopened.tickers)
+    np.testing.assert_array_equal(reopened.frame("CCC").to_numpy(), first.frame("CCC").to_numpy())
+    prefix, _ = UniversePanel.paths(store)
+    assert len(list(tmp_path.glob(f"SP500/{prefix.rsplit('/', 1)[-1]}.*.npy"))) == 1
+
+
+def test_open_rejects_inconsistent_panel(tmp_path):
+    store = _store(tmp_path, ["AAA", "BBB"])
+    UniversePanel.build(store)
+    _, meta_path = UniversePanel.paths(store)
+    with open(meta_path) as file:
+        meta = json.load(file)
+    meta["shape"][1] += 1
+    with open(meta_path, 'w') as file:
+        json.dump(meta, file)
+    with pytest.raises(FileNotFoundError):
+        UniversePanel.open(store, attempts=1)
+    # load ricostruisce il panel invece di restituire righe disallineate
+    assert UniversePanel.load(base_path=str(tmp_path)).tickers == ["AAA", "BBB"]